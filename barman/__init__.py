@@ -1,2 +1,60 @@
 __version__ = '1.0.1dev'
 
+import importlib
+
+
+# submodules, which are only imported when first accessed
+_SUBMODULES = {
+    'analysis', 'assembly', 'bulk', 'cache', 'combinations', 'diagrams', 'dofs', 'elements', 'equations',
+    'influence', 'jit', 'kernels', 'loads', 'materials', 'mechanisms', 'models', 'optimization', 'prescribed_displacements',
+    'prescribed_forces', 'sections', 'service', 'solvers',
+}
+
+# top-level names, and the submodule which defines each one
+_ATTRIBUTES = {
+    'Parameter': 'dofs',
+    'Node': 'dofs',
+    'GlobalDoF': 'dofs',
+    'GlobalDoFLink': 'dofs',
+    'Bar2': 'elements',
+    'EulerBernoulli': 'elements',
+    'LinearElastic': 'materials',
+    'Section': 'sections',
+    'PrescribedDisplacement': 'prescribed_displacements',
+    'PrescribedForce': 'prescribed_forces',
+    'LinearLoad': 'loads',
+    'UniformLoad': 'loads',
+    'ThermalStrain': 'loads',
+    'Static': 'models',
+    'LinearStatic': 'analysis',
+    'MatrixFreeLinearStatic': 'analysis',
+    'BatchLinearStatic': 'analysis',
+    'PDelta': 'analysis',
+    'LinearBuckling': 'analysis',
+    'Harmonic': 'analysis',
+    'ExplicitDynamics': 'analysis',
+    'MechanismError': 'mechanisms',
+    'ResultCache': 'cache',
+    'LoadCombinations': 'combinations',
+    'InfluenceLines': 'influence',
+    'MemberDiagrams': 'diagrams',
+    'TrussTopologyOptimization': 'optimization',
+}
+
+__all__ = sorted(_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module('barman.' + name)
+
+    if name in _ATTRIBUTES:
+        value = getattr(importlib.import_module('barman.' + _ATTRIBUTES[name]), name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError("module 'barman' has no attribute '{}'".format(name))
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES | set(_ATTRIBUTES))
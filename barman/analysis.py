@@ -18,12 +18,10 @@
 """
 
 
-from scipy.sparse import dok_matrix, coo_matrix
-import scipy.linalg
-import scipy.sparse
-import scipy.sparse.linalg
+import inspect
 import numpy
-from barman import equations
+from barman import assembly, equations, kernels, loads, mechanisms, solvers
+from barman.elements import Bar2
 
 class LinearStatic:
     """Performs a linear static analysis on a LinearElastic model"""
@@ -32,10 +30,47 @@ class LinearStatic:
     class Results:
         """Stores the results of an analysis"""
 
-        def __init__(self, model, equation, dof_order):
+        def __init__(self, model, equation, dof_order, operator=None, residuals=None, solver_info=None, compression_ratio=None,
+                     tolerance=None):
             self._model = model
             self._equation = equation
             self._dof_order = dof_order
+            self._operator = operator
+            self._residuals = residuals
+            self._solver_info = solver_info
+            self._compression_ratio = compression_ratio
+            self._tolerance = tolerance
+            self._rotation = False
+
+        def get_model(self):
+            return self._model
+
+        def get_rotation(self):
+            """Returns the rotation from the global axes to the nodal coordinate systems, or None if no node is rotated"""
+
+            if self._rotation is False:
+                self._rotation = kernels.get_nodal_rotation(self._dof_order)
+            return self._rotation
+
+        def get_global_displacements(self) -> numpy.array:
+            """Returns the displacements of all global DoFs along the global axes, following the DoF order"""
+            return kernels.to_global_axes(self.get_rotation(), self.get_displacements())
+
+        def get_solver_info(self) -> dict:
+            """Returns what the solver recorded about its solution, such as the info of a solvers.DirectSolver"""
+            return self._solver_info
+
+        def get_compression_ratio(self) -> float:
+            """Returns the number of elements per distinct element matrix, if the analysis deduplicated elements"""
+            return self._compression_ratio
+
+        def get_operator(self):
+            """Returns the assembly.StiffnessOperator of the model, if the analysis used one"""
+            return self._operator
+
+        def get_residuals(self) -> numpy.array:
+            """Returns the relative residual norms of each iterative refinement step, if the analysis refined its solution"""
+            return None if self._residuals is None else numpy.array(self._residuals)
 
         def get_equation(self):
             return self._equation
@@ -43,9 +78,114 @@ class LinearStatic:
         def get_dof_order(self):
             return self._dof_order
 
+        def get_displacements(self) -> numpy.array:
+            """Returns the displacements of all global DoFs, following the DoF order"""
+
+            return numpy.concatenate((self._equation.d_e, self._equation.d_f))
+
+        def get_nodes(self):
+            """Returns the nodes of the model, in the order used by the nodal result arrays"""
+
+            nodes, positions = kernels.get_nodal_layout(self._dof_order)
+            return nodes
+
+        def get_nodal_displacements(self) -> numpy.array:
+            """Returns the (n_nodes, 3) [dx, dy, rz] displacements of each node listed by get_nodes"""
+
+            nodes, positions = kernels.get_nodal_layout(self._dof_order)
+            return kernels.to_nodal_array(positions, len(nodes), self.get_displacements())
+
+        def get_reactions(self) -> numpy.array:
+            """Returns the reactions of the essential global DoFs, following the DoF order"""
+
+            equation = self._equation
+            if len(equation.d_e) == 0:
+                return numpy.zeros(0)
+
+            if self._operator is not None:
+                return self._operator.apply(self.get_displacements())[:len(equation.d_e)] - equation.f_e
+
+            return equation.k_ee.dot(equation.d_e) + equation.k_ef.dot(equation.d_f) - equation.f_e
+
+        def get_member_forces(self) -> numpy.array:
+            """Returns the (n_elements, 6) end forces [N1, V1, M1, N2, V2, M2] of each element in local coordinates"""
+
+            elements = self._model.elements
+            indices = kernels.get_nodal_dof_indices(elements, self._dof_order)
+            f_local = kernels.get_member_end_forces(elements, indices, self.get_global_displacements(), tolerance=self._tolerance)
+
+            return f_local - loads.get_element_fixed_end_forces(elements, self._model.element_loads)
 
-    def __init__(self):
-        pass
+
+    class CachedResults(Results):
+        """Stores the results of an analysis loaded from a result cache
+
+        The equation is only generated again if it is requested.  The cache only holds
+        displacements, reactions and member forces, so get_solver_info, get_residuals
+        and get_compression_ratio return None.
+        """
+
+        def __init__(self, analysis, model, dof_order, displacements, reactions, member_forces):
+            super().__init__(model, None, dof_order)
+            self._analysis = analysis
+            self._displacements = displacements
+            self._reactions = reactions
+            self._member_forces = member_forces
+
+        def get_equation(self):
+            if self._equation is None:
+                self._equation = self._analysis.generate_equation(self._model, self._dof_order)
+                self._equation.d_f = self._displacements[len(self._reactions):]
+
+            return self._equation
+
+        def get_displacements(self) -> numpy.array:
+            return self._displacements.copy()
+
+        def get_reactions(self) -> numpy.array:
+            return self._reactions.copy()
+
+        def get_member_forces(self) -> numpy.array:
+            return self._member_forces.copy()
+
+
+    PRECISIONS = ('double', 'single')
+
+
+    def __init__(self, assembler=None, solver=None, cache=None, precision: str = 'double', check: bool = True,
+                 deduplicate: bool = False):
+        """
+        Args:
+            assembler: object whose assemble(elements, dof_order) method generates the
+                global stiffness matrix, which defaults to an assembly.SerialAssembler
+            solver: object whose solve(k_ff, f) method solves the equation for the free
+                DoFs, which defaults to a solvers.DirectSolver
+            cache: cache.ResultCache which stores the results of each model, so that
+                analysing an equivalent model again returns the stored results
+            precision: either 'double', or 'single' to store the global stiffness matrix
+                in float32 and solve it by iterative refinement.  The solver then defaults
+                to a solvers.MixedPrecisionSolver, whose solve(k_ff, f, operator) method
+                gets the float64 assembly.StiffnessOperator of the model to compute residuals
+            check: whether to look for mechanisms before solving, raising a
+                mechanisms.MechanismError which lists their nodes
+            deduplicate: whether the default assembler and the member force recovery
+                compute the matrix of each distinct element only once, which pays off
+                on models with many repeated members such as lattices and trusses
+        """
+
+        if precision not in LinearStatic.PRECISIONS:
+            raise ValueError('unknown precision: {}'.format(precision))
+
+        single = precision == 'single'
+        if single and solver is not None and 'operator' not in inspect.signature(solver.solve).parameters:
+            raise ValueError("precision 'single' requires a solver whose solve(k_ff, f, operator) method refines the solution, "
+                             "such as a solvers.MixedPrecisionSolver")
+
+        self._precision: str = precision
+        self._assembler = assembler or assembly.SerialAssembler(numpy.float32 if single else numpy.float64, deduplicate)
+        self._solver = solver or (solvers.MixedPrecisionSolver() if single else solvers.DirectSolver())
+        self._cache = cache
+        self._check: bool = check
 
 
     def get_global_dof_map(self, model):
@@ -70,84 +210,140 @@ class LinearStatic:
         return dof_order, essential_global_dofs
 
 
-    def run(self, model):
-        """Runs a linear static analysis on a linear elastic model"""
+    def check_model(self, model, dof_order, essential_global_dofs) -> None:
+        """Raises a mechanisms.MechanismError if the model is a mechanism, unless checks are disabled"""
+
+        if self._check:
+            mechanisms.check(model, dof_order, essential_global_dofs)
+
+
+    def get_cache_settings(self) -> dict:
+        """Returns the options of the analysis which change its results, which are part of the keys of cached results"""
+
+        return {
+            'analysis': type(self).__name__,
+            'precision': self._precision,
+            'solver': type(self._solver).__name__,
+            'solver_settings': self._solver.get_settings() if hasattr(self._solver, 'get_settings') else None,
+            'deduplication': getattr(self._assembler, 'tolerance', None),
+        }
+
+
+    def get_assembly_plan(self, model) -> assembly.AssemblyPlan:
+        """Returns the assembly plan of the topology of a model, which can be reused by runs of models sharing it"""
+
+        dof_map, essential_global_dofs = self.get_global_dof_map(model)
+
+        return assembly.AssemblyPlan(model.elements, dof_map, essential_global_dofs)
+
+
+    def run(self, model, plan: assembly.AssemblyPlan = None):
+        """Runs a linear static analysis on a linear elastic model
+
+        Args:
+            model: linear elastic model
+            plan: assembly plan of the topology of the model, which is then refilled
+                instead of generating the DoF map and the global stiffness matrix
+        """
 
         # get list of GlobalDofs
-        dof_map, essential_global_dofs = self.get_global_dof_map(model);
+        if plan is None:
+            dof_map, essential_global_dofs = self.get_global_dof_map(model);
+        else:
+            dof_map, essential_global_dofs = plan.dof_order, plan.essential_global_dofs
 
-        # generate FEM equation
-        k_global = self.generate_global_stiffness_matrix(model.elements, dof_map)
-        f_global = self.generate_global_force_vector(model.prescribed_forces, dof_map)
-        d_global = self.generate_global_dof_vector(model.prescribed_displacements, dof_map)
+        if self._cache is not None:
+            cached = self._cache.load(model, dof_map, self.get_cache_settings())
+            if cached is not None:
+                return LinearStatic.CachedResults(self, model, dof_map, *cached)
 
+        self.check_model(model, dof_map, essential_global_dofs)
+
+        # generate FEM equation
+        equation = self.generate_equation(model, dof_map, essential_global_dofs, plan)
 
-        #setup equation
-        equation = equations.LinearStatic(dof_map, k_global, d_global, f_global, essential_global_dofs)
+        # plans assemble without the assembler, and member forces are recovered with its deduplication tolerance
+        compression_ratio = getattr(self._assembler, 'compression_ratio', None) if plan is None else None
+        tolerance = getattr(self._assembler, 'tolerance', None) if plan is None else None
 
         #solve equation
-        equation = self.solve_equation(equation)
+        if self._precision == 'single':
+            operator = assembly.StiffnessOperator(model.elements, dof_map, len(equation.d_e))
+            equation = self.solve_refined_equation(equation, operator)
+            results = LinearStatic.Results(model, equation, dof_map, operator, getattr(self._solver, 'residuals', None),
+                                           compression_ratio=compression_ratio, tolerance=tolerance)
+        else:
+            equation = self.solve_equation(equation)
+            results = LinearStatic.Results(model, equation, dof_map, solver_info=self.get_solver_info(),
+                                           compression_ratio=compression_ratio, tolerance=tolerance)
 
-        #output the result
-        results = LinearStatic.Results(model, equation, dof_map)
+        if self._cache is not None:
+            self._cache.store(model, dof_map, results.get_displacements(), results.get_reactions(), results.get_member_forces(),
+                              self.get_cache_settings())
 
         return results
 
 
-    def generate_global_stiffness_matrix(self, elements, dof_order):
-        """given a set of elements and a node ordering, generates a global stiffness matrix"""
+    def generate_equation(self, model, dof_order, essential_global_dofs=None, plan=None):
+        """Generates the FEM equation of a model, given its DoF order or its assembly plan"""
 
-        n_rows = n_columns = len(dof_order)
-        k_global = dok_matrix( (n_rows, n_columns) )
+        if essential_global_dofs is None:
+            essential_global_dofs = set(gdof for pd in model.prescribed_displacements for gdof, value in pd.get_values())
 
-        for elem in elements:
-            k_elem = elem.get_global_stiffness_matrix()
-            global_dofs = elem.get_global_dofs()
+        f_global = self.generate_global_force_vector(model.prescribed_forces, dof_order, model.element_loads)
+        d_global = self.generate_global_dof_vector(model.prescribed_displacements, dof_order)
 
-            # get indices
-            indices = [dof_order[dof] for dof in global_dofs]
+        if plan is not None:
+            # the plan rotates element matrices to the nodal coordinate systems
+            blocks = plan.assemble(model.elements)
+            if self._precision == 'single':
+                blocks = {key: block.astype(numpy.float32) for key, block in blocks.items()}
+            return equations.LinearStatic.from_blocks(dof_order, blocks, d_global, f_global, essential_global_dofs)
 
-            for local_i, global_i in enumerate(indices):
-                for local_j,global_j in enumerate(indices):
-                    k_global[global_i,global_j] += k_elem[local_i,local_j]
+        k_global = self.generate_global_stiffness_matrix(model.elements, dof_order)
 
-        return k_global
+        return equations.LinearStatic(dof_order, k_global, d_global, f_global, essential_global_dofs)
 
 
-    def generate_global_force_vector(self, prescribed_forces, dof_order):
-        """given a set of prescribed forces and a node ordering, generates a global force vector"""
+    def generate_global_stiffness_matrix(self, elements, dof_order):
+        """given a set of elements and a node ordering, generates a global stiffness matrix
 
-        n_rows = n_columns = len(dof_order)
-        f_global = numpy.zeros(n_rows)
+        DoFs follow the coordinate systems of their nodes.
+        """
 
+        k_global = kernels.rotate_matrix(kernels.get_nodal_rotation(dof_order), self._assembler.assemble(elements, dof_order))
+        if self._precision == 'single':
+            k_global = k_global.astype(numpy.float32, copy=False)
 
-        for pf in prescribed_forces:
-            f_elem = pf.value
-            global_dofs = pf.global_dof
+        return k_global
 
-            global_i = dof_order[global_dofs]
 
-            f_global[global_i] += f_elem
+    def generate_global_force_vector(self, prescribed_forces, dof_order, element_loads=()):
+        """given a set of prescribed forces, element loads and a node ordering, generates a global force vector
 
-        return f_global
+        Prescribed forces follow the coordinate systems of their nodes, and the equivalent
+        nodal forces of element loads are rotated to them.
+        """
 
+        indices = numpy.array([dof_order[pf.global_dof] for pf in prescribed_forces], dtype=numpy.int64)
+        values = numpy.array([pf.value for pf in prescribed_forces], dtype=float)
 
-    def generate_global_dof_vector(self, prescribed_displacements, dof_order):
-        """given a set of prescribed displacements and a node ordering, generates a global dof vector"""
+        f_global = kernels.scatter(indices, values, len(dof_order))
 
-        n_rows = n_columns = len(dof_order)
-        d_global = numpy.zeros(n_rows)
+        if len(element_loads) > 0:
+            indices, values = loads.get_equivalent_nodal_forces(element_loads, dof_order)
+            f_global += kernels.to_nodal_axes(kernels.get_nodal_rotation(dof_order), kernels.scatter(indices, values, len(dof_order)))
 
+        return f_global
 
-        for pd in prescribed_displacements:
-            d_elem = pd.value
-            global_dofs = pd.global_dof
 
-            global_i = dof_order[global_dofs]
+    def generate_global_dof_vector(self, prescribed_displacements, dof_order):
+        """given a set of prescribed displacements and a node ordering, generates a global dof vector"""
 
-            d_global[global_i] += d_elem
+        indices = numpy.array([dof_order[pd.global_dof] for pd in prescribed_displacements], dtype=numpy.int64)
+        values = numpy.array([pd.value for pd in prescribed_displacements], dtype=float)
 
-        return d_global
+        return kernels.scatter(indices, values, len(dof_order))
 
 
     def solve_equation(self, equation):
@@ -157,6 +353,844 @@ class LinearStatic:
         if len(equation.d_e) > 0:
             f = equation.f_f - equation.k_fe.dot(equation.d_e)
 
-            equation.d_f = scipy.sparse.linalg.spsolve(equation.k_ff, f)
+            equation.d_f = self._solver.solve(equation.k_ff, f)
 
         return equation
+
+
+    def get_solver_info(self) -> dict:
+        """Returns a copy of the info the solver recorded about its last solution, if it records any"""
+
+        info = getattr(self._solver, 'info', None)
+        return None if info is None else dict(info)
+
+
+    def solve_refined_equation(self, equation, operator):
+        """solves the equation with the single precision k_ff, computing residuals with a float64 operator"""
+
+        n_essential = len(equation.d_e)
+        if n_essential > 0:
+            # k_fe*d_e is the product of the whole matrix by the prescribed displacements
+            d_e = numpy.zeros(operator.shape[0] + n_essential)
+            d_e[:n_essential] = equation.d_e
+            f = equation.f_f - operator.apply(d_e)[n_essential:]
+
+            equation.d_f = self._solver.solve(equation.k_ff, f, operator)
+
+        return equation
+
+
+class MatrixFreeLinearStatic(LinearStatic):
+    """Performs a linear static analysis without storing the global stiffness matrix
+
+    k_ff is applied element by element by an assembly.StiffnessOperator, so the
+    equation is solved by an iterative solver, and the equation of the results only
+    holds that operator as its k_ff block.
+    """
+
+
+    def __init__(self, solver=None):
+        """
+        Args:
+            solver: object whose solve(k_ff, f) method solves the equation for the free
+                DoFs given a linear operator, which defaults to a solvers.ConjugateGradientSolver
+        """
+
+        super().__init__(solver=solver or solvers.ConjugateGradientSolver())
+
+
+    def run(self, model):
+        """Runs a linear static analysis on a linear elastic model"""
+
+        dof_map, essential_global_dofs = self.get_global_dof_map(model)
+        n_essential = len(essential_global_dofs)
+        self.check_model(model, dof_map, essential_global_dofs)
+
+        operator = assembly.StiffnessOperator(model.elements, dof_map, n_essential)
+        f_global = self.generate_global_force_vector(model.prescribed_forces, dof_map, model.element_loads)
+        d_global = self.generate_global_dof_vector(model.prescribed_displacements, dof_map)
+
+        blocks = {'ee': None, 'ef': None, 'fe': None, 'ff': operator}
+        equation = equations.LinearStatic.from_blocks(dof_map, blocks, d_global, f_global, essential_global_dofs)
+
+        if n_essential > 0:
+            # k_fe*d_e is the product of the whole matrix by the prescribed displacements
+            f = equation.f_f - operator.apply(numpy.where(numpy.arange(len(d_global)) < n_essential, d_global, 0.0))[n_essential:]
+            equation.d_f = self._solver.solve(operator, f)
+
+        return LinearStatic.Results(model, equation, dof_map, operator)
+
+
+class BatchLinearStatic(LinearStatic):
+    """Performs linear static analyses on a batch of small independent models at once
+
+    The element matrices of all models are computed by one call of the batched
+    kernels and summed into a stack of dense global stiffness matrices, padded to
+    the largest model with unit diagonal entries, and the free DoFs of the whole
+    stack are solved by a single numpy.linalg.solve call.  This avoids the per-model
+    overhead of sparse assembly and factorization, which dominates for models with
+    up to a few hundred DoFs.  Each model costs as much as the largest one of its
+    chunk, so models of similar size should be batched together.
+    """
+
+
+    class Results:
+        """Stores the results of a batch of linear static analyses as stacked arrays
+
+        Stacked arrays are padded with zeros beyond the DoFs, essential DoFs and
+        elements of each model, whose counts are returned by get_sizes.
+        """
+
+        def __init__(self, models, dof_orders, sizes, displacements, reactions, member_forces):
+            self._models = models
+            self._dof_orders = dof_orders
+            self._sizes = sizes
+            self._displacements = displacements
+            self._reactions = reactions
+            self._member_forces = member_forces
+
+        def get_models(self):
+            return self._models
+
+        def get_dof_orders(self):
+            return self._dof_orders
+
+        def get_sizes(self) -> numpy.array:
+            """Returns the (batch, 3) number of DoFs, essential DoFs and elements of each model"""
+            return self._sizes
+
+        def get_displacements(self) -> numpy.array:
+            """Returns the (batch, n_dofs) displacements of each model, following its DoF order"""
+            return self._displacements
+
+        def get_reactions(self) -> numpy.array:
+            """Returns the (batch, n_essential) reactions of the essential DoFs of each model, following its DoF order"""
+            return self._reactions
+
+        def get_member_forces(self) -> numpy.array:
+            """Returns the (batch, n_elements, 6) local end forces [N1, V1, M1, N2, V2, M2] of the elements of each model"""
+            return self._member_forces
+
+
+    def __init__(self, batch_size: int = 256, check: bool = False):
+        """
+        Args:
+            batch_size: number of models stacked in each dense solve, which bounds
+                the memory of the stack to about 16*batch_size*n_dofs**2 bytes
+            check: whether to look for mechanisms in each model before solving.  The
+                check runs once per model, at about 1 ms for a ten-bay truss, which
+                is two thirds of the time of the batched analysis itself.  Without it,
+                a mechanism gives meaningless results, or makes numpy.linalg.solve
+                raise a LinAlgError for its whole chunk if its matrix is exactly singular
+        """
+
+        super().__init__(check=check)
+        self._batch_size: int = batch_size
+
+
+    def run(self, models):
+        """Runs a linear static analysis on each model of a list of linear elastic models"""
+
+        models = list(models)
+        dof_maps = []
+        sizes = numpy.zeros((len(models), 3), dtype=numpy.int64)
+        for i, model in enumerate(models):
+            dof_map, essential_global_dofs = self.get_global_dof_map(model)
+            self.check_model(model, dof_map, essential_global_dofs)
+            dof_maps.append(dof_map)
+            sizes[i] = len(dof_map), len(essential_global_dofs), len(model.elements)
+
+        n_dofs, n_essential, n_elements = sizes.max(axis=0, initial=0)
+        displacements = numpy.zeros((len(models), n_dofs))
+        reactions = numpy.zeros((len(models), n_essential))
+        member_forces = numpy.zeros((len(models), n_elements, 6))
+
+        for start in range(0, len(models), self._batch_size):
+            chunk = slice(start, start + self._batch_size)
+            d, r, f = self.solve_batch(models[chunk], dof_maps[chunk], sizes[chunk, 1])
+            displacements[chunk, :d.shape[1]] = d
+            reactions[chunk, :r.shape[1]] = r
+            member_forces[chunk, :f.shape[1]] = f
+
+        return BatchLinearStatic.Results(models, dof_maps, sizes, displacements, reactions, member_forces)
+
+
+    def solve_batch(self, models, dof_maps, n_essential) -> (numpy.array, numpy.array, numpy.array):
+        """Returns the stacked displacements, reactions and member forces of a chunk of models
+
+        Args:
+            models: list of linear elastic models
+            dof_maps: DoF map of each model, with essential DoFs first
+            n_essential: number of essential DoFs of each model
+        """
+
+        batch = len(models)
+        sizes = numpy.array([len(dof_map) for dof_map in dof_maps], dtype=numpy.int64)
+        n = int(sizes.max(initial=0))
+        chunk = numpy.arange(batch)[:, numpy.newaxis]
+
+        # all element matrices at once, with missing DoFs summed into the unused slot n
+        elements = [elem for model in models for elem in model.elements]
+        counts = [len(model.elements) for model in models]
+        owners = numpy.repeat(numpy.arange(batch), counts)
+        indices = numpy.concatenate([kernels.get_nodal_dof_indices(model.elements, dof_map).reshape(-1, 6)
+                                     for model, dof_map in zip(models, dof_maps)])
+        indices = numpy.where(indices < 0, n, indices) + (n + 1)*owners[:, numpy.newaxis]
+
+        flat = indices[:, :, numpy.newaxis]*(n + 1) + indices[:, numpy.newaxis, :] % (n + 1)
+        k = numpy.bincount(flat.ravel(), weights=kernels.get_global_stiffness(elements).ravel(), minlength=batch*(n + 1)**2)
+        k = k.reshape(batch, n + 1, n + 1)
+        k[:, n, :] = k[:, :, n] = 0.0
+
+        f = numpy.zeros((batch, n + 1))
+        d = numpy.zeros((batch, n + 1))
+        rotations = []
+        for i, (model, dof_map) in enumerate(zip(models, dof_maps)):
+            size = len(dof_map)
+            f[i, :size] = self.generate_global_force_vector(model.prescribed_forces, dof_map, model.element_loads)
+            d[i, :size] = self.generate_global_dof_vector(model.prescribed_displacements, dof_map)
+
+            rotation = kernels.get_nodal_rotation(dof_map)
+            if rotation is not None:
+                rotation = rotation.toarray()
+                k[i, :size, :size] = rotation @ k[i, :size, :size] @ rotation.T
+            rotations.append(rotation)
+
+        # free DoFs of each model, padded with the unused slot n
+        n_free = sizes - n_essential
+        slots = numpy.arange(int(n_free.max(initial=0)))
+        padding = slots >= n_free[:, numpy.newaxis]
+        free = numpy.where(padding, n, n_essential[:, numpy.newaxis] + slots)
+        d[chunk, free] = 0.0
+
+        if len(slots) > 0:
+            k_ff = k[chunk[:, :, numpy.newaxis], free[:, :, numpy.newaxis], free[:, numpy.newaxis, :]]
+            k_ff[:, slots, slots] += padding
+            f_ff = f[chunk, free] - numpy.einsum('bij,bj->bi', k[chunk, free], d)
+
+            d[chunk, free] = numpy.linalg.solve(k_ff, f_ff[:, :, numpy.newaxis])[:, :, 0]
+            d[:, n] = 0.0
+
+        # essential DoFs come first
+        essential = numpy.arange(int(n_essential.max(initial=0)))
+        r = numpy.einsum('bij,bj->bi', k[:, essential], d) - f[:, essential]
+        r[essential >= n_essential[:, numpy.newaxis]] = 0.0
+
+        # member forces of the whole chunk at once, from the displacements along the global axes
+        d_global = d.copy()
+        for i, rotation in enumerate(rotations):
+            if rotation is not None:
+                d_global[i, :len(rotation)] = rotation.T @ d[i, :len(rotation)]
+
+        element_loads = [load for model in models for load in model.element_loads]
+        forces = kernels.get_member_end_forces(elements, indices, d_global.ravel())
+        forces -= loads.get_element_fixed_end_forces(elements, element_loads)
+
+        member_forces = numpy.zeros((batch, max(counts, default=0), 6))
+        member_forces[owners, numpy.arange(len(elements)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)] = forces
+
+        return d[:, :n], r, member_forces
+
+
+class PDelta(LinearStatic):
+    """Performs a second-order (P-Delta) static analysis on a LinearElastic model
+
+    Equilibrium is solved with the tangent stiffness K + K_G(N), where K_G is the
+    geometric stiffness of the current axial forces, applying the loads in load_steps
+    increments with Newton-Raphson iterations.  With modified_newton, the factorized
+    tangent is reused across iterations and load steps, and it is only refactorized
+    when the residual stops decreasing.
+    """
+
+
+    class Results(LinearStatic.Results):
+        """Stores the results of a P-Delta analysis"""
+
+        def __init__(self, model, equation, dof_order, axial_forces, convergence_history, factorizations):
+            super().__init__(model, equation, dof_order)
+            self._axial_forces = axial_forces
+            self._convergence_history = convergence_history
+            self._factorizations = factorizations
+
+        def get_axial_forces(self) -> numpy.array:
+            """Returns the axial force (tension positive) of each element"""
+            return self._axial_forces
+
+        def get_convergence_history(self):
+            """Returns, for each load step, the list of residual norms of its iterations"""
+            return self._convergence_history
+
+        def get_iterations(self):
+            """Returns the number of iterations of each load step"""
+            return [len(history) - 1 for history in self._convergence_history]
+
+        def get_factorizations(self) -> int:
+            """Returns the number of tangent stiffness factorizations"""
+            return self._factorizations
+
+        def get_member_forces(self) -> numpy.array:
+            """Returns the (n_elements, 6) second-order end forces of each element in local coordinates"""
+
+            elements = self._model.elements
+            indices = kernels.get_nodal_dof_indices(elements, self._dof_order)
+            f_local = kernels.get_member_end_forces(elements, indices, self.get_global_displacements(), self._axial_forces)
+
+            return f_local - loads.get_element_fixed_end_forces(elements, self._model.element_loads)
+
+
+    def __init__(self, load_steps: int = 1, modified_newton: bool = False, tolerance: float = 1e-8, max_iterations: int = 50):
+        super().__init__()
+        self._load_steps: int = load_steps
+        self._modified_newton: bool = modified_newton
+        self._tolerance: float = tolerance
+        self._max_iterations: int = max_iterations
+
+
+    def get_axial_forces(self, elements, indices, d_global, fixed_end_forces) -> numpy.array:
+        """Returns the first-order axial force (tension positive) of each element"""
+
+        f_local = kernels.get_member_end_forces(elements, indices, d_global) - fixed_end_forces
+
+        return 0.5*(f_local[:, 3] - f_local[:, 0])
+
+
+    def run(self, model):
+        """Runs a P-Delta analysis on a linear elastic model"""
+
+        import scipy.sparse.linalg
+
+        elements = model.elements
+        dof_map, essential_global_dofs = self.get_global_dof_map(model)
+        n_dofs = len(dof_map)
+        n_essential = len(essential_global_dofs)
+        self.check_model(model, dof_map, essential_global_dofs)
+
+        indices = kernels.get_nodal_dof_indices(elements, dof_map)
+        rotation = kernels.get_nodal_rotation(dof_map)
+        f_global = self.generate_global_force_vector(model.prescribed_forces, dof_map, model.element_loads)
+        d_prescribed = self.generate_global_dof_vector(model.prescribed_displacements, dof_map)
+        fixed_end_forces = loads.get_element_fixed_end_forces(elements, model.element_loads)
+
+        d_global = numpy.zeros(n_dofs)
+        convergence_history = []
+        factorizations = 0
+        lu = None
+
+        for step in range(1, self._load_steps + 1):
+            factor = step/self._load_steps
+            d_global[:n_essential] = factor*d_prescribed[:n_essential]
+            f_f = factor*f_global[n_essential:]
+            history = []
+
+            while True:
+                axial_forces = self.get_axial_forces(elements, indices, kernels.to_global_axes(rotation, d_global), factor*fixed_end_forces)
+                k_global = kernels.assemble(indices, kernels.get_global_stiffness(elements, axial_forces), n_dofs)
+                k_global = kernels.rotate_matrix(rotation, k_global)
+                k_ff = k_global[n_essential:, n_essential:]
+                k_fe = k_global[n_essential:, :n_essential]
+
+                residual = f_f - k_fe.dot(d_global[:n_essential]) - k_ff.dot(d_global[n_essential:])
+                history.append(numpy.linalg.norm(residual))
+
+                reference = numpy.linalg.norm(f_f - k_fe.dot(d_global[:n_essential])) or 1.0
+                if history[-1] <= self._tolerance*reference:
+                    break
+
+                if len(history) > self._max_iterations:
+                    raise RuntimeError('P-Delta analysis did not converge in load step {}'.format(step))
+
+                if lu is None or not self._modified_newton or (len(history) > 1 and history[-1] >= history[-2]):
+                    lu = scipy.sparse.linalg.splu(k_ff.tocsc())
+                    factorizations += 1
+
+                d_global[n_essential:] += lu.solve(residual)
+
+            convergence_history.append(history)
+
+        equation = equations.LinearStatic(dof_map, k_global, d_prescribed, f_global, essential_global_dofs)
+        equation.d_f = d_global[n_essential:].copy()
+
+        return PDelta.Results(model, equation, dof_map, axial_forces, convergence_history, factorizations)
+
+
+class LinearBuckling(LinearStatic):
+    """Performs a linear buckling analysis on a LinearElastic model
+
+    The axial forces of a preliminary linear static analysis define the geometric
+    stiffness K_G, and the critical load factors solve (K + factor*K_G)*mode = 0.
+    The lowest factors are computed with eigsh as the largest eigenvalues of the
+    inverted problem -K_G*mode = K*mode/(factor - shift), with K + shift*K_G factorized
+    once, so that no dense matrix is ever formed. The shift must lie below the first
+    critical load factor, so that K + shift*K_G stays positive definite.
+    """
+
+
+    class Results:
+        """Stores the results of a buckling analysis"""
+
+        def __init__(self, static_results, load_factors, modes):
+            self._static_results = static_results
+            self._load_factors = load_factors
+            self._modes = modes
+
+        def get_static_results(self) -> LinearStatic.Results:
+            """Returns the results of the preliminary linear static analysis"""
+            return self._static_results
+
+        def get_load_factors(self) -> numpy.array:
+            """Returns the critical load factors, in increasing order"""
+            return self._load_factors
+
+        def get_dof_order(self):
+            return self._static_results.get_dof_order()
+
+        def get_nodes(self):
+            """Returns the nodes of the model, in the order used by the mode shape arrays"""
+            return self._static_results.get_nodes()
+
+        def get_mode_shapes(self) -> numpy.array:
+            """Returns the (n_modes, n_nodes, 3) [dx, dy, rz] buckling mode shapes, scaled to a unit maximum"""
+
+            nodes, positions = kernels.get_nodal_layout(self.get_dof_order())
+            return kernels.to_nodal_array(positions, len(nodes), self._modes)
+
+
+    def __init__(self, modes: int = 1, shift: float = 0.0):
+        super().__init__()
+        self._modes: int = modes
+        self._shift: float = shift
+
+
+    def generate_global_geometric_stiffness_matrix(self, elements, dof_order, axial_forces):
+        """given a set of elements, their axial forces and a node ordering, generates a global geometric stiffness matrix"""
+
+        lengths, cosines, sines = kernels.get_geometry(elements)
+        EA, EI, bending = kernels.get_properties(elements)
+        k_elements = kernels.to_global(kernels.get_geometric_stiffness(lengths, axial_forces, bending), cosines, sines)
+
+        k_g = kernels.assemble(kernels.get_nodal_dof_indices(elements, dof_order), k_elements, len(dof_order))
+
+        return kernels.rotate_matrix(kernels.get_nodal_rotation(dof_order), k_g)
+
+
+    def run(self, model):
+        """Runs a linear buckling analysis on a linear elastic model"""
+
+        static_results = super().run(model)
+        equation = static_results.get_equation()
+        dof_map = static_results.get_dof_order()
+        n_essential = len(equation.d_e)
+
+        member_forces = static_results.get_member_forces()
+        axial_forces = 0.5*(member_forces[:, 3] - member_forces[:, 0])
+
+        k_g = self.generate_global_geometric_stiffness_matrix(model.elements, dof_map, axial_forces)
+        k_g_ff = k_g[n_essential:, n_essential:].tocsc()
+        k_ff = (equation.k_ff + self._shift*k_g_ff).tocsc()
+
+        import scipy.sparse.linalg
+
+        # symmetric mode pivots on the diagonal, so the signs of U's diagonal are the inertia of k_ff
+        lu = scipy.sparse.linalg.splu(k_ff, permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.0, options=dict(SymmetricMode=True))
+        if self._shift != 0.0:
+            below = numpy.count_nonzero(lu.U.diagonal() <= 0)
+            if below > 0:
+                raise ValueError("shift {} lies above {} critical load factor(s); it must lie below the first one".format(self._shift, below))
+
+        k_inv = scipy.sparse.linalg.LinearOperator(k_ff.shape, matvec=lu.solve, dtype=float)
+        n_modes = min(self._modes, k_ff.shape[0] - 1)
+        eigenvalues, eigenvectors = scipy.sparse.linalg.eigsh(-k_g_ff, k=n_modes, M=k_ff, Minv=k_inv, which='LA')
+
+        # with the shift below every critical load factor, only compressive modes have a positive eigenvalue
+        positive = eigenvalues > 0
+        order = numpy.argsort(-eigenvalues[positive])
+        load_factors = self._shift + 1.0/eigenvalues[positive][order]
+        eigenvectors = eigenvectors[:, positive][:, order]
+
+        modes = numpy.zeros((len(load_factors), len(dof_map)))
+        modes[:, n_essential:] = eigenvectors.T
+        modes /= numpy.abs(modes).max(axis=1, keepdims=True)
+
+        return LinearBuckling.Results(static_results, load_factors, modes)
+
+
+class Harmonic(LinearStatic):
+    """Performs a harmonic (frequency response) analysis on a LinearElastic model
+
+    The loads of the model are applied as amplitudes f*exp(i*w*t), and the complex
+    displacement amplitudes solve (K - w^2*M + i*w*C)*d = f at each angular
+    frequency w, with the consistent element mass matrices and fixed supports.
+
+    With the 'modal' method, the lowest modes are computed once by eigsh in
+    shift-invert mode, which reuses the factorization of K, and the response at all
+    frequencies is the modal sum d(w) = sum(phi*phi^T*f/(w_i^2 - w^2 + 2i*zeta_i*w_i*w)),
+    evaluated as one matrix product.  All modes are computed by a dense eigensolver
+    if modes is at least the number of free DoFs.  The 'direct' method factorizes
+    the dynamic stiffness at every frequency, and is meant to validate the modal one.
+    """
+
+
+    class Results:
+        """Stores the results of a harmonic analysis"""
+
+        def __init__(self, model, dof_order, frequencies, displacements, natural_frequencies, modes):
+            self._model = model
+            self._dof_order = dof_order
+            self._frequencies = frequencies
+            self._displacements = displacements
+            self._natural_frequencies = natural_frequencies
+            self._modes = modes
+
+        def get_model(self):
+            return self._model
+
+        def get_dof_order(self):
+            return self._dof_order
+
+        def get_frequencies(self) -> numpy.array:
+            """Returns the angular excitation frequencies, in rad/s"""
+            return self._frequencies
+
+        def get_natural_frequencies(self) -> numpy.array:
+            """Returns the angular natural frequencies of the modes used, in rad/s, or None with the direct method"""
+            return self._natural_frequencies
+
+        def get_nodes(self):
+            """Returns the nodes of the model, in the order used by the nodal result arrays"""
+
+            nodes, positions = kernels.get_nodal_layout(self._dof_order)
+            return nodes
+
+        def get_mode_shapes(self) -> numpy.array:
+            """Returns the (n_modes, n_nodes, 3) [dx, dy, rz] mass-normalized mode shapes, or None with the direct method"""
+
+            if self._modes is None:
+                return None
+
+            nodes, positions = kernels.get_nodal_layout(self._dof_order)
+            return kernels.to_nodal_array(positions, len(nodes), self._modes)
+
+        def get_displacements(self) -> numpy.array:
+            """Returns the (n_frequencies, n_dofs) complex displacement amplitudes, following the DoF order"""
+            return self._displacements
+
+        def get_nodal_displacements(self) -> numpy.array:
+            """Returns the (n_frequencies, n_nodes, 3) complex [dx, dy, rz] displacement amplitudes of each node"""
+
+            nodes, positions = kernels.get_nodal_layout(self._dof_order)
+            return kernels.to_nodal_array(positions, len(nodes), self._displacements)
+
+
+    METHODS = ('modal', 'direct')
+
+
+    def __init__(self, modes: int = 10, damping_ratio=0.0, rayleigh=None, method: str = 'modal'):
+        """
+        Args:
+            modes: number of modes of the modal sum
+            damping_ratio: modal damping ratio, either one for all modes or one per mode
+            rayleigh: (alpha, beta) coefficients of the Rayleigh damping C = alpha*M + beta*K,
+                which is added to damping_ratio as zeta_i = alpha/(2*w_i) + beta*w_i/2
+            method: either 'modal' or 'direct', which requires Rayleigh damping only
+        """
+
+        if method not in Harmonic.METHODS:
+            raise ValueError('unknown method: {}'.format(method))
+        if method == 'direct' and numpy.any(numpy.asarray(damping_ratio) != 0):
+            raise ValueError('the direct method only supports Rayleigh damping')
+
+        super().__init__()
+        self._modes: int = modes
+        self._damping_ratio = damping_ratio
+        self._rayleigh = rayleigh or (0.0, 0.0)
+        self._method: str = method
+
+
+    def generate_global_mass_matrix(self, elements, dof_order):
+        """given a set of elements and a node ordering, generates a global consistent mass matrix"""
+
+        m_global = kernels.assemble(kernels.get_nodal_dof_indices(elements, dof_order), kernels.get_global_mass(elements), len(dof_order))
+
+        return kernels.rotate_matrix(kernels.get_nodal_rotation(dof_order), m_global)
+
+
+    def get_modes(self, k_ff, m_ff) -> (numpy.array, numpy.array):
+        """Returns the lowest angular natural frequencies and their (n_free, n_modes) mass-normalized modes"""
+
+        n_free = k_ff.shape[0]
+
+        if self._modes >= n_free:
+            import scipy.linalg
+
+            eigenvalues, modes = scipy.linalg.eigh(k_ff.toarray(), m_ff.toarray())
+        else:
+            import scipy.sparse.linalg
+
+            solve = solvers.DirectSolver().factorize(k_ff)
+            k_inv = scipy.sparse.linalg.LinearOperator(k_ff.shape, matvec=solve, dtype=float)
+            eigenvalues, modes = scipy.sparse.linalg.eigsh(k_ff, k=self._modes, M=m_ff, sigma=0.0, OPinv=k_inv, which='LM')
+            order = numpy.argsort(eigenvalues)
+            eigenvalues, modes = eigenvalues[order], modes[:, order]
+
+        return numpy.sqrt(numpy.maximum(eigenvalues, 0.0)), modes
+
+
+    def get_damping_ratios(self, natural_frequencies) -> numpy.array:
+        """Returns the damping ratio of each mode"""
+
+        alpha, beta = self._rayleigh
+        zeta = numpy.broadcast_to(numpy.asarray(self._damping_ratio, dtype=float), natural_frequencies.shape)
+
+        return zeta + alpha/(2*natural_frequencies) + beta*natural_frequencies/2
+
+
+    def run(self, model, frequencies):
+        """Runs a harmonic analysis on a linear elastic model
+
+        Args:
+            model: linear elastic model with fixed supports, whose loads are the amplitudes of the excitation
+            frequencies: angular excitation frequencies, in rad/s
+        """
+
+        if any(pd.value != 0 for pd in model.prescribed_displacements):
+            raise ValueError('harmonic analyses only support fixed supports')
+
+        frequencies = numpy.atleast_1d(numpy.asarray(frequencies, dtype=float))
+        dof_map, essential_global_dofs = self.get_global_dof_map(model)
+        n_essential = len(essential_global_dofs)
+        self.check_model(model, dof_map, essential_global_dofs)
+
+        k_ff = self.generate_global_stiffness_matrix(model.elements, dof_map)[n_essential:, n_essential:].tocsc()
+        m_ff = self.generate_global_mass_matrix(model.elements, dof_map)[n_essential:, n_essential:].tocsc()
+        f_f = self.generate_global_force_vector(model.prescribed_forces, dof_map, model.element_loads)[n_essential:]
+
+        if m_ff.nnz == 0 or not numpy.any(m_ff.diagonal() > 0):
+            raise ValueError('the model has no mass, as the density of its materials is zero')
+
+        d_f = numpy.zeros((len(frequencies), k_ff.shape[0]), dtype=complex)
+        natural_frequencies = None
+        modes = None
+
+        if self._method == 'modal':
+            natural_frequencies, shapes = self.get_modes(k_ff, m_ff)
+            zeta = self.get_damping_ratios(natural_frequencies)
+
+            # (n_frequencies, n_modes) modal receptances
+            w = frequencies[:, numpy.newaxis]
+            receptances = 1.0/(natural_frequencies**2 - w**2 + 2j*zeta*natural_frequencies*w)
+            d_f = (receptances*shapes.T.dot(f_f)).dot(shapes.T)
+
+            modes = numpy.zeros((shapes.shape[1], len(dof_map)))
+            modes[:, n_essential:] = shapes.T
+        else:
+            import scipy.sparse.linalg
+
+            alpha, beta = self._rayleigh
+            c_ff = alpha*m_ff + beta*k_ff
+            for i, w in enumerate(frequencies):
+                d_f[i] = scipy.sparse.linalg.splu((k_ff - w**2*m_ff + 1j*w*c_ff).tocsc()).solve(f_f.astype(complex))
+
+        displacements = numpy.zeros((len(frequencies), len(dof_map)), dtype=complex)
+        displacements[:, n_essential:] = d_f
+
+        return Harmonic.Results(model, dof_map, frequencies, displacements, natural_frequencies, modes)
+
+
+class ExplicitDynamics(LinearStatic):
+    """Performs an explicit dynamic analysis of a truss of Bar2 elements with large displacements
+
+    The equation of motion M*a = f_ext - f_int is integrated by the central difference
+    method with a lumped mass matrix, which holds half of the mass of each bar at each
+    of its nodes, so that each step only takes a vector division and no factorization.
+    Internal forces are corotational: the axial force of each bar follows from its
+    current length, N = EA*(l - L)/L, and acts along its current direction, which
+    handles arbitrarily large rotations.  They are evaluated for all bars at once.
+
+    The method is only stable below the critical time step, estimated as the smallest
+    time a wave takes to cross a bar, min(L/sqrt(E/rho)), times a safety factor.
+    Prescribed displacements are held at their values from the start.
+    """
+
+
+    class Results:
+        """Stores the results of an explicit dynamic analysis at its output steps"""
+
+        def __init__(self, model, dof_order, time_step, times, displacements, velocities, axial_forces):
+            self._model = model
+            self._dof_order = dof_order
+            self._time_step = time_step
+            self._times = times
+            self._displacements = displacements
+            self._velocities = velocities
+            self._axial_forces = axial_forces
+
+        def get_model(self):
+            return self._model
+
+        def get_dof_order(self):
+            return self._dof_order
+
+        def get_time_step(self) -> float:
+            """Returns the time step used by the integration"""
+            return self._time_step
+
+        def get_times(self) -> numpy.array:
+            """Returns the times of the output steps"""
+            return self._times
+
+        def get_nodes(self):
+            """Returns the nodes of the model, in the order used by the nodal result arrays"""
+
+            nodes, positions = kernels.get_nodal_layout(self._dof_order)
+            return nodes
+
+        def get_displacements(self) -> numpy.array:
+            """Returns the (n_outputs, n_dofs) displacements at each output step, following the DoF order"""
+            return self._displacements
+
+        def get_velocities(self) -> numpy.array:
+            """Returns the (n_outputs, n_dofs) velocities at each output step, following the DoF order"""
+            return self._velocities
+
+        def get_nodal_displacements(self) -> numpy.array:
+            """Returns the (n_outputs, n_nodes, 3) [dx, dy, rz] displacements of each node at each output step"""
+
+            nodes, positions = kernels.get_nodal_layout(self._dof_order)
+            return kernels.to_nodal_array(positions, len(nodes), self._displacements)
+
+        def get_axial_forces(self) -> numpy.array:
+            """Returns the (n_outputs, n_elements) axial forces of each bar at each output step, positive in tension"""
+            return self._axial_forces
+
+
+    def __init__(self, time_step: float = None, safety_factor: float = 0.9, damping: float = 0.0, output_interval: int = 1):
+        """
+        Args:
+            time_step: time step of the integration, which defaults to the critical
+                time step times the safety factor
+            safety_factor: ratio between the default time step and the critical one
+            damping: coefficient alpha of the mass proportional damping C = alpha*M
+            output_interval: number of steps between stored results, so that the memory
+                used by long analyses is bounded by the number of output steps
+        """
+
+        if output_interval < 1:
+            raise ValueError('the output interval must be at least 1')
+
+        super().__init__(check=False)
+        self._time_step: float = time_step
+        self._safety_factor: float = safety_factor
+        self._damping: float = damping
+        self._output_interval: int = output_interval
+
+
+    def get_critical_time_step(self, elements) -> float:
+        """Returns the critical time step of the central difference method, min(L/sqrt(E/rho))"""
+
+        lengths, cosines, sines = kernels.get_geometry(elements)
+        E = numpy.array([elem.material.young_modulus for elem in elements], dtype=float)
+        rho = numpy.array([elem.material.density for elem in elements], dtype=float)
+
+        if numpy.any(rho <= 0):
+            raise ValueError('explicit dynamics requires a positive density for all elements')
+
+        return float(numpy.min(lengths*numpy.sqrt(rho/E)))
+
+
+    def generate_lumped_mass_vector(self, elements, dof_order) -> numpy.array:
+        """Returns the lumped mass of each global DoF, which is the same on both axes of a node"""
+
+        lengths, cosines, sines = kernels.get_geometry(elements)
+        ends = kernels.get_nodal_dof_indices(elements, dof_order)[:, [0, 1, 3, 4]]
+        halves = 0.5*kernels.get_mass_per_length(elements)*lengths
+
+        return kernels.scatter(ends, numpy.repeat(halves, 4), len(dof_order))
+
+
+    def run(self, model, duration: float, load_factor=None, velocities=None):
+        """Runs an explicit dynamic analysis on a truss model
+
+        Args:
+            model: model of Bar2 elements, whose loads are multiplied by the load factor
+            duration: time span of the analysis
+            load_factor: function of the time which returns the factor of the loads,
+                which are applied at once if it is not given
+            velocities: initial velocities of all global DoFs, following the DoF order
+        """
+
+        elements = model.elements
+        if not all(isinstance(elem, Bar2) for elem in elements):
+            raise ValueError('explicit dynamics only supports Bar2 elements')
+
+        dof_map, essential_global_dofs = self.get_global_dof_map(model)
+        n_dofs = len(dof_map)
+        free = slice(len(essential_global_dofs), n_dofs)
+
+        f_ext = self.generate_global_force_vector(model.prescribed_forces, dof_map, model.element_loads)
+        u = self.generate_global_dof_vector(model.prescribed_displacements, dof_map)
+        m = self.generate_lumped_mass_vector(elements, dof_map)
+        if numpy.any(m[free] <= 0):
+            raise ValueError('explicit dynamics requires mass on all free DoFs')
+
+        critical = self.get_critical_time_step(elements)
+        time_step = self._time_step or self._safety_factor*critical
+        steps = max(int(numpy.ceil(duration/time_step)), 1)
+        dt = duration/steps
+        load_factor = load_factor or (lambda t: 1.0)
+
+        # bar geometry, with missing DoFs pointing to a trailing zero
+        coordinates = numpy.array([[elem.nodes[0].position, elem.nodes[-1].position] for elem in elements], dtype=float).reshape(-1, 4)
+        ends = kernels.get_nodal_dof_indices(elements, dof_map)[:, [0, 1, 3, 4]]
+        ends = numpy.where(ends < 0, n_dofs, ends)
+        lengths, cosines, sines = kernels.get_geometry(elements)
+        EA, EI, bending = kernels.get_properties(elements)
+        rotation = kernels.get_nodal_rotation(dof_map)
+
+        def get_internal_forces(u_nodal):
+            u_global = numpy.append(kernels.to_global_axes(rotation, u_nodal), 0.0)
+            x = coordinates + u_global[ends]
+            r = x[:, 2:] - x[:, :2]
+            current = numpy.hypot(r[:, 0], r[:, 1])
+            axial = EA*(current/lengths - 1.0)
+            g = (axial/current)[:, numpy.newaxis]*r
+            f_int = kernels.scatter(ends, numpy.hstack((-g, g)), n_dofs + 1)[:n_dofs]
+
+            return kernels.to_nodal_axes(rotation, f_int), axial
+
+        # output steps, always including the last one
+        outputs = numpy.arange(0, steps + 1, self._output_interval)
+        if outputs[-1] != steps:
+            outputs = numpy.append(outputs, steps)
+        displacements = numpy.zeros((len(outputs), n_dofs))
+        velocity_history = numpy.zeros((len(outputs), n_dofs))
+        axial_forces = numpy.zeros((len(outputs), len(elements)))
+
+        v = numpy.zeros(n_dofs)
+        if velocities is not None:
+            v[free] = numpy.asarray(velocities, dtype=float)[free]
+
+        f_int, axial = get_internal_forces(u)
+        a = numpy.zeros(n_dofs)
+        a[free] = (load_factor(0.0)*f_ext[free] - f_int[free])/m[free]
+        displacements[0], velocity_history[0], axial_forces[0] = u, v, axial
+
+        # velocities at half steps, with mass proportional damping
+        alpha = self._damping
+        v_half = v + 0.5*dt*(a - alpha*v)
+        output = 1
+
+        for step in range(1, steps + 1):
+            u[free] += dt*v_half[free]
+            f_int, axial = get_internal_forces(u)
+            a[free] = (load_factor(step*dt)*f_ext[free] - f_int[free])/m[free]
+            v_next = ((1.0 - 0.5*alpha*dt)*v_half + dt*a)/(1.0 + 0.5*alpha*dt)
+
+            if output < len(outputs) and outputs[output] == step:
+                displacements[output] = u
+                velocity_history[output] = 0.5*(v_half + v_next)
+                axial_forces[output] = axial
+                output += 1
+
+            v_half = v_next
+
+        return ExplicitDynamics.Results(model, dof_map, dt, outputs*dt, displacements, velocity_history, axial_forces)
@@ -0,0 +1,549 @@
+"""
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy
+from barman import kernels
+
+
+def get_element_arrays(elements, dof_order) -> (numpy.array, numpy.array):
+    """Returns the (n, 6) [L, c, s, EA, EI, bending] properties and the (n, 6) nodal DoF indices of a list of elements"""
+
+    lengths, cosines, sines = kernels.get_geometry(elements)
+    EA, EI, bending = kernels.get_properties(elements)
+    properties = numpy.column_stack((lengths, cosines, sines, EA, EI, bending))
+
+    return properties, kernels.get_nodal_dof_indices(elements, dof_order)
+
+
+def get_chunk_stiffness(properties) -> numpy.array:
+    """Returns the (n, 6, 6) global stiffness matrices of a chunk of element property rows"""
+
+    L, c, s, EA, EI, bending = properties.T
+
+    return kernels.get_global_stiffness_from_arrays(L, c, s, EA, EI, bending.astype(bool))
+
+
+class SerialAssembler:
+    """Assembles the global stiffness matrix in the calling process
+
+    Attributes:
+        compression_ratio: number of elements per distinct element matrix in the
+            last assembly, if elements are deduplicated, and None otherwise
+    """
+
+    _dtype = numpy.dtype(numpy.float64)
+    _tolerance = None
+    compression_ratio = None
+
+
+    def __init__(self, dtype=numpy.float64, deduplicate: bool = False, tolerance: float = kernels.DEDUPLICATION_TOLERANCE):
+        """
+        Args:
+            dtype: floating point type of the assembled matrix
+            deduplicate: whether to group elements with the same type, length, orientation,
+                section and material, so that each distinct matrix is only computed once
+            tolerance: relative tolerance of the properties of elements which share a matrix
+        """
+
+        self._dtype = numpy.dtype(dtype)
+        self._tolerance = tolerance if deduplicate else None
+
+
+    @property
+    def tolerance(self) -> float:
+        """Relative tolerance of the properties of elements which share a matrix, or None if elements are not deduplicated"""
+        return self._tolerance
+
+
+    def assemble(self, elements, dof_order):
+        """Returns the global stiffness matrix of a list of elements"""
+
+        properties, indices = get_element_arrays(elements, dof_order)
+        if self._tolerance is None or len(properties) == 0:
+            return kernels.assemble(indices, get_chunk_stiffness(properties), len(dof_order), self._dtype)
+
+        first, groups = kernels.deduplicate(properties.T, self._tolerance)
+        self.compression_ratio = len(properties)/len(first)
+
+        return kernels.assemble(indices, get_chunk_stiffness(properties[first]), len(dof_order), self._dtype, groups)
+
+
+class SharedArrays:
+    """A set of numpy arrays backed by shared memory blocks, usable as a context manager"""
+
+    def __init__(self, specification, create: bool = False):
+        """
+        Args:
+            specification: maps each array name to its (shape, dtype), and also to the
+                block name when attaching to existing blocks
+            create: creates new blocks instead of attaching to existing ones
+        """
+
+        self._blocks = dict()
+        self._arrays = dict()
+        self._create: bool = create
+
+        for name, spec in specification.items():
+            shape, dtype = spec[0], numpy.dtype(spec[1])
+            size = max(int(numpy.prod(shape))*dtype.itemsize, 1)
+
+            if create:
+                block = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                block = shared_memory.SharedMemory(name=spec[2])
+
+            self._blocks[name] = block
+            self._arrays[name] = numpy.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    @property
+    def specification(self):
+        """Returns the specification used to attach to these blocks from another process"""
+
+        return {name: (array.shape, array.dtype.str, self._blocks[name].name) for name, array in self._arrays.items()}
+
+    def __getitem__(self, name) -> numpy.array:
+        return self._arrays[name]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        """Releases the blocks, and destroys them if they were created by this object"""
+
+        self._arrays.clear()
+        for block in self._blocks.values():
+            block.close()
+            if self._create:
+                block.unlink()
+        self._blocks.clear()
+
+
+def _assemble_chunk(specification, start: int, stop: int) -> None:
+    """Computes the COO triplets of elements [start, stop) into shared memory buffers"""
+
+    with SharedArrays(specification) as shared:
+        k = get_chunk_stiffness(shared['properties'][start:stop])
+        rows, columns, values = kernels.get_triplets(shared['indices'][start:stop], k)
+
+        entries = slice(start*36, stop*36)
+        shared['rows'][entries] = rows
+        shared['columns'][entries] = columns
+        shared['values'][entries] = values
+
+        del k, rows, columns, values
+
+
+class ParallelAssembler:
+    """Assembles the global stiffness matrix in a pool of worker processes
+
+    Elements are split into chunks whose element matrices and COO triplets are
+    computed by the workers directly into shared memory buffers, which are then
+    reduced into a single CSR matrix.  Each triplet is written at a position which
+    only depends on its element, so the result is identical to SerialAssembler.
+    """
+
+    def __init__(self, workers: int = None, chunk_size: int = None):
+        """
+        Args:
+            workers: number of worker processes, which defaults to the number of CPUs
+            chunk_size: number of elements per chunk, which defaults to a few chunks per worker
+        """
+
+        self._workers: int = workers or os.cpu_count() or 1
+        self._chunk_size: int = chunk_size
+
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+
+    def get_chunks(self, n_elements: int):
+        """Returns the [start, stop) element ranges of each chunk"""
+
+        chunk_size = self._chunk_size or max(1, -(-n_elements//(4*self._workers)))
+
+        return [(start, min(start + chunk_size, n_elements)) for start in range(0, n_elements, chunk_size)]
+
+
+    def assemble(self, elements, dof_order):
+        """Returns the global stiffness matrix of a list of elements"""
+
+        properties, indices = get_element_arrays(elements, dof_order)
+        n_entries = 36*len(elements)
+
+        specification = {
+            'properties': (properties.shape, properties.dtype),
+            'indices': (indices.shape, indices.dtype),
+            'rows': ((n_entries,), numpy.int64),
+            'columns': ((n_entries,), numpy.int64),
+            'values': ((n_entries,), numpy.float64),
+        }
+
+        with SharedArrays(specification, create=True) as shared:
+            shared['properties'][:] = properties
+            shared['indices'][:] = indices
+            chunks = self.get_chunks(len(elements))
+
+            if self._workers == 1:
+                for start, stop in chunks:
+                    _assemble_chunk(shared.specification, start, stop)
+            else:
+                with ProcessPoolExecutor(max_workers=self._workers) as pool:
+                    futures = [pool.submit(_assemble_chunk, shared.specification, start, stop) for start, stop in chunks]
+                    for future in futures:
+                        future.result()
+
+            return kernels.assemble_triplets(shared['rows'], shared['columns'], shared['values'], len(dof_order))
+
+
+class OutOfCoreAssembler:
+    """Assembles the global stiffness matrix through disk-backed COO triplet buffers
+
+    Element blocks are streamed into numpy.memmap triplet files, which are then
+    distributed into bands of rows and compressed one band at a time into CSR, so
+    that the triplets never need to be held in memory at once.  Apart from the
+    resulting matrix and O(n_dofs) counters, memory use is bounded by memory_budget.
+    """
+
+    # bytes used by each triplet: int64 row, int64 column and float64 value
+    TRIPLET_BYTES = 24
+
+
+    def __init__(self, memory_budget: int = 256*2**20, directory: str = None):
+        """
+        Args:
+            memory_budget: approximate number of bytes used for triplet buffers in memory
+            directory: directory of the temporary triplet files, which defaults to the system's
+        """
+
+        self._memory_budget: int = memory_budget
+        self._directory: str = directory
+
+
+    @property
+    def memory_budget(self) -> int:
+        return self._memory_budget
+
+
+    def get_block_size(self) -> int:
+        """Returns the number of triplets processed at once"""
+
+        # leave room for the temporaries of each pass
+        return max(36, self._memory_budget//(4*self.TRIPLET_BYTES))
+
+
+    def write_triplets(self, elements, dof_order, directory) -> (numpy.memmap, numpy.memmap, numpy.memmap, int):
+        """Streams the valid COO triplets of all elements into memmap files, returning them and their count"""
+
+        properties, indices = get_element_arrays(elements, dof_order)
+        capacity = max(36*len(elements), 1)
+        rows = numpy.memmap(os.path.join(directory, 'rows'), dtype=numpy.int64, mode='w+', shape=(capacity,))
+        columns = numpy.memmap(os.path.join(directory, 'columns'), dtype=numpy.int64, mode='w+', shape=(capacity,))
+        values = numpy.memmap(os.path.join(directory, 'values'), dtype=numpy.float64, mode='w+', shape=(capacity,))
+
+        count = 0
+        block_elements = max(1, self.get_block_size()//36)
+        for start in range(0, len(elements), block_elements):
+            stop = start + block_elements
+            block_rows, block_columns, block_values = kernels.get_triplets(indices[start:stop], get_chunk_stiffness(properties[start:stop]))
+
+            mask = (block_rows >= 0) & (block_columns >= 0)
+            n = numpy.count_nonzero(mask)
+            rows[count:count + n] = block_rows[mask]
+            columns[count:count + n] = block_columns[mask]
+            values[count:count + n] = block_values[mask]
+            count += n
+
+        return rows, columns, values, count
+
+
+    def get_bands(self, row_counts) -> numpy.array:
+        """Returns the row boundaries of bands holding at most one block of triplets each"""
+
+        block_size = self.get_block_size()
+        cumulative = numpy.concatenate(([0], numpy.cumsum(row_counts)))
+
+        bands = [0]
+        while bands[-1] < len(row_counts):
+            start = bands[-1]
+            stop = numpy.searchsorted(cumulative, cumulative[start] + block_size, side='right') - 1
+            bands.append(max(stop, start + 1))
+
+        return numpy.array(bands, dtype=numpy.int64)
+
+
+    def assemble(self, elements, dof_order):
+        """Returns the global stiffness matrix of a list of elements"""
+
+        import scipy.sparse
+
+        size = len(dof_order)
+        block_size = self.get_block_size()
+
+        with tempfile.TemporaryDirectory(dir=self._directory) as directory:
+            rows, columns, values, count = self.write_triplets(elements, dof_order, directory)
+
+            # first pass: count triplets per row, and split rows into bands
+            row_counts = numpy.zeros(size, dtype=numpy.int64)
+            for start in range(0, count, block_size):
+                row_counts += numpy.bincount(rows[start:start + block_size], minlength=size)
+
+            bands = self.get_bands(row_counts)
+            band_offsets = numpy.concatenate(([0], numpy.cumsum(row_counts)[bands[1:] - 1]))
+
+            # second pass: distribute triplets into their bands
+            band_rows = numpy.memmap(os.path.join(directory, 'band_rows'), dtype=numpy.int64, mode='w+', shape=(max(count, 1),))
+            band_columns = numpy.memmap(os.path.join(directory, 'band_columns'), dtype=numpy.int64, mode='w+', shape=(max(count, 1),))
+            band_values = numpy.memmap(os.path.join(directory, 'band_values'), dtype=numpy.float64, mode='w+', shape=(max(count, 1),))
+
+            fill = band_offsets[:-1].copy()
+            for start in range(0, count, block_size):
+                block_rows = numpy.asarray(rows[start:start + block_size])
+                band = numpy.searchsorted(bands, block_rows, side='right') - 1
+
+                order = numpy.argsort(band, kind='stable')
+                sorted_band = band[order]
+                band_counts = numpy.bincount(band, minlength=len(fill))
+                band_starts = numpy.cumsum(band_counts) - band_counts
+                destination = fill[sorted_band] + numpy.arange(len(order)) - band_starts[sorted_band]
+
+                band_rows[destination] = block_rows[order]
+                band_columns[destination] = columns[start:start + block_size][order]
+                band_values[destination] = values[start:start + block_size][order]
+                fill += band_counts
+
+            # third pass: compress each band into CSR
+            indptr = numpy.zeros(size + 1, dtype=numpy.int64)
+            indices = []
+            data = []
+            for i in range(len(bands) - 1):
+                start, stop = band_offsets[i], band_offsets[i + 1]
+                row_start, row_stop = bands[i], bands[i + 1]
+
+                band = scipy.sparse.coo_matrix((band_values[start:stop], (band_rows[start:stop] - row_start, band_columns[start:stop])), shape=(row_stop - row_start, size)).tocsr()
+                band.sum_duplicates()
+                band.sort_indices()
+
+                indptr[row_start + 1:row_stop + 1] = indptr[row_start] + band.indptr[1:]
+                indices.append(band.indices.astype(numpy.int64))
+                data.append(band.data)
+
+            del rows, columns, values, band_rows, band_columns, band_values
+
+        indices = numpy.concatenate(indices) if indices else numpy.zeros(0, dtype=numpy.int64)
+        data = numpy.concatenate(data) if data else numpy.zeros(0)
+
+        return scipy.sparse.csr_matrix((data, indices, indptr), shape=(size, size))
+
+
+class AssemblyPlan:
+    """The sparsity structure of the partitioned global stiffness matrix of a model topology
+
+    A plan stores the DoF map, the CSR pattern of the k_ee, k_ef, k_fe and k_ff
+    partitions and the data slot of each element matrix entry.  Models which share
+    the topology, DoF map and element order of the plan, but differ in their stiffness
+    values, are then assembled by summing element matrix entries into the existing
+    CSR data arrays, without building any new index structures.  Matrices are refilled
+    in place, so the equations of earlier results which used the plan change as well.
+    If nodes of the plan are rotated, element matrices are rotated to the nodal
+    coordinate systems before they are summed, which keeps the same pattern.
+    """
+
+    # partitions, by essential (e) and free (f) DoFs
+    BLOCKS = ('ee', 'ef', 'fe', 'ff')
+
+
+    def __init__(self, elements, dof_order, essential_global_dofs):
+        """
+        Args:
+            elements: elements of the model, in the order used by every assembly
+            dof_order: DoF map, with essential DoFs first
+            essential_global_dofs: set of essential global DoFs
+        """
+
+        import scipy.sparse
+
+        self._dof_order = dof_order
+        self._essential_global_dofs = essential_global_dofs
+        self._n_elements: int = len(elements)
+        self._rotations = kernels.get_element_nodal_rotations(elements)
+
+        n_essential = len(essential_global_dofs)
+        n_dofs = len(dof_order)
+        indices = kernels.get_nodal_dof_indices(elements, dof_order)
+        rows, columns, values = kernels.get_triplets(indices, numpy.zeros((len(elements), 6, 6)))
+
+        self._blocks = dict()
+        self._entries = dict()
+        self._slots = dict()
+        for name in self.BLOCKS:
+            row_range = (0, n_essential) if name[0] == 'e' else (n_essential, n_dofs)
+            column_range = (0, n_essential) if name[1] == 'e' else (n_essential, n_dofs)
+            shape = (row_range[1] - row_range[0], column_range[1] - column_range[0])
+
+            entries = numpy.flatnonzero((rows >= row_range[0]) & (rows < row_range[1]) & (columns >= column_range[0]) & (columns < column_range[1]))
+            block_rows = rows[entries] - row_range[0]
+            block_columns = columns[entries] - column_range[0]
+
+            # sorted unique (row, column) pairs are the CSR pattern, and each entry is summed into the slot of its pair
+            keys, slots = numpy.unique(block_rows*shape[1] + block_columns, return_inverse=True)
+            pattern_rows = keys//max(shape[1], 1)
+            indptr = numpy.concatenate(([0], numpy.cumsum(numpy.bincount(pattern_rows, minlength=shape[0]))))
+
+            self._blocks[name] = scipy.sparse.csr_matrix((numpy.zeros(len(keys)), keys % max(shape[1], 1), indptr), shape=shape)
+            self._entries[name] = entries
+            self._slots[name] = slots.ravel()
+
+
+    @property
+    def dof_order(self):
+        return self._dof_order
+
+    @property
+    def essential_global_dofs(self):
+        return self._essential_global_dofs
+
+    @property
+    def blocks(self):
+        """dict with the 'ee', 'ef', 'fe' and 'ff' CSR partitions of the global stiffness matrix"""
+        return self._blocks
+
+
+    def refill(self, matrices):
+        """Sums (n_elements, 6, 6) global element matrices into the partitions, and returns them"""
+
+        if numpy.size(matrices) != 36*self._n_elements:
+            raise ValueError('expected the matrices of {} elements'.format(self._n_elements))
+        if self._rotations is not None:
+            matrices = numpy.einsum('nij,njk,nlk->nil', self._rotations, numpy.reshape(matrices, (-1, 6, 6)), self._rotations)
+
+        values = numpy.ravel(matrices)
+
+        for name, block in self._blocks.items():
+            block.data[:] = numpy.bincount(self._slots[name], weights=values[self._entries[name]], minlength=len(block.data))
+
+        return self._blocks
+
+
+    def assemble(self, elements):
+        """Assembles the global stiffness matrix of elements into the partitions, and returns them"""
+
+        return self.refill(kernels.get_global_stiffness(elements))
+
+
+class StiffnessOperator:
+    """Applies the free DoF block k_ff of the global stiffness matrix without assembling it
+
+    Products gather the DoFs of each element, rotate them to local coordinates, apply
+    the local stiffness of all elements at once and scatter the results back, so only
+    the DoF indices and five scalars are stored per element.  Essential DoFs are masked
+    by gathering zeros in their place.  As it has shape, dtype and matvec, it can be
+    passed to the scipy.sparse.linalg iterative solvers, and its diagonal provides a
+    Jacobi preconditioner.  DoFs follow the coordinate systems of their nodes.
+    """
+
+    def __init__(self, elements, dof_order, n_essential: int):
+        """
+        Args:
+            elements: elements of the model
+            dof_order: DoF map, with essential DoFs first
+            n_essential: number of essential DoFs
+        """
+
+        self._n_dofs: int = len(dof_order)
+        self._n_essential: int = n_essential
+
+        lengths, cosines, sines = kernels.get_geometry(elements)
+        EA, EI, bending = kernels.get_properties(elements)
+        indices = kernels.get_nodal_dof_indices(elements, dof_order)
+
+        self._indices = indices.astype(numpy.int32 if self._n_dofs < 2**31 - 1 else numpy.int64)
+        self._lengths = lengths
+        self._cosines = cosines
+        self._sines = sines
+        self._axial = EA/lengths
+        self._flexural = numpy.where(bending, EI/lengths**3, 0.0)
+        self._rotation = kernels.get_nodal_rotation(dof_order)
+
+        n_free = self._n_dofs - n_essential
+        self.shape = (n_free, n_free)
+        self.dtype = numpy.dtype(float)
+
+
+    def apply(self, d_global) -> numpy.array:
+        """Returns the product of the whole global stiffness matrix by a vector of all DoFs"""
+
+        # entries whose index is -1 gather the appended zero
+        d_global = kernels.to_global_axes(self._rotation, numpy.ravel(d_global))
+        d = numpy.append(d_global, 0.0)[self._indices]
+        u1, v1, r1, u2, v2, r2 = kernels.rotate_to_local(d, self._cosines, self._sines).T
+
+        L = self._lengths
+        N = self._axial*(u2 - u1)
+        V = self._flexural*(12*(v1 - v2) + 6*L*(r1 + r2))
+        M1 = self._flexural*L*(6*(v1 - v2) + L*(4*r1 + 2*r2))
+        M2 = self._flexural*L*(6*(v1 - v2) + L*(2*r1 + 4*r2))
+
+        f = kernels.rotate_to_global(numpy.column_stack((-N, V, M1, N, -V, M2)), self._cosines, self._sines)
+
+        return kernels.to_nodal_axes(self._rotation, kernels.scatter(self._indices, f, self._n_dofs))
+
+
+    def matvec(self, x) -> numpy.array:
+        """Returns k_ff*x"""
+
+        d_global = numpy.concatenate((numpy.zeros(self._n_essential), numpy.ravel(x)))
+
+        return self.apply(d_global)[self._n_essential:]
+
+    rmatvec = matvec
+    dot = matvec
+
+
+    def diagonal(self) -> numpy.array:
+        """Returns the diagonal of k_ff"""
+
+        c2 = self._cosines**2
+        s2 = self._sines**2
+        k_vv = 12*self._flexural
+        k_rr = 4*self._flexural*self._lengths**2
+        nodal = numpy.column_stack((c2*self._axial + s2*k_vv, s2*self._axial + c2*k_vv, k_rr))
+        diagonal = kernels.scatter(self._indices, numpy.tile(nodal, 2), self._n_dofs)
+
+        if self._rotation is not None:
+            import scipy.sparse
+
+            # the rotated diagonal also depends on the coupling of the dx and dy DoFs of each node
+            coupling = numpy.repeat(self._cosines*self._sines*(self._axial - k_vv), 2)
+            rows = self._indices[:, [0, 3]].ravel()
+            columns = self._indices[:, [1, 4]].ravel()
+            mask = (rows >= 0) & (columns >= 0)
+            k_xy = scipy.sparse.coo_matrix((coupling[mask], (rows[mask], columns[mask])), shape=(self._n_dofs, self._n_dofs))
+            k_nodal = scipy.sparse.diags(diagonal) + k_xy + k_xy.T
+            diagonal = kernels.rotate_matrix(self._rotation, k_nodal).diagonal()
+
+        return diagonal[self._n_essential:]
@@ -0,0 +1,123 @@
+"""
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy
+from barman import dofs, elements, loads, materials, models, sections
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+
+
+ELEMENT_TYPES = {
+    'Bar2': elements.Bar2,
+    'EulerBernoulli': elements.EulerBernoulli,
+}
+
+
+def _per_element(value, n_elements):
+    """Broadcasts a scalar or per-element property to a list with one entry per element"""
+
+    if isinstance(value, str) or numpy.isscalar(value):
+        return [value]*n_elements
+
+    return list(value)
+
+
+def model_from_arrays(data) -> models.Static:
+    """Returns the static model described by data in the bulk array format
+
+    A model in the bulk array format is a dict of arrays, or of nested lists so that
+    it can be exchanged as JSON, with the following keys:
+
+        nodes: (n_nodes, 2) node coordinates
+        elements: (n_elements, 2) start and end node indices
+        element_types: element class name, either one for all elements or one per element
+        young_modulus, area, I_zz: element properties, either scalars or one per element
+        supports: (n, 3) rows of [node, parameter, value] prescribed displacements
+        forces: (n, 3) rows of [node, parameter, value] prescribed forces
+        element_loads: (n, 5) rows of [element, axial_start, transverse_start, axial_end,
+            transverse_end] local linear loads
+
+    Parameters are given by their dofs.Parameter value: 0 for dx, 1 for dy and 2 for rz.
+    """
+
+    nodes = [dofs.Node([float(x), float(y)]) for x, y in numpy.reshape(data['nodes'], (-1, 2))]
+    connectivity = numpy.reshape(numpy.asarray(data['elements'], dtype=numpy.int64), (-1, 2))
+    n_elements = len(connectivity)
+
+    element_types = _per_element(data.get('element_types', 'EulerBernoulli'), n_elements)
+    young_modulus = _per_element(data['young_modulus'], n_elements)
+    area = _per_element(data['area'], n_elements)
+    I_zz = _per_element(data.get('I_zz', 0.0), n_elements)
+
+    model = models.Static()
+    shared_materials = dict()
+    shared_sections = dict()
+    for i, (start, end) in enumerate(connectivity):
+        material = shared_materials.setdefault(young_modulus[i], materials.LinearElastic('', float(young_modulus[i]), 0.0))
+        section = shared_sections.setdefault((area[i], I_zz[i]), sections.Section(float(area[i]), float(I_zz[i])))
+        model.append_element( ELEMENT_TYPES[element_types[i]]([nodes[start], nodes[end]], section, material) )
+
+    for node, parameter, value in numpy.reshape(data.get('supports', []), (-1, 3)):
+        global_dof = dofs.GlobalDoF(nodes[int(node)], dofs.Parameter(int(parameter)))
+        model.append_prescribed_displacement( PrescribedDisplacement(global_dof, float(value)) )
+
+    for node, parameter, value in numpy.reshape(data.get('forces', []), (-1, 3)):
+        global_dof = dofs.GlobalDoF(nodes[int(node)], dofs.Parameter(int(parameter)))
+        model.append_prescribed_force( PrescribedForce(global_dof, float(value)) )
+
+    for element, a1, t1, a2, t2 in numpy.reshape(data.get('element_loads', []), (-1, 5)):
+        model.append_element_load( loads.LinearLoad(model.elements[int(element)], [a1, t1], [a2, t2]) )
+
+    return model
+
+
+def results_to_arrays(data, results):
+    """Returns the results of a static analysis of the model described by data, in the bulk array format
+
+    The returned dict holds:
+        displacements: (n_nodes, 3) [dx, dy, rz] displacements, following the input node order
+        reactions: (n, 3) rows of [node, parameter, value], following the supports
+        member_forces: (n_elements, 6) local end forces [N1, V1, M1, N2, V2, M2]
+    """
+
+    coordinates = numpy.reshape(numpy.asarray(data['nodes'], dtype=float), (-1, 2))
+    dof_order = results.get_dof_order()
+
+    displacements = numpy.zeros((len(coordinates), 3))
+    d_global = results.get_displacements()
+    for i, (x, y) in enumerate(coordinates):
+        node = dofs.Node([float(x), float(y)])
+        for parameter in range(3):
+            index = dof_order.get(dofs.GlobalDoF(node, dofs.Parameter(parameter)))
+            if index is not None:
+                displacements[i, parameter] = d_global[index]
+
+    # essential DoFs come first in the DoF order, in the order of the supports
+    reactions = results.get_reactions()
+    supports = numpy.reshape(numpy.asarray(data.get('supports', []), dtype=float), (-1, 3))
+    rows = []
+    for node, parameter, value in supports:
+        index = dof_order[dofs.GlobalDoF(dofs.Node([float(c) for c in coordinates[int(node)]]), dofs.Parameter(int(parameter)))]
+        rows.append([node, parameter, reactions[index]])
+
+    return {
+        'displacements': displacements,
+        'reactions': numpy.array(rows).reshape(-1, 3),
+        'member_forces': results.get_member_forces(),
+    }
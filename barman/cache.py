@@ -0,0 +1,243 @@
+"""
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import numpy
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# version of the canonical model description and of the cache entry layout
+FORMAT_VERSION = 1
+
+
+def get_node_key(node) -> tuple:
+    """Returns the (x, y, angle) key of a node"""
+
+    x, y = node.position[:2]
+    return (float(x), float(y), float(node.coordinate_system.angle))
+
+
+def get_dof_key(global_dof) -> tuple:
+    """Returns the (x, y, angle, parameter) key of a global DoF"""
+
+    return get_node_key(global_dof.node) + (int(global_dof.parameter.value),)
+
+
+def get_element_key(element) -> tuple:
+    """Returns a key describing an element, its nodes, section and material"""
+
+    section = element.section
+    material = element.material
+
+    return (type(element).__name__,) + tuple(get_node_key(node) for node in element.nodes) + (
+        float(section.area), float(section.I_zz),
+        float(material.young_modulus), float(material.poisson_ratio), float(material.density))
+
+
+def get_canonical_description(model) -> dict:
+    """Returns a description of a static model which does not depend on the order of its components"""
+
+    element_keys = [get_element_key(elem) for elem in model.elements]
+
+    return {
+        'format': FORMAT_VERSION,
+        'elements': sorted(element_keys),
+        'prescribed_displacements': sorted((get_dof_key(pd.global_dof), float(pd.value)) for pd in model.prescribed_displacements),
+        'prescribed_forces': sorted((get_dof_key(pf.global_dof), float(pf.value)) for pf in model.prescribed_forces),
+        'element_loads': sorted((get_element_key(load.element), type(load).__name__,
+                                 tuple(float(v) for v in load.start_value), tuple(float(v) for v in load.end_value),
+                                 bool(load.local), float(load.strain)) for load in model.element_loads),
+    }
+
+
+def model_hash(model) -> str:
+    """Returns the SHA-256 hex digest of the canonical description of a static model
+
+    Models which only differ in the order of their nodes, elements, supports or loads
+    have the same hash.  Floating point values are hashed exactly.
+    """
+
+    description = json.dumps(get_canonical_description(model), separators=(',', ':'))
+
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def get_key(model, settings: dict = None) -> str:
+    """Returns the key of the cache entry of a model analysed with the given settings
+
+    settings is a JSON serializable description of the analysis options which change
+    its results, so that results of different analyses of a model are never mixed up.
+    """
+
+    if not settings:
+        return model_hash(model)
+
+    description = json.dumps({'format': FORMAT_VERSION, 'model': model_hash(model), 'settings': settings},
+                             sort_keys=True, separators=(',', ':'))
+
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+class ResultCache:
+    """A content-addressed on-disk cache of static analysis results
+
+    Each entry is a .npz file named after the hash of its model and of the settings
+    of its analysis, which stores
+    displacements, reactions and member forces keyed by DoF and element so that
+    they can be mapped to any ordering of an equivalent model.  Entries are written
+    to a temporary file which then atomically replaces its target, and the least
+    recently used entries are evicted once the cache exceeds max_size bytes.  Writes
+    and evictions are serialized between processes by an advisory lock file.
+    """
+
+    def __init__(self, directory: str, max_size: int = 1024*2**20):
+        """
+        Args:
+            directory: directory holding the cache entries, which is created if needed
+            max_size: approximate maximum size of all entries, in bytes
+        """
+
+        self._directory: str = directory
+        self._max_size: int = max_size
+        os.makedirs(directory, exist_ok=True)
+
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self._directory, key + '.npz')
+
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Holds the exclusive lock of the cache directory"""
+
+        with open(os.path.join(self._directory, '.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+    def get_entries(self):
+        """Returns the (path, size, time of last use) of all entries, least recently used first"""
+
+        entries = []
+        for entry in os.scandir(self._directory):
+            if entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+
+        return sorted(entries, key=lambda entry: entry[2])
+
+
+    def load(self, model, dof_order, settings: dict = None):
+        """Returns the cached displacements, reactions and member forces of a model, or None
+
+        The arrays follow dof_order, the essential DoFs of dof_order and the elements of
+        model, and settings describes the analysis as in get_key.
+        """
+
+        path = self.get_path(get_key(model, settings))
+        try:
+            with numpy.load(path) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+            # mark the entry as recently used
+            os.utime(path)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+
+        # essential DoFs come first in the DoF order
+        dof_keys = list(map(tuple, arrays['dof_keys'].tolist()))
+        n_essential = len(arrays['reactions'])
+        displacements = dict(zip(dof_keys, arrays['displacements']))
+        reactions = dict(zip(dof_keys[:n_essential], arrays['reactions']))
+        member_forces = dict(zip(arrays['element_keys'].tolist(), arrays['member_forces']))
+
+        try:
+            keys = [get_dof_key(gdof) for gdof in dof_order]
+            return (numpy.array([displacements[key] for key in keys]),
+                    numpy.array([reactions[key] for key in keys[:n_essential]]),
+                    numpy.array([member_forces[json.dumps(get_element_key(elem))] for elem in model.elements]).reshape(-1, 6))
+        except KeyError:
+            return None
+
+
+    def store(self, model, dof_order, displacements, reactions, member_forces, settings: dict = None) -> None:
+        """Stores the results of a model analysed with the given settings, and evicts the least recently used entries if needed"""
+
+        arrays = {
+            'dof_keys': numpy.array([get_dof_key(gdof) for gdof in dof_order], dtype=float).reshape(-1, 4),
+            'displacements': numpy.asarray(displacements, dtype=float),
+            'reactions': numpy.asarray(reactions, dtype=float),
+            'element_keys': numpy.array([json.dumps(get_element_key(elem)) for elem in model.elements], dtype=str),
+            'member_forces': numpy.asarray(member_forces, dtype=float),
+        }
+
+        descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=self._directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                numpy.savez(f, **arrays)
+            with self.lock():
+                os.replace(temporary, self.get_path(get_key(model, settings)))
+                self.evict()
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temporary)
+            raise
+
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits in its size"""
+
+        entries = self.get_entries()
+        total = sum(size for path, size, last_use in entries)
+
+        for path, size, last_use in entries:
+            if total <= self._max_size:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+
+    def clear(self) -> None:
+        """Removes all entries"""
+
+        with self.lock():
+            for path, size, last_use in self.get_entries():
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
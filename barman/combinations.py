@@ -0,0 +1,147 @@
+"""
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy
+
+
+class Envelope:
+    """The extreme values of a quantity over a set of load combinations
+
+    Attributes:
+        minimum: smallest value of each entry
+        maximum: largest value of each entry
+        minimum_combination: index of the combination which governs the minimum
+        maximum_combination: index of the combination which governs the maximum
+    """
+
+    def __init__(self, minimum, maximum, minimum_combination, maximum_combination):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.minimum_combination = minimum_combination
+        self.maximum_combination = maximum_combination
+
+
+class LoadCombinations:
+    """Combines the results of solved basic load cases by superposition
+
+    All basic cases must be results of the same linear model, differing only in
+    their loads.  factors is a (n_combinations, n_cases) matrix whose rows hold
+    the factors applied to each basic case.
+    """
+
+    QUANTITIES = ('displacements', 'reactions', 'member_forces')
+
+
+    def __init__(self, cases, factors):
+        factors = numpy.atleast_2d(numpy.asarray(factors, dtype=float))
+
+        if factors.shape[1] != len(cases):
+            raise ValueError('factors must have one column per basic load case')
+
+        dof_order = list(cases[0].get_dof_order())
+        for case in cases[1:]:
+            if list(case.get_dof_order()) != dof_order:
+                raise ValueError('all basic load cases must share the same DoF order')
+
+        self._factors = factors
+        self._member_shape = cases[0].get_member_forces().shape
+        self._basic = {
+            'displacements': numpy.array([case.get_displacements() for case in cases]),
+            'reactions': numpy.array([case.get_reactions() for case in cases]),
+            'member_forces': numpy.array([case.get_member_forces().ravel() for case in cases]),
+        }
+
+
+    @property
+    def factors(self) -> numpy.array:
+        return self._factors
+
+
+    def get_basic_values(self, quantity: str) -> numpy.array:
+        """Returns a (n_cases, n_entries) matrix with the values of a quantity in each basic case"""
+
+        if quantity not in self.QUANTITIES:
+            raise ValueError('unknown quantity: {}'.format(quantity))
+
+        return self._basic[quantity]
+
+
+    def combine(self, quantity: str, combinations=slice(None)) -> numpy.array:
+        """Returns a (n_combinations, n_entries) matrix with the combined values of a quantity"""
+
+        return self._factors[combinations].dot(self.get_basic_values(quantity))
+
+
+    def get_displacements(self, combinations=slice(None)) -> numpy.array:
+        """Returns the combined displacements, one row per combination, following the DoF order"""
+
+        return self.combine('displacements', combinations)
+
+
+    def get_reactions(self, combinations=slice(None)) -> numpy.array:
+        """Returns the combined reactions, one row per combination"""
+
+        return self.combine('reactions', combinations)
+
+
+    def get_member_forces(self, combinations=slice(None)) -> numpy.array:
+        """Returns the combined member end forces with shape (n_combinations, n_elements, 6)"""
+
+        forces = self.combine('member_forces', combinations)
+
+        return forces.reshape((-1,) + self._member_shape)
+
+
+    def get_envelope(self, quantity: str, chunk_size: int = 1024) -> Envelope:
+        """Returns the envelope of a quantity over all combinations
+
+        Combinations are evaluated chunk_size at a time, so that memory use is bounded
+        by chunk_size*n_entries regardless of the number of combinations.
+        """
+
+        basic = self.get_basic_values(quantity)
+        n_entries = basic.shape[1]
+
+        minimum = numpy.full(n_entries, numpy.inf)
+        maximum = numpy.full(n_entries, -numpy.inf)
+        minimum_combination = numpy.zeros(n_entries, dtype=numpy.int64)
+        maximum_combination = numpy.zeros(n_entries, dtype=numpy.int64)
+
+        entries = numpy.arange(n_entries)
+        for start in range(0, len(self._factors), chunk_size):
+            values = self._factors[start:start + chunk_size].dot(basic)
+
+            rows = numpy.argmin(values, axis=0)
+            chunk_minimum = values[rows, entries]
+            update = chunk_minimum < minimum
+            minimum[update] = chunk_minimum[update]
+            minimum_combination[update] = rows[update] + start
+
+            rows = numpy.argmax(values, axis=0)
+            chunk_maximum = values[rows, entries]
+            update = chunk_maximum > maximum
+            maximum[update] = chunk_maximum[update]
+            maximum_combination[update] = rows[update] + start
+
+        if quantity == 'member_forces':
+            shape = self._member_shape
+            return Envelope(minimum.reshape(shape), maximum.reshape(shape),
+                            minimum_combination.reshape(shape), maximum_combination.reshape(shape))
+
+        return Envelope(minimum, maximum, minimum_combination, maximum_combination)
@@ -0,0 +1,106 @@
+"""
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy
+from barman import kernels, loads
+
+
+class MemberDiagrams:
+    """Displacement and internal force diagrams along all elements of a static analysis
+
+    Shape functions and their derivatives are evaluated for every element and station
+    at once, and every diagram is an (n_elements, n_stations) array in local coordinates:
+    u and v are the axial and transverse displacements, N is the axial force (tension
+    positive), V the shear force and M the bending moment (sagging positive).  Member
+    loads are accounted for by adding the exact fixed-end solution of each element,
+    while elements without bending carry transverse loads as simply supported spans.
+    """
+
+    def __init__(self, results, stations=11):
+        """
+        Args:
+            results: results of a static analysis
+            stations: number of equally spaced stations, or an array of x/L ratios
+        """
+
+        if numpy.isscalar(stations):
+            stations = numpy.linspace(0.0, 1.0, stations)
+        self._stations = numpy.asarray(stations, dtype=float)
+
+        model = results.get_model()
+        elements = model.elements
+        lengths, cosines, sines = kernels.get_geometry(elements)
+        EA, EI, bending = kernels.get_properties(elements)
+
+        indices = kernels.get_nodal_dof_indices(elements, results.get_dof_order())
+        d_nodal = results.get_displacements()
+        d_global = numpy.append(kernels.to_global_axes(kernels.get_nodal_rotation(results.get_dof_order()), d_nodal), 0.0)[indices]
+        d_local = kernels.rotate_to_local(d_global, cosines, sines)
+
+        N = [kernels.get_shape_functions(self._stations, lengths, bending, derivative) for derivative in range(4)]
+        axial = [numpy.einsum('nmj,nj->nm', N_k[:, :, [0, 3]], d_local[:, [0, 3]]) for N_k in N[:2]]
+        transverse = [numpy.einsum('nmj,nj->nm', N_k[:, :, [1, 2, 4, 5]], d_local[:, [1, 2, 4, 5]]) for N_k in N]
+
+        values = loads.get_element_load_values(elements, model.element_loads)
+        L = lengths[:, numpy.newaxis]
+        x = self._stations[numpy.newaxis, :]*L
+        bending = bending[:, numpy.newaxis]
+        EA = EA[:, numpy.newaxis]
+        EI = numpy.where(bending, EI[:, numpy.newaxis], 1.0)
+
+        # axial loads: fixed-fixed solution of EA*u'' = -p
+        a = values[:, [0]]
+        b = (values[:, [2]] - a)/L
+        u_end = -(a*L**2/2 + b*L**3/6)/EA
+        u_p = -(a*x**2/2 + b*x**3/6)/EA - x/L*u_end
+        du_p = -(a*x + b*x**2/2)/EA - u_end/L
+
+        # transverse loads: w'''' = q, fixed-fixed for beams, simply supported otherwise
+        a = values[:, [1]]
+        b = (values[:, [3]] - a)/L
+        w = [a*x**4/24 + b*x**5/120, a*x**3/6 + b*x**4/24, a*x**2/2 + b*x**3/6, a*x + b*x**2/2]
+        w_end = [a*L**4/24 + b*L**5/120, a*L**3/6 + b*L**4/24, a*L**2/2 + b*L**3/6]
+        w_fixed = [w[k] - N[k][:, :, 4]*w_end[0] - N[k][:, :, 5]*w_end[1] for k in range(4)]
+
+        self._u = axial[0] + u_p
+        self._v = transverse[0] + numpy.where(bending, w_fixed[0]/EI, 0.0)
+        self._N = EA*(axial[1] - values[:, [4]] + du_p)
+        self._M = numpy.where(bending, EI*transverse[2] + w_fixed[2], w[2] - x/L*w_end[2])
+        self._V = numpy.where(bending, EI*transverse[3] + w_fixed[3], w[3] - w_end[2]/L)
+
+
+    @property
+    def stations(self) -> numpy.array:
+        """Station positions, as x/L ratios"""
+        return self._stations
+
+    def get_axial_displacements(self) -> numpy.array:
+        return self._u
+
+    def get_transverse_displacements(self) -> numpy.array:
+        return self._v
+
+    def get_axial_forces(self) -> numpy.array:
+        return self._N
+
+    def get_shear_forces(self) -> numpy.array:
+        return self._V
+
+    def get_bending_moments(self) -> numpy.array:
+        return self._M
@@ -55,6 +55,12 @@ class CoordinateSystem:
         self._angle = angle
 
 
+    @property
+    def angle(self) -> float:
+        """Rotation angle (in radians)"""
+        return self._angle
+
+
     def get_transformation(self) -> numpy.array:
 
         c = cos(self._angle)
@@ -83,9 +89,16 @@ class CoordinateSystem:
 class Node:
     """A point in a 2D space used to defined degrees of freedom (DoF)"""
 
-    def __init__(self, position):
+    def __init__(self, position, coordinate_system: CoordinateSystem = None):
+        """
+        Args:
+            position: coordinates of the node
+            coordinate_system: axes of the DoFs of the node, such as those of an
+                inclined support, which default to the global axes
+        """
+
         self._position = position
-        self._coordinate_system: CoordinateSystem = CoordinateSystem()
+        self._coordinate_system: CoordinateSystem = coordinate_system or CoordinateSystem()
 
 
     @property
@@ -119,6 +132,14 @@ class GlobalDoF:
         self._node: Node = node
         self._parameter = parameter
 
+    @property
+    def node(self) -> Node:
+        return self._node
+
+    @property
+    def parameter(self) -> Parameter:
+        return self._parameter
+
     def __eq__(self, other) -> bool:
         if isinstance(other, self.__class__):
             return self._node == other._node and self._parameter == other._parameter
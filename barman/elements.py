@@ -168,7 +168,7 @@ class EulerBernoulli(BarElement):
         """Returns a list with the element's global degrees of freedom (DoF)"""
 
         parameters = [ Parameter.dx, Parameter.dy, Parameter.rz ]
-        global_dofs = [ GlobalDoF(node, parameter) for parameter in parameters for node in self.nodes]
+        global_dofs = [ GlobalDoF(node, parameter) for node in self.nodes for parameter in parameters]
         return global_dofs
 
 
@@ -192,7 +192,7 @@ class EulerBernoulli(BarElement):
                          L*(xi - 2*xi**2 + xi**3),
                          xi,
                          3*xi**2 - 2*xi**3,
-                         L*(3*xi**3-x**2) ])
+                         L*(xi**3 - xi**2) ])
 
         return N
 
@@ -18,8 +18,6 @@
 """
 
 import numpy
-import scipy.sparse
-from scipy.sparse import dok_matrix, coo_matrix
 
 class LinearStatic:
     """The equation of a linear static analysis problem"""
@@ -29,6 +27,26 @@ class LinearStatic:
         self._dof_map = dof_map
         self.set_equation(dof_map, k_global, d_global, f_global, essential_global_dofs);
 
+    @classmethod
+    def from_blocks(cls, dof_map, blocks, d_global, f_global, essential_global_dofs):
+        """Returns the equation given by already partitioned blocks of the global stiffness matrix
+
+        Args:
+            blocks: dict with the 'ee', 'ef', 'fe' and 'ff' partitions of the global stiffness matrix
+        """
+
+        equation = cls.__new__(cls)
+        equation.clear()
+        equation._dof_map = dof_map
+
+        equation._k_ee = blocks['ee']
+        equation._k_ef = blocks['ef']
+        equation._k_fe = blocks['fe']
+        equation._k_ff = blocks['ff']
+        equation.set_vectors(d_global, f_global, len(essential_global_dofs))
+
+        return equation
+
     def clear(self):
         self._dof_map = []
         self._k_ff = []
@@ -80,40 +98,25 @@ class LinearStatic:
     def set_equation(self, dof_map, k_global, d_global, f_global, essential_global_dof_set):
         """Sets the FEM equation """
 
+        import scipy.sparse
+
         # partition matrix
-        if not isinstance(k_global, dok_matrix):
-            raise TypeError("k_global must be a dok_matrix")
+        if not scipy.sparse.issparse(k_global):
+            raise TypeError("k_global must be a sparse matrix")
 
         N_essential = len(essential_global_dof_set)
-        N_free = len(dof_map)-N_essential
-
-        self._k_ee = scipy.sparse.dok_matrix( (N_essential, N_essential))
-        self._k_ef = scipy.sparse.dok_matrix( (N_essential, N_free))
-        self._k_fe = scipy.sparse.dok_matrix( (N_free, N_essential))
-        self._k_ff = scipy.sparse.dok_matrix( (N_free, N_free))
-
-        # partition k_global through calls to popitem
-        # while k_global.getnnz() > 0:
-        for key, value in k_global.items():
-            # key, value = k_global.popitem()
-            global_i, global_j = key
-
-            if global_i < N_essential:
-                if global_j < N_essential:
-                    self._k_ee[ global_i, global_j] = value
-                else:
-                    self._k_ef[ global_i, global_j-N_essential] = value
-            else:
-                if global_j < N_essential:
-                    self._k_fe[ global_i-N_essential, global_j] = value
-                else:
-                    self._k_ff[ global_i-N_essential, global_j-N_essential] = value
 
         # convert sparse matrix to data structures that are computationally efficient
-        self._k_ee = self._k_ee.tocsr()
-        self._k_fe = self._k_fe.tocsr()
-        self._k_ef = self._k_ef.tocsr()
-        self._k_ff = self._k_ff.tocsr()
+        k_global = k_global.tocsr()
+        self._k_ee = k_global[:N_essential, :N_essential]
+        self._k_ef = k_global[:N_essential, N_essential:]
+        self._k_fe = k_global[N_essential:, :N_essential]
+        self._k_ff = k_global[N_essential:, N_essential:]
+
+        self.set_vectors(d_global, f_global, N_essential)
+
+    def set_vectors(self, d_global, f_global, N_essential):
+        """Sets the partitions of the global DoF and force vectors"""
 
         # partition d_global
         split_d_global = numpy.split(d_global, [N_essential]);
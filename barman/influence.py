@@ -0,0 +1,230 @@
+"""
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from typing import List
+import numpy
+from barman import analysis, equations, kernels
+from barman.elements import BarElement, Bar2
+
+
+class InfluenceLines:
+    """Computes the influence lines of a unit load travelling along a chain of elements
+
+    All load positions are applied as one block of right-hand sides, which is solved
+    against a single factorization of the stiffness matrix.
+    """
+
+
+    class Results:
+        """Stores the influence lines, one row per load position"""
+
+        def __init__(self, model, dof_order, positions, displacements, reactions, member_forces):
+            self._model = model
+            self._dof_order = dof_order
+            self._positions = positions
+            self._displacements = displacements
+            self._reactions = reactions
+            self._member_forces = member_forces
+
+        @property
+        def positions(self) -> numpy.array:
+            """Distance of each load position to the start of the path"""
+            return self._positions
+
+        def get_dof_order(self):
+            return self._dof_order
+
+        def get_displacements(self) -> numpy.array:
+            """Returns the (n_positions, n_dofs) displacements, following the DoF order"""
+            return self._displacements
+
+        def get_reactions(self) -> numpy.array:
+            """Returns the (n_positions, n_essential_dofs) reactions"""
+            return self._reactions
+
+        def get_member_forces(self) -> numpy.array:
+            """Returns the (n_positions, n_elements, 6) local member end forces"""
+            return self._member_forces
+
+
+    def __init__(self, path: List[BarElement], stations: int = 11, direction=(0.0, -1.0)):
+        """
+        Args:
+            path: chain of elements followed by the load, in travel order
+            stations: number of load positions along each element, including its end nodes
+            direction: global direction of the unit load
+        """
+
+        self._path: List[BarElement] = path
+        self._stations: int = stations
+        self._direction = numpy.asarray(direction, dtype=float)
+
+
+    def get_load_positions(self) -> (numpy.array, numpy.array, numpy.array):
+        """Returns the path element index, the local coordinate and the path distance of each load position"""
+
+        path = self._path
+        xi = numpy.linspace(0.0, 1.0, self._stations)
+
+        element_index = []
+        local_xi = []
+        distance = []
+        start = 0.0
+
+        # the first element is reversed if its start node is shared with the second one
+        previous_node = path[0].nodes[0]
+        if len(path) > 1 and path[0].nodes[0] in (path[1].nodes[0], path[1].nodes[-1]):
+            previous_node = path[0].nodes[-1]
+
+        for i, elem in enumerate(path):
+            reversed_element = elem.nodes[-1] == previous_node
+            if not reversed_element and elem.nodes[0] != previous_node:
+                raise ValueError('path elements must form a connected chain')
+
+            # a shared node is only loaded once, by the element which ends at it
+            ratios = xi if i == 0 else xi[1:]
+            L = elem.get_length()
+
+            element_index.append(numpy.full(len(ratios), i))
+            local_xi.append(1.0 - ratios if reversed_element else ratios)
+            distance.append(start + ratios*L)
+
+            start += L
+            previous_node = elem.nodes[0] if reversed_element else elem.nodes[-1]
+
+        return numpy.concatenate(element_index), numpy.concatenate(local_xi), numpy.concatenate(distance)
+
+
+    def get_local_load_vectors(self, element_index, local_xi) -> numpy.array:
+        """Returns the (n_positions, 6) local equivalent nodal forces of the unit load at each position"""
+
+        path = self._path
+        lengths, cosines, sines = kernels.get_geometry(path)
+
+        c = cosines[element_index]
+        s = sines[element_index]
+        axial = c*self._direction[0] + s*self._direction[1]
+        transverse = -s*self._direction[0] + c*self._direction[1]
+
+        f = numpy.zeros((len(element_index), 6))
+        for row, (i, xi) in enumerate(zip(element_index, local_xi)):
+            elem = path[i]
+            N = elem.get_shape_functions(xi*lengths[i])
+            if isinstance(elem, Bar2):
+                N = numpy.array([N[0], N[0], 0.0, N[1], N[1], 0.0])
+            f[row] = N
+
+        f[:, [0, 3]] *= axial[:, numpy.newaxis]
+        f[:, [1, 2, 4, 5]] *= transverse[:, numpy.newaxis]
+
+        return f
+
+
+    def run(self, model) -> 'InfluenceLines.Results':
+        """Computes the influence lines of a model"""
+
+        import scipy.sparse
+        import scipy.sparse.linalg
+
+        static = analysis.LinearStatic()
+        dof_map, essential_global_dofs = static.get_global_dof_map(model)
+        n_dofs = len(dof_map)
+        n_essential = len(essential_global_dofs)
+
+        k_global = static.generate_global_stiffness_matrix(model.elements, dof_map)
+        zeros = numpy.zeros(n_dofs)
+        equation = equations.LinearStatic(dof_map, k_global, zeros, zeros, essential_global_dofs)
+
+        # block of right-hand sides, one column per load position
+        element_index, local_xi, positions = self.get_load_positions()
+        n_positions = len(positions)
+        f_local = self.get_local_load_vectors(element_index, local_xi)
+
+        lengths, cosines, sines = kernels.get_geometry(self._path)
+        f_global = kernels.rotate_to_global(f_local, cosines[element_index], sines[element_index])
+        indices = kernels.get_nodal_dof_indices(self._path, dof_map)[element_index]
+        columns = numpy.repeat(numpy.arange(n_positions), 6)
+
+        mask = indices.ravel() >= 0
+        F = scipy.sparse.coo_matrix((f_global.ravel()[mask], (indices.ravel()[mask], columns[mask])), shape=(n_dofs, n_positions)).tocsr()
+        rotation = kernels.get_nodal_rotation(dof_map)
+        if rotation is not None:
+            F = (rotation @ F).tocsr()
+        F_e = F[:n_essential].toarray()
+        F_f = F[n_essential:].toarray()
+
+        # single factorization, solved for all load positions
+        D_f = scipy.sparse.linalg.splu(equation.k_ff.tocsc()).solve(F_f)
+
+        displacements = numpy.vstack((numpy.zeros((n_essential, n_positions)), D_f)).T
+        reactions = (equation.k_ef.dot(D_f) - F_e).T
+
+        elements = model.elements
+        member_forces = kernels.get_member_end_forces(elements, kernels.get_nodal_dof_indices(elements, dof_map),
+                                                      kernels.to_global_axes(rotation, displacements))
+
+        # remove the fixed-end forces of the loaded element
+        position = {id(elem): i for i, elem in enumerate(elements)}
+        loaded = numpy.array([position[id(elem)] for elem in self._path], dtype=numpy.int64)[element_index]
+        member_forces[numpy.arange(n_positions), loaded] -= f_local
+
+        return InfluenceLines.Results(model, dof_map, positions, displacements, reactions, member_forces)
+
+
+def get_load_train_response(positions, influence, axle_loads, axle_spacings, lead_positions=None) -> numpy.array:
+    """Returns the response to a train of axle loads by convolution over influence arrays
+
+    Args:
+        positions: (n_positions,) increasing path distance of each influence ordinate
+        influence: (n_positions, ...) influence arrays, such as the ones in InfluenceLines.Results
+        axle_loads: load of each axle, in the direction of the unit load
+        axle_spacings: distance between consecutive axles, from the leading axle backwards
+        lead_positions: positions of the leading axle, which default to the influence positions
+
+    Returns:
+        array (n_lead_positions, ...) with the response to the train at each lead position.
+        Axles outside of the path do not contribute.
+    """
+
+    import scipy.sparse
+
+    positions = numpy.asarray(positions, dtype=float)
+    influence = numpy.asarray(influence, dtype=float)
+    axle_loads = numpy.asarray(axle_loads, dtype=float)
+    offsets = numpy.concatenate(([0.0], numpy.cumsum(axle_spacings)))
+
+    if lead_positions is None:
+        lead_positions = positions
+    lead_positions = numpy.asarray(lead_positions, dtype=float)
+
+    # sparse linear interpolation weights from influence ordinates to axle positions
+    x = (lead_positions[:, numpy.newaxis] - offsets[numpy.newaxis, :]).ravel()
+    j = numpy.clip(numpy.searchsorted(positions, x, side='right') - 1, 0, len(positions) - 2)
+    t = (x - positions[j])/(positions[j + 1] - positions[j])
+    inside = (x >= positions[0]) & (x <= positions[-1])
+
+    rows = numpy.concatenate((numpy.arange(len(x)), numpy.arange(len(x))))[numpy.tile(inside, 2)]
+    columns = numpy.concatenate((j, j + 1))[numpy.tile(inside, 2)]
+    weights = numpy.concatenate((1.0 - t, t))[numpy.tile(inside, 2)]
+    W = scipy.sparse.csr_matrix((weights, (rows, columns)), shape=(len(x), len(positions)))
+
+    ordinates = W.dot(influence.reshape(len(positions), -1))
+    ordinates = ordinates.reshape((len(lead_positions), len(offsets)) + influence.shape[1:])
+
+    return numpy.tensordot(axle_loads, ordinates, axes=([0], [1]))
@@ -0,0 +1,238 @@
+"""Optional Numba-compiled versions of the element matrix and scatter kernels
+
+The functions of this module are plain Python loops which Numba compiles to
+machine code, so that element matrices are computed and scattered without the
+temporary arrays of the NumPy kernels.  They are only compiled if Numba is
+installed, when get_kernels is first called, and the barman.kernels functions
+fall back to NumPy otherwise.  Setting the BARMAN_JIT environment variable to 0
+disables them.
+
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import types
+import numpy
+
+
+_enabled: bool = os.environ.get('BARMAN_JIT', '1') != '0'
+_compiled = None
+
+
+def set_enabled(enabled: bool) -> None:
+    """Enables or disables the compiled kernels"""
+
+    global _enabled
+    _enabled = enabled
+
+
+def get_kernels():
+    """Returns a namespace with the compiled kernels, or None if they are disabled or Numba is not installed"""
+
+    global _compiled
+
+    if not _enabled:
+        return None
+
+    if _compiled is None:
+        try:
+            import numba
+        except ImportError:
+            _compiled = False
+        else:
+            compile = numba.njit(cache=True, nogil=True)
+
+            # compiled kernels can only call compiled functions
+            global rotate_to_global
+            rotate_to_global = compile(rotate_to_global)
+
+            _compiled = types.SimpleNamespace(
+                global_stiffness=compile(global_stiffness),
+                global_mass=compile(global_mass),
+                scatter=compile(scatter),
+                assemble_csr=compile(assemble_csr),
+            )
+
+    return _compiled or None
+
+
+def rotate_to_global(local, c, s, rotation, product, out) -> None:
+    """Stores R^T*local*R in out, where R rotates global end vectors to the local system of an element"""
+
+    rotation[:, :] = 0.0
+    for i in (0, 3):
+        rotation[i, i] = c
+        rotation[i + 1, i + 1] = c
+        rotation[i, i + 1] = s
+        rotation[i + 1, i] = -s
+        rotation[i + 2, i + 2] = 1.0
+
+    # R is block diagonal, so each product only sums over the 3 rows of a node
+    for j in range(6):
+        for l in range(6):
+            base = 3*(l//3)
+            total = 0.0
+            for k in range(base, base + 3):
+                total += local[j, k]*rotation[k, l]
+            product[j, l] = total
+
+    for i in range(6):
+        base = 3*(i//3)
+        for l in range(6):
+            total = 0.0
+            for j in range(base, base + 3):
+                total += rotation[j, i]*product[j, l]
+            out[i, l] = total
+
+
+def global_stiffness(lengths, cosines, sines, EA, EI, bending):
+    """Returns the (n, 6, 6) global stiffness matrices of elements, as kernels.get_global_stiffness_from_arrays"""
+
+    n = len(lengths)
+    out = numpy.zeros((n, 6, 6))
+    local = numpy.zeros((6, 6))
+    rotation = numpy.zeros((6, 6))
+    product = numpy.zeros((6, 6))
+
+    for e in range(n):
+        L = lengths[e]
+        flexural = EI[e] if bending[e] else 0.0
+        a = EA[e]/L
+        b = 12*flexural/L**3
+        c = 6*flexural/L**2
+        d = 4*flexural/L
+        f = 2*flexural/L
+
+        local[0, 0] = local[3, 3] = a
+        local[0, 3] = local[3, 0] = -a
+        local[1, 1] = local[4, 4] = b
+        local[1, 4] = local[4, 1] = -b
+        local[1, 2] = local[2, 1] = local[1, 5] = local[5, 1] = c
+        local[4, 2] = local[2, 4] = local[4, 5] = local[5, 4] = -c
+        local[2, 2] = local[5, 5] = d
+        local[2, 5] = local[5, 2] = f
+
+        rotate_to_global(local, cosines[e], sines[e], rotation, product, out[e])
+
+    return out
+
+
+def global_mass(lengths, cosines, sines, mass_per_length, bending):
+    """Returns the (n, 6, 6) global consistent mass matrices of elements, as kernels.get_global_mass_from_arrays"""
+
+    n = len(lengths)
+    out = numpy.zeros((n, 6, 6))
+    local = numpy.zeros((6, 6))
+    rotation = numpy.zeros((6, 6))
+    product = numpy.zeros((6, 6))
+
+    for e in range(n):
+        L = lengths[e]
+        local[:, :] = 0.0
+
+        if bending[e]:
+            m = mass_per_length[e]*L/420.0
+            local[0, 0] = local[3, 3] = 140.0*m
+            local[0, 3] = local[3, 0] = 70.0*m
+            local[1, 1] = local[4, 4] = 156.0*m
+            local[1, 4] = local[4, 1] = 54.0*m
+            local[1, 2] = local[2, 1] = 22.0*L*m
+            local[4, 5] = local[5, 4] = -22.0*L*m
+            local[1, 5] = local[5, 1] = -13.0*L*m
+            local[2, 4] = local[4, 2] = 13.0*L*m
+            local[2, 2] = local[5, 5] = 4.0*L*L*m
+            local[2, 5] = local[5, 2] = -3.0*L*L*m
+        else:
+            m = mass_per_length[e]*L/6.0
+            local[0, 0] = local[3, 3] = local[1, 1] = local[4, 4] = 2.0*m
+            local[0, 3] = local[3, 0] = local[1, 4] = local[4, 1] = m
+
+        rotate_to_global(local, cosines[e], sines[e], rotation, product, out[e])
+
+    return out
+
+
+def scatter(indices, values, size):
+    """Sums values into a vector of the given size, skipping entries whose index is -1, as kernels.scatter"""
+
+    out = numpy.zeros(size)
+    for i in range(len(indices)):
+        if indices[i] >= 0:
+            out[indices[i]] += values[i]
+
+    return out
+
+
+def assemble_csr(indices, matrices, groups, size):
+    """Sums element matrices directly into CSR arrays, skipping entries whose index is -1
+
+    Element e uses the matrix matrices[groups[e]], so that elements may share matrices.
+
+    Returns:
+        the data, column indices and row pointers of the matrix, with sorted and unique columns in each row
+    """
+
+    n, m = indices.shape
+
+    # entries of each row, duplicates included
+    counts = numpy.zeros(size + 1, dtype=numpy.int64)
+    for e in range(n):
+        valid = 0
+        for j in range(m):
+            if indices[e, j] >= 0:
+                valid += 1
+        for i in range(m):
+            if indices[e, i] >= 0:
+                counts[indices[e, i] + 1] += valid
+
+    pointers = numpy.cumsum(counts)
+    columns = numpy.empty(pointers[-1], dtype=numpy.int64)
+    data = numpy.empty(pointers[-1])
+    fill = pointers[:-1].copy()
+
+    for e in range(n):
+        for i in range(m):
+            row = indices[e, i]
+            if row < 0:
+                continue
+            for j in range(m):
+                if indices[e, j] >= 0:
+                    columns[fill[row]] = indices[e, j]
+                    data[fill[row]] = matrices[groups[e], i, j]
+                    fill[row] += 1
+
+    # sort the columns of each row, whose length grows with the members at its node, and sum duplicates
+    indptr = numpy.zeros(size + 1, dtype=numpy.int64)
+    position = 0
+    for row in range(size):
+        start = pointers[row]
+        end = pointers[row + 1]
+        order = numpy.argsort(columns[start:end], kind='mergesort')
+        row_columns = columns[start:end][order]
+        row_data = data[start:end][order]
+
+        for k in range(end - start):
+            if position > indptr[row] and columns[position - 1] == row_columns[k]:
+                data[position - 1] += row_data[k]
+            else:
+                columns[position] = row_columns[k]
+                data[position] = row_data[k]
+                position += 1
+        indptr[row + 1] = position
+
+    return data[:position].copy(), columns[:position].copy(), indptr
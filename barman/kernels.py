@@ -0,0 +1,567 @@
+"""
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from typing import List
+import numpy
+from barman import jit
+from barman.dofs import Parameter, GlobalDoF
+from barman.elements import Bar2
+
+
+# nodal parameters, in the order used by all local end vectors: [N1, V1, M1, N2, V2, M2]
+NODAL_PARAMETERS = [Parameter.dx, Parameter.dy, Parameter.rz]
+
+# relative tolerance below which element properties are considered equal by deduplicate
+DEDUPLICATION_TOLERANCE = 1e-9
+
+
+def get_geometry(elements) -> (numpy.array, numpy.array, numpy.array):
+    """Returns the lengths, cosines and sines of a list of elements"""
+
+    coordinates = numpy.array([[elem.nodes[0].position, elem.nodes[-1].position] for elem in elements], dtype=float).reshape(-1, 2, 2)
+    r = coordinates[:, 1, :] - coordinates[:, 0, :]
+    lengths = numpy.hypot(r[:, 0], r[:, 1])
+
+    return lengths, r[:, 0]/lengths, r[:, 1]/lengths
+
+
+def get_nodal_dof_indices(elements, dof_order) -> numpy.array:
+    """Returns a (n_elements, 6) array with the indices of the [dx, dy, rz] DoFs of the start and end nodes
+
+    DoFs which are not present in dof_order are flagged with -1.
+    """
+
+    # one lookup per node instead of one per DoF, as hashing global DoFs dominates small models
+    slots = dict()
+    for global_dof, index in dof_order.items():
+        slots.setdefault(global_dof.node, [-1, -1, -1])[NODAL_PARAMETERS.index(global_dof.parameter)] = index
+
+    missing = [-1, -1, -1]
+    indices = [index
+               for elem in elements
+               for node in (elem.nodes[0], elem.nodes[-1])
+               for index in slots.get(node, missing)]
+
+    return numpy.array(indices, dtype=numpy.int64).reshape(-1, 6)
+
+
+def get_nodal_layout(dof_order) -> (List, numpy.array):
+    """Returns the nodes of a DoF map and the position of each DoF in a (n_nodes, 3) [dx, dy, rz] array
+
+    Nodes are listed in the order in which they first appear in the DoF map.
+    """
+
+    nodes = dict()
+    positions = numpy.empty(len(dof_order), dtype=numpy.int64)
+    for global_dof, index in dof_order.items():
+        node_index = nodes.setdefault(global_dof.node, len(nodes))
+        positions[index] = 3*node_index + NODAL_PARAMETERS.index(global_dof.parameter)
+
+    return list(nodes), positions
+
+
+def get_nodal_rotation(dof_order) -> 'scipy.sparse.csr_matrix':
+    """Returns the block-diagonal rotation R from the global axes to the nodal coordinate systems
+
+    DoFs follow the coordinate system of their node, so that d_nodal = R*d_global,
+    f_nodal = R*f_global and K_nodal = R*K_global*R^T.  Returns None if no node is
+    rotated, so that models with default coordinate systems skip all products by R.
+    """
+
+    import scipy.sparse
+
+    rotated = [(global_dof, index) for global_dof, index in dof_order.items()
+               if global_dof.node.coordinate_system.angle != 0 and global_dof.parameter in (Parameter.dx, Parameter.dy)]
+    if not rotated:
+        return None
+
+    n = len(dof_order)
+    rows = list(range(n))
+    columns = list(range(n))
+    values = [1.0]*n
+
+    for global_dof, index in rotated:
+        angle = global_dof.node.coordinate_system.angle
+        other = dof_order.get(GlobalDoF(global_dof.node, Parameter.dy if global_dof.parameter == Parameter.dx else Parameter.dx))
+        c, s = numpy.cos(angle), numpy.sin(angle)
+
+        # dx' = c*dx + s*dy and dy' = -s*dx + c*dy
+        values[index] = c
+        if other is not None:
+            rows.append(index)
+            columns.append(other)
+            values.append(s if global_dof.parameter == Parameter.dx else -s)
+
+    return scipy.sparse.coo_matrix((values, (rows, columns)), shape=(n, n)).tocsr()
+
+
+def get_element_nodal_rotations(elements) -> numpy.array:
+    """Returns the (n, 6, 6) blocks of the nodal rotation R of the [dx, dy, rz] DoFs of each element
+
+    Rotating each global element matrix by its block gives the element matrices of
+    R*K_global*R^T, with the same sparsity pattern.  Returns None if no node is rotated.
+    """
+
+    angles = numpy.array([[node.coordinate_system.angle for node in elem.nodes] for elem in elements], dtype=float).reshape(-1, 2)
+    if not numpy.any(angles):
+        return None
+
+    c, s = numpy.cos(angles), numpy.sin(angles)
+    R = numpy.zeros((len(angles), 6, 6))
+    for i in range(2):
+        # dx' = c*dx + s*dy and dy' = -s*dx + c*dy
+        R[:, 3*i, 3*i] = R[:, 3*i + 1, 3*i + 1] = c[:, i]
+        R[:, 3*i, 3*i + 1] = s[:, i]
+        R[:, 3*i + 1, 3*i] = -s[:, i]
+        R[:, 3*i + 2, 3*i + 2] = 1.0
+
+    return R
+
+
+def rotate_matrix(rotation, k) -> 'scipy.sparse.csr_matrix':
+    """Returns R*k*R^T, or k if rotation is None"""
+
+    if rotation is None:
+        return k
+
+    return (rotation @ k @ rotation.T).tocsr()
+
+
+def to_nodal_axes(rotation, vectors) -> numpy.array:
+    """Rotates a vector, or a (m, n_dofs) block of them, from the global axes to the nodal coordinate systems"""
+
+    if rotation is None:
+        return vectors
+
+    return numpy.transpose(rotation.dot(numpy.transpose(vectors)))
+
+
+def to_global_axes(rotation, vectors) -> numpy.array:
+    """Rotates a vector, or a (m, n_dofs) block of them, from the nodal coordinate systems to the global axes"""
+
+    if rotation is None:
+        return vectors
+
+    return numpy.transpose(rotation.T.dot(numpy.transpose(vectors)))
+
+
+def to_nodal_array(positions, n_nodes: int, vectors) -> numpy.array:
+    """Rearranges (..., n_dofs) vectors following the DoF order into (..., n_nodes, 3) nodal arrays"""
+
+    vectors = numpy.asarray(vectors)
+    result = numpy.zeros(vectors.shape[:-1] + (3*n_nodes,), dtype=vectors.dtype)
+    result[..., positions] = vectors
+
+    return result.reshape(vectors.shape[:-1] + (n_nodes, 3))
+
+
+def scatter(indices: numpy.array, values: numpy.array, size: int) -> numpy.array:
+    """Sums values into a vector of the given size, skipping entries whose index is -1"""
+
+    indices = numpy.ravel(indices)
+    values = numpy.ravel(values)
+
+    compiled = jit.get_kernels()
+    if compiled is not None:
+        return compiled.scatter(indices.astype(numpy.int64, copy=False), values.astype(float, copy=False), size)
+
+    mask = indices >= 0
+
+    return numpy.bincount(indices[mask], weights=values[mask], minlength=size).astype(float)
+
+
+def rotate_to_global(local: numpy.array, cosines: numpy.array, sines: numpy.array) -> numpy.array:
+    """Rotates (..., n, 6) local end vectors [N1, V1, M1, N2, V2, M2] to the global coordinate system"""
+
+    c = cosines[:, numpy.newaxis]
+    s = sines[:, numpy.newaxis]
+    axial = local[..., [0, 3]]
+    transverse = local[..., [1, 4]]
+
+    result = numpy.empty_like(local)
+    result[..., [0, 3]] = c*axial - s*transverse
+    result[..., [1, 4]] = s*axial + c*transverse
+    result[..., [2, 5]] = local[..., [2, 5]]
+
+    return result
+
+
+def rotate_to_local(vectors: numpy.array, cosines: numpy.array, sines: numpy.array) -> numpy.array:
+    """Rotates (..., n, 6) global end vectors [dx1, dy1, rz1, dx2, dy2, rz2] to the local coordinate system"""
+
+    c = cosines[:, numpy.newaxis]
+    s = sines[:, numpy.newaxis]
+    x = vectors[..., [0, 3]]
+    y = vectors[..., [1, 4]]
+
+    result = numpy.empty_like(vectors)
+    result[..., [0, 3]] = c*x + s*y
+    result[..., [1, 4]] = -s*x + c*y
+    result[..., [2, 5]] = vectors[..., [2, 5]]
+
+    return result
+
+
+def get_fixed_end_forces(lengths, axial_start, axial_end, transverse_start, transverse_end, thermal_force, pinned) -> numpy.array:
+    """Returns the (n, 6) equivalent nodal forces of linearly varying member loads, in local coordinates
+
+    Loads are given per unit length along the local axes.  The transverse part is
+    distributed as in a fixed-fixed beam, or as in a simply supported beam where
+    pinned is true.  thermal_force is the axial force EA*strain of a free thermal strain.
+    """
+
+    L = lengths
+    p1, p2 = axial_start, axial_end
+    q1, q2 = transverse_start, transverse_end
+    pinned = numpy.asarray(pinned, dtype=bool)
+
+    f = numpy.zeros((len(L), 6))
+    f[:, 0] = L*(2*p1 + p2)/6 - thermal_force
+    f[:, 3] = L*(p1 + 2*p2)/6 + thermal_force
+    f[:, 1] = numpy.where(pinned, L*(2*q1 + q2)/6, L*(7*q1 + 3*q2)/20)
+    f[:, 4] = numpy.where(pinned, L*(q1 + 2*q2)/6, L*(3*q1 + 7*q2)/20)
+    f[:, 2] = numpy.where(pinned, 0.0, L**2*(3*q1 + 2*q2)/60)
+    f[:, 5] = numpy.where(pinned, 0.0, -L**2*(2*q1 + 3*q2)/60)
+
+    return f
+
+
+def get_properties(elements) -> (numpy.array, numpy.array, numpy.array):
+    """Returns the axial stiffness EA, the bending stiffness EI and the bending flag of a list of elements
+
+    The bending flag is false for elements, such as Bar2, which only resist axial forces.
+    """
+
+    EA = numpy.array([elem.material.young_modulus*elem.section.area for elem in elements], dtype=float)
+    EI = numpy.array([elem.material.young_modulus*elem.section.I_zz for elem in elements], dtype=float)
+    bending = numpy.array([not isinstance(elem, Bar2) for elem in elements], dtype=bool)
+
+    return EA, EI, bending
+
+
+def get_local_stiffness(lengths, EA, EI, bending) -> numpy.array:
+    """Returns the (n, 6, 6) local stiffness matrices in the [u1, v1, r1, u2, v2, r2] layout
+
+    Elements without bending only fill the axial terms.
+    """
+
+    L = lengths
+    EI = numpy.where(bending, EI, 0.0)
+    a = EA/L
+    b = 12*EI/L**3
+    c = 6*EI/L**2
+    d = 4*EI/L
+    e = 2*EI/L
+
+    k = numpy.zeros((len(L), 6, 6))
+    k[:, 0, 0] = k[:, 3, 3] = a
+    k[:, 0, 3] = k[:, 3, 0] = -a
+    k[:, 1, 1] = k[:, 4, 4] = b
+    k[:, 1, 4] = k[:, 4, 1] = -b
+    k[:, 1, 2] = k[:, 2, 1] = k[:, 1, 5] = k[:, 5, 1] = c
+    k[:, 4, 2] = k[:, 2, 4] = k[:, 4, 5] = k[:, 5, 4] = -c
+    k[:, 2, 2] = k[:, 5, 5] = d
+    k[:, 2, 5] = k[:, 5, 2] = e
+
+    return k
+
+
+def get_rotation(cosines, sines) -> numpy.array:
+    """Returns the (n, 6, 6) rotation matrices which transform global end vectors into local ones"""
+
+    R = numpy.zeros((len(cosines), 6, 6))
+    for i in (0, 3):
+        R[:, i, i] = R[:, i+1, i+1] = cosines
+        R[:, i, i+1] = sines
+        R[:, i+1, i] = -sines
+        R[:, i+2, i+2] = 1.0
+
+    return R
+
+
+def to_global(matrices, cosines, sines) -> numpy.array:
+    """Transforms (n, 6, 6) local element matrices to the global coordinate system"""
+
+    R = get_rotation(cosines, sines)
+
+    return numpy.einsum('nji,njk,nkl->nil', R, matrices, R)
+
+
+def get_geometric_stiffness(lengths, axial_forces, bending) -> numpy.array:
+    """Returns the (n, 6, 6) local geometric stiffness matrices for the given axial forces (tension positive)
+
+    Elements with bending use the consistent cubic beam matrix, while elements
+    without bending use the string stiffness N/L on the transverse DoFs.
+    """
+
+    L = lengths
+    N = numpy.asarray(axial_forces, dtype=float)
+    bending = numpy.asarray(bending, dtype=bool)
+
+    a = numpy.where(bending, 36*N/(30*L), N/L)
+    b = numpy.where(bending, 3*N/30, 0.0)
+    c = numpy.where(bending, 4*N*L/30, 0.0)
+    d = numpy.where(bending, -N*L/30, 0.0)
+
+    k = numpy.zeros((len(L), 6, 6))
+    k[:, 1, 1] = k[:, 4, 4] = a
+    k[:, 1, 4] = k[:, 4, 1] = -a
+    k[:, 1, 2] = k[:, 2, 1] = k[:, 1, 5] = k[:, 5, 1] = b
+    k[:, 4, 2] = k[:, 2, 4] = k[:, 4, 5] = k[:, 5, 4] = -b
+    k[:, 2, 2] = k[:, 5, 5] = c
+    k[:, 2, 5] = k[:, 5, 2] = d
+
+    return k
+
+
+def get_global_stiffness(elements, axial_forces=None) -> numpy.array:
+    """Returns the (n, 6, 6) global stiffness matrices of a list of elements, in the nodal [dx, dy, rz] layout
+
+    If axial_forces is given, the geometric stiffness is added to the elastic stiffness.
+    """
+
+    lengths, cosines, sines = get_geometry(elements)
+    EA, EI, bending = get_properties(elements)
+
+    return get_global_stiffness_from_arrays(lengths, cosines, sines, EA, EI, bending, axial_forces)
+
+
+def get_global_stiffness_from_arrays(lengths, cosines, sines, EA, EI, bending, axial_forces=None) -> numpy.array:
+    """Returns the (n, 6, 6) global stiffness matrices of elements described by property arrays"""
+
+    compiled = jit.get_kernels()
+    if compiled is not None and axial_forces is None:
+        return compiled.global_stiffness(*(numpy.ascontiguousarray(array, dtype=float) for array in (lengths, cosines, sines, EA, EI)),
+                                         numpy.ascontiguousarray(bending, dtype=bool))
+
+    k = get_local_stiffness(lengths, EA, EI, bending)
+    if axial_forces is not None:
+        k += get_geometric_stiffness(lengths, axial_forces, bending)
+
+    return to_global(k, cosines, sines)
+
+
+def get_mass_per_length(elements) -> numpy.array:
+    """Returns the mass per unit length rho*A of a list of elements"""
+
+    return numpy.array([elem.material.density*elem.section.area for elem in elements], dtype=float)
+
+
+def get_local_mass(lengths, mass_per_length, bending) -> numpy.array:
+    """Returns the (n, 6, 6) local consistent mass matrices in the [u1, v1, r1, u2, v2, r2] layout
+
+    Elements with bending use the cubic beam matrix, while elements without bending
+    use the linear bar matrix on both the axial and transverse displacements.
+    """
+
+    L = lengths
+    bending = numpy.asarray(bending, dtype=bool)
+    bar = mass_per_length*L/6
+    beam = mass_per_length*L/420
+
+    m = numpy.zeros((len(L), 6, 6))
+    m[:, 0, 0] = m[:, 3, 3] = numpy.where(bending, 140*beam, 2*bar)
+    m[:, 0, 3] = m[:, 3, 0] = numpy.where(bending, 70*beam, bar)
+    m[:, 1, 1] = m[:, 4, 4] = numpy.where(bending, 156*beam, 2*bar)
+    m[:, 1, 4] = m[:, 4, 1] = numpy.where(bending, 54*beam, bar)
+    m[:, 1, 2] = m[:, 2, 1] = numpy.where(bending, 22*L*beam, 0.0)
+    m[:, 4, 5] = m[:, 5, 4] = numpy.where(bending, -22*L*beam, 0.0)
+    m[:, 1, 5] = m[:, 5, 1] = numpy.where(bending, -13*L*beam, 0.0)
+    m[:, 2, 4] = m[:, 4, 2] = numpy.where(bending, 13*L*beam, 0.0)
+    m[:, 2, 2] = m[:, 5, 5] = numpy.where(bending, 4*L**2*beam, 0.0)
+    m[:, 2, 5] = m[:, 5, 2] = numpy.where(bending, -3*L**2*beam, 0.0)
+
+    return m
+
+
+def get_global_mass(elements) -> numpy.array:
+    """Returns the (n, 6, 6) global consistent mass matrices of a list of elements, in the nodal [dx, dy, rz] layout"""
+
+    lengths, cosines, sines = get_geometry(elements)
+    EA, EI, bending = get_properties(elements)
+
+    return get_global_mass_from_arrays(lengths, cosines, sines, get_mass_per_length(elements), bending)
+
+
+def get_global_mass_from_arrays(lengths, cosines, sines, mass_per_length, bending) -> numpy.array:
+    """Returns the (n, 6, 6) global consistent mass matrices of elements described by property arrays"""
+
+    compiled = jit.get_kernels()
+    if compiled is not None:
+        return compiled.global_mass(*(numpy.ascontiguousarray(array, dtype=float) for array in (lengths, cosines, sines, mass_per_length)),
+                                    numpy.ascontiguousarray(bending, dtype=bool))
+
+    return to_global(get_local_mass(lengths, mass_per_length, bending), cosines, sines)
+
+
+def get_truss_stiffness(lengths, cosines, sines, EA) -> numpy.array:
+    """Returns the (n, 4, 4) global stiffness matrices [dx1, dy1, dx2, dy2] of truss members
+
+    Each matrix is the rank-1 product EA/L*g*g^T, with g = [-c, -s, c, s].
+    """
+
+    g = numpy.stack((-cosines, -sines, cosines, sines), axis=-1)
+
+    return (EA/lengths)[:, numpy.newaxis, numpy.newaxis]*g[:, :, numpy.newaxis]*g[:, numpy.newaxis, :]
+
+
+def deduplicate(columns, tolerance: float = DEDUPLICATION_TOLERANCE) -> (numpy.array, numpy.array):
+    """Groups elements whose property columns agree to a relative tolerance
+
+    Each value is split into its binary exponent and its mantissa, which is rounded
+    to integer multiples of the tolerance, so that values are quantized relative to
+    their own magnitude.  Elements with the same quantized key share a group.  Values
+    on either side of a rounding boundary may land in different groups, which only
+    lowers the compression.
+
+    Returns:
+        the index of the first element of each group, and the group of each element
+    """
+
+    keys = numpy.empty((len(columns[0]), len(columns)), dtype=numpy.int64)
+    for i, column in enumerate(columns):
+        mantissas, exponents = numpy.frexp(numpy.asarray(column, dtype=float))
+        # rounded mantissas stay below 2**31 for tolerances of at least 1e-9
+        keys[:, i] = exponents.astype(numpy.int64)*2**32 + numpy.rint(mantissas/tolerance).astype(numpy.int64)
+
+    keys, first, groups = numpy.unique(keys, axis=0, return_index=True, return_inverse=True)
+
+    return first, groups.ravel()
+
+
+def get_triplets(indices, matrices) -> (numpy.array, numpy.array, numpy.array):
+    """Returns the row, column and value COO triplets of (n, m, m) element matrices
+
+    Triplets are listed element by element, in row-major order, and entries whose
+    index is -1 are kept so that the position of each triplet only depends on its element.
+    """
+
+    n, m = numpy.shape(indices)
+    rows = numpy.broadcast_to(indices[:, :, numpy.newaxis], (n, m, m)).ravel()
+    columns = numpy.broadcast_to(indices[:, numpy.newaxis, :], (n, m, m)).ravel()
+
+    return rows, columns, numpy.ravel(matrices)
+
+
+def assemble_triplets(rows, columns, values, size: int, dtype=numpy.float64) -> 'scipy.sparse.csr_matrix':
+    """Sums COO triplets into a global sparse matrix of the given dtype, skipping entries whose index is -1"""
+
+    import scipy.sparse
+
+    mask = (rows >= 0) & (columns >= 0)
+    k = scipy.sparse.coo_matrix((values[mask].astype(dtype, copy=False), (rows[mask], columns[mask])), shape=(size, size))
+
+    return k.tocsr()
+
+
+def assemble(indices, matrices, size: int, dtype=numpy.float64, groups=None) -> 'scipy.sparse.csr_matrix':
+    """Assembles (n, m, m) element matrices into a global sparse matrix of the given dtype
+
+    indices is a (n, m) array with the global index of each element DoF, and
+    entries whose index is -1 are skipped.  If groups is given, matrices holds the
+    distinct matrices returned for the groups of deduplicate, and each element uses
+    the matrix of its group.
+    """
+
+    compiled = jit.get_kernels()
+    if compiled is not None:
+        import scipy.sparse
+
+        if groups is None:
+            groups = numpy.arange(len(indices))
+        data, columns, indptr = compiled.assemble_csr(numpy.ascontiguousarray(indices, dtype=numpy.int64),
+                                                      numpy.ascontiguousarray(matrices, dtype=float),
+                                                      numpy.ascontiguousarray(groups, dtype=numpy.int64), size)
+        return scipy.sparse.csr_matrix((data.astype(dtype, copy=False), columns, indptr), shape=(size, size))
+
+    if groups is not None:
+        matrices = matrices[groups]
+    rows, columns, values = get_triplets(indices, matrices)
+
+    return assemble_triplets(rows, columns, values, size, dtype)
+
+
+def get_member_end_forces(elements, indices, displacements, axial_forces=None, tolerance: float = None) -> numpy.array:
+    """Returns the local end forces k_local*T*d of a list of elements
+
+    indices is the (n_elements, 6) array returned by get_nodal_dof_indices, and
+    displacements is either a global displacement vector or a (m, n_dofs) block of
+    them, in which case the result has shape (m, n_elements, 6).  If axial_forces is
+    given, the geometric stiffness is added to the elastic stiffness.  If tolerance
+    is given, elements are grouped by deduplicate and each distinct local stiffness
+    matrix is computed once.
+    """
+
+    lengths, cosines, sines = get_geometry(elements)
+    EA, EI, bending = get_properties(elements)
+
+    # missing DoFs (-1) pick the trailing zero
+    padding = numpy.zeros(numpy.shape(displacements)[:-1] + (1,))
+    d_global = numpy.concatenate((displacements, padding), axis=-1)[..., indices]
+    d_local = rotate_to_local(d_global, cosines, sines)
+
+    if tolerance is not None and axial_forces is None:
+        # local matrices do not depend on the orientation of the element
+        first, groups = deduplicate((lengths, EA, EI, bending), tolerance)
+        k_local = get_local_stiffness(lengths[first], EA[first], EI[first], bending[first])[groups]
+    else:
+        k_local = get_local_stiffness(lengths, EA, EI, bending)
+        if axial_forces is not None:
+            k_local += get_geometric_stiffness(lengths, axial_forces, bending)
+
+    return numpy.einsum('nij,...nj->...ni', k_local, d_local)
+
+
+def get_shape_functions(xi, lengths, bending, derivative: int = 0) -> numpy.array:
+    """Returns the (n, m, 6) shape functions, or their x derivatives, at m stations of n elements
+
+    Stations are given as ratios xi = x/L, and shape functions follow the local
+    [u1, v1, r1, u2, v2, r2] layout: linear for the axial displacement, and cubic
+    Hermite for the transverse displacement of elements with bending.  Elements
+    without bending interpolate the transverse displacement linearly.
+    """
+
+    xi = numpy.asarray(xi, dtype=float)[numpy.newaxis, :]
+    L = numpy.asarray(lengths, dtype=float)[:, numpy.newaxis]
+    bending = numpy.asarray(bending, dtype=bool)[:, numpy.newaxis]
+    one = numpy.ones_like(xi)
+    zero = numpy.zeros_like(xi)
+
+    linear = [(1 - xi, xi), (-one, one)]
+    hermite = [
+        (1 - 3*xi**2 + 2*xi**3, xi - 2*xi**2 + xi**3, 3*xi**2 - 2*xi**3, xi**3 - xi**2),
+        (6*xi**2 - 6*xi, 1 - 4*xi + 3*xi**2, 6*xi - 6*xi**2, 3*xi**2 - 2*xi),
+        (12*xi - 6, 6*xi - 4, 6 - 12*xi, 6*xi - 2),
+        (12*one, 6*one, -12*one, 6*one),
+    ]
+
+    # derivatives with respect to x = xi*L
+    scale = L**-derivative
+    N_linear = linear[derivative] if derivative < 2 else (zero, zero)
+    H = hermite[derivative] if derivative < 4 else (zero, zero, zero, zero)
+
+    N = numpy.zeros((L.shape[0], xi.shape[1], 6))
+    N[:, :, 0] = N_linear[0]*scale
+    N[:, :, 3] = N_linear[1]*scale
+    N[:, :, 1] = numpy.where(bending, H[0], N_linear[0])*scale
+    N[:, :, 4] = numpy.where(bending, H[2], N_linear[1])*scale
+    N[:, :, 2] = numpy.where(bending, H[1]*L, 0.0)*scale
+    N[:, :, 5] = numpy.where(bending, H[3]*L, 0.0)*scale
+
+    return N
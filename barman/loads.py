@@ -0,0 +1,180 @@
+"""
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from typing import List, Tuple
+import numpy
+from barman import kernels
+from barman.elements import BarElement, Bar2
+
+
+class ElementLoad:
+    """Base class of the loads applied along the length of a bar element
+
+    Member loads vary linearly between start_value and end_value, given per unit
+    length as [along, across] components of the element's local axes, or as [x, y]
+    components of the global axes if local is false.
+    """
+
+    def __init__(self, element: BarElement):
+        if not isinstance(element, BarElement):
+            raise TypeError('element must be a BarElement')
+
+        self._element: BarElement = element
+
+    @property
+    def element(self) -> BarElement:
+        return self._element
+
+    @property
+    def start_value(self) -> Tuple[float, float]:
+        return (0.0, 0.0)
+
+    @property
+    def end_value(self) -> Tuple[float, float]:
+        return (0.0, 0.0)
+
+    @property
+    def local(self) -> bool:
+        return True
+
+    @property
+    def strain(self) -> float:
+        return 0.0
+
+
+class LinearLoad(ElementLoad):
+    """A load which varies linearly between the start and end nodes of a bar element"""
+
+    def __init__(self, element: BarElement, start_value, end_value, local: bool = True):
+        super().__init__(element)
+        self._start_value = tuple(start_value)
+        self._end_value = tuple(end_value)
+        self._local: bool = local
+
+    @property
+    def start_value(self) -> Tuple[float, float]:
+        return self._start_value
+
+    @property
+    def end_value(self) -> Tuple[float, float]:
+        return self._end_value
+
+    @property
+    def local(self) -> bool:
+        return self._local
+
+
+class UniformLoad(LinearLoad):
+    """A load uniformly distributed along a bar element"""
+
+    def __init__(self, element: BarElement, value, local: bool = True):
+        super().__init__(element, value, value, local)
+
+
+class ThermalStrain(ElementLoad):
+    """An axial strain imposed on a bar element, such as the one caused by a temperature change"""
+
+    def __init__(self, element: BarElement, strain: float):
+        super().__init__(element)
+        self._strain: float = strain
+
+    @property
+    def strain(self) -> float:
+        return self._strain
+
+
+def get_local_load_values(element_loads: List[ElementLoad], cosines, sines) -> numpy.array:
+    """Returns a (n, 4) array with the [axial_start, transverse_start, axial_end, transverse_end] load values in local coordinates"""
+
+    values = numpy.array([load.start_value + load.end_value for load in element_loads], dtype=float).reshape(-1, 4)
+    local = numpy.array([load.local for load in element_loads], dtype=bool)
+
+    # project global components onto the element axes
+    c = numpy.where(local, 1.0, cosines)[:, numpy.newaxis]
+    s = numpy.where(local, 0.0, sines)[:, numpy.newaxis]
+    x = values[:, [0, 2]]
+    y = values[:, [1, 3]]
+    values[:, [0, 2]] = c*x + s*y
+    values[:, [1, 3]] = -s*x + c*y
+
+    return values
+
+
+def get_fixed_end_forces(element_loads: List[ElementLoad]) -> numpy.array:
+    """Returns the (n, 6) local equivalent nodal forces of a list of element loads, computed in a single pass"""
+
+    elements = [load.element for load in element_loads]
+    lengths, cosines, sines = kernels.get_geometry(elements)
+
+    return _get_fixed_end_forces(element_loads, elements, lengths, cosines, sines)
+
+
+def _get_fixed_end_forces(element_loads, elements, lengths, cosines, sines) -> numpy.array:
+    values = get_local_load_values(element_loads, cosines, sines)
+
+    EA = numpy.array([elem.material.young_modulus*elem.section.area for elem in elements], dtype=float)
+    strain = numpy.array([load.strain for load in element_loads], dtype=float)
+    pinned = numpy.array([isinstance(elem, Bar2) for elem in elements], dtype=bool)
+
+    return kernels.get_fixed_end_forces(lengths, values[:, 0], values[:, 2], values[:, 1], values[:, 3], EA*strain, pinned)
+
+
+def get_equivalent_nodal_forces(element_loads: List[ElementLoad], dof_order) -> (numpy.array, numpy.array):
+    """Returns the global DoF indices and the global equivalent nodal forces of a list of element loads
+
+    Both arrays have shape (n, 6), and DoFs absent from dof_order are flagged with -1.
+    """
+
+    elements = [load.element for load in element_loads]
+    lengths, cosines, sines = kernels.get_geometry(elements)
+
+    f_local = _get_fixed_end_forces(element_loads, elements, lengths, cosines, sines)
+    f_global = kernels.rotate_to_global(f_local, cosines, sines)
+    indices = kernels.get_nodal_dof_indices(elements, dof_order)
+
+    return indices, f_global
+
+
+def get_element_fixed_end_forces(elements, element_loads: List[ElementLoad]) -> numpy.array:
+    """Returns the (n_elements, 6) local equivalent nodal forces of the loads applied on each element"""
+
+    f = numpy.zeros((len(elements), 6))
+
+    if len(element_loads) > 0:
+        position = {id(elem): i for i, elem in enumerate(elements)}
+        rows = numpy.array([position[id(load.element)] for load in element_loads], dtype=numpy.int64)
+        numpy.add.at(f, rows, get_fixed_end_forces(element_loads))
+
+    return f
+
+
+def get_element_load_values(elements, element_loads: List[ElementLoad]) -> numpy.array:
+    """Returns the (n_elements, 5) [axial_start, transverse_start, axial_end, transverse_end, strain] load totals of each element"""
+
+    values = numpy.zeros((len(elements), 5))
+
+    if len(element_loads) > 0:
+        position = {id(elem): i for i, elem in enumerate(elements)}
+        rows = numpy.array([position[id(load.element)] for load in element_loads], dtype=numpy.int64)
+        lengths, cosines, sines = kernels.get_geometry([load.element for load in element_loads])
+
+        numpy.add.at(values[:, :4], rows, get_local_load_values(element_loads, cosines, sines))
+        numpy.add.at(values[:, 4], rows, [load.strain for load in element_loads])
+
+    return values
@@ -22,11 +22,11 @@ class LinearElastic:
     """Represents a linear elastic material"""
 
 
-    def __init__(self, name: str, young_modulus: float, poisson_ratio: float):
+    def __init__(self, name: str, young_modulus: float, poisson_ratio: float, density: float = 0.0):
         self._name: str = name
         self._young_modulus: float = young_modulus
         self._poisson_ratio: float = poisson_ratio
-        self._density: float = 0.0
+        self._density: float = density
 
     @property
     def young_modulus(self) -> float:
@@ -0,0 +1,197 @@
+"""Detects mechanisms which make the stiffness matrix of a model singular, before it is factorized
+
+The checks are cheap and only find the usual modelling errors, not every mechanism:
+
+    floating: a connected part of the structure without any prescribed displacement
+    rigid body: a connected part whose prescribed displacements leave a rigid body mode free
+    local: a node whose own stiffness block is singular, such as a node between
+        collinear Bar2 elements with no support across them, or a free rotation
+        which no element resists
+
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from typing import List
+import numpy
+from barman import kernels
+from barman.dofs import Parameter
+
+
+FLOATING = 'floating'
+RIGID_BODY = 'rigid body'
+LOCAL = 'local'
+
+DESCRIPTIONS = {
+    FLOATING: 'parts without any support',
+    RIGID_BODY: 'parts with an unrestrained rigid body mode',
+    LOCAL: 'nodes with an unrestrained local mode',
+}
+
+
+class MechanismError(ValueError):
+    """Raised when a model is a mechanism
+
+    Attributes:
+        mechanisms: list of (kind, nodes) pairs describing each mechanism
+    """
+
+    def __init__(self, mechanisms):
+        self.mechanisms = mechanisms
+        super().__init__('the model is a mechanism: ' + '; '.join(
+            '{} at {}'.format(DESCRIPTIONS[kind], ', '.join(str(node) for node in get_listed(nodes)))
+            for kind, nodes in mechanisms))
+
+    def get_nodes(self) -> List:
+        """Returns the nodes of all mechanisms"""
+        return [node for kind, nodes in self.mechanisms for node in nodes]
+
+
+def get_listed(nodes, limit: int = 5) -> List:
+    """Returns the first nodes of a list, followed by a count of the omitted ones"""
+
+    if len(nodes) <= limit:
+        return list(nodes)
+
+    return list(nodes[:limit]) + ['{} more'.format(len(nodes) - limit)]
+
+
+def get_rigid_body_modes(coordinates, parameters, angles) -> numpy.array:
+    """Returns the (n, 3) components of the x translation, y translation and rotation of DoFs
+
+    Args:
+        coordinates: (n, 2) coordinates of the node of each DoF, relative to the rotation centre
+        parameters: dofs.Parameter value of each DoF
+        angles: angle of the coordinate system of the node of each DoF
+    """
+
+    x, y = coordinates.T
+    c, s = numpy.cos(angles), numpy.sin(angles)
+    zeros = numpy.zeros(len(x))
+
+    # rigid body displacements along the global axes
+    dx = numpy.column_stack((numpy.ones(len(x)), zeros, -y))
+    dy = numpy.column_stack((zeros, numpy.ones(len(x)), x))
+    rz = numpy.column_stack((zeros, zeros, numpy.ones(len(x))))
+
+    # projected on the axes of the nodal coordinate systems
+    modes = numpy.where((parameters == Parameter.dx.value)[:, numpy.newaxis], c[:, numpy.newaxis]*dx + s[:, numpy.newaxis]*dy, rz)
+    modes = numpy.where((parameters == Parameter.dy.value)[:, numpy.newaxis], c[:, numpy.newaxis]*dy - s[:, numpy.newaxis]*dx, modes)
+
+    return modes
+
+
+def find_mechanisms(model, dof_order, essential_global_dofs, tolerance: float = 1e-10):
+    """Returns the (kind, nodes) pairs of the mechanisms found in a model
+
+    Args:
+        model: linear elastic model
+        dof_order: DoF map, with essential DoFs first
+        essential_global_dofs: set of essential global DoFs
+        tolerance: relative size of the singular values which are considered zero
+    """
+
+    import scipy.sparse
+    import scipy.sparse.csgraph
+
+    elements = model.elements
+    if len(elements) == 0:
+        return []
+
+    nodes, positions = kernels.get_nodal_layout(dof_order)
+    n_nodes = len(nodes)
+    n_essential = len(essential_global_dofs)
+
+    # nodal index and free DoF mask of each [dx, dy, rz] slot of each node
+    indices = kernels.get_nodal_dof_indices(elements, dof_order)
+    connectivity = positions[indices[:, [0, 3]]]//3
+    free = numpy.zeros(3*n_nodes, dtype=bool)
+    free[positions[n_essential:]] = True
+    free = free.reshape(n_nodes, 3)
+
+    mechanisms = []
+
+    # parts of the structure, and their supports
+    graph = scipy.sparse.coo_matrix((numpy.ones(len(elements)), (connectivity[:, 0], connectivity[:, 1])), shape=(n_nodes, n_nodes))
+    n_parts, labels = scipy.sparse.csgraph.connected_components(graph, directed=False)
+
+    # supported nodes without elements are not part of the structure
+    structural = numpy.zeros(n_parts, dtype=bool)
+    structural[labels[connectivity[:, 0]]] = True
+
+    coordinates = numpy.array([node.position[:2] for node in nodes], dtype=float).reshape(-1, 2)
+    essential = list(dof_order)[:n_essential]
+    essential_nodes = positions[:n_essential]//3
+    parameters = numpy.array([gdof.parameter.value for gdof in essential], dtype=numpy.int64)
+    angles = numpy.array([gdof.node.coordinate_system.angle for gdof in essential], dtype=float)
+
+    for part in numpy.flatnonzero(structural):
+        part_nodes = numpy.flatnonzero(labels == part)
+        supported = labels[essential_nodes] == part
+        if not numpy.any(supported):
+            mechanisms.append((FLOATING, [nodes[i] for i in part_nodes]))
+            continue
+
+        centre = coordinates[part_nodes].mean(axis=0)
+        scale = numpy.abs(coordinates[part_nodes] - centre).max() or 1.0
+        modes = get_rigid_body_modes((coordinates[essential_nodes[supported]] - centre)/scale,
+                                     parameters[supported], angles[supported])
+        singular_values = numpy.linalg.svd(modes, compute_uv=False)
+        if len(singular_values) < 3 or singular_values[-1] <= tolerance*singular_values[0]:
+            mechanisms.append((RIGID_BODY, [nodes[i] for i in part_nodes]))
+
+    # the diagonal block of each node is singular if any of its free DoFs has no stiffness
+    k = kernels.get_global_stiffness(elements)
+    blocks = numpy.zeros((n_nodes, 3, 3))
+    numpy.add.at(blocks, connectivity[:, 0], k[:, :3, :3])
+    numpy.add.at(blocks, connectivity[:, 1], k[:, 3:, 3:])
+
+    # rotated to the coordinate systems of the nodes
+    node_angles = numpy.array([node.coordinate_system.angle for node in nodes], dtype=float)
+    if numpy.any(node_angles != 0):
+        transformations = numpy.zeros((n_nodes, 3, 3))
+        transformations[:, 0, 0] = transformations[:, 1, 1] = numpy.cos(node_angles)
+        transformations[:, 0, 1] = numpy.sin(node_angles)
+        transformations[:, 1, 0] = -numpy.sin(node_angles)
+        transformations[:, 2, 2] = 1.0
+        blocks = transformations @ blocks @ transformations.transpose(0, 2, 1)
+
+    # translations and rotations have different units, so zero diagonals are relative to the largest of their kind
+    diagonal = numpy.abs(numpy.diagonal(blocks, axis1=1, axis2=2))
+    largest = numpy.where(free, diagonal, 0.0).max(axis=0, initial=0.0)
+    largest[:2] = largest[:2].max()
+    stiff = free & (diagonal > tolerance*largest)
+
+    # D^-1/2*B*D^-1/2 over the stiff DoFs is independent of the units, with a unit diagonal
+    inverse = numpy.where(stiff, 1.0/numpy.sqrt(numpy.where(stiff, diagonal, 1.0)), 0.0)
+    blocks = inverse[:, :, numpy.newaxis]*blocks*inverse[:, numpy.newaxis, :]
+    blocks += (~stiff)[:, :, numpy.newaxis]*numpy.eye(3)
+
+    eigenvalues = numpy.linalg.eigvalsh(blocks)
+    local = numpy.any(free & ~stiff, axis=1) | (free.any(axis=1) & (eigenvalues[:, 0] <= tolerance))
+    if numpy.any(local):
+        mechanisms.append((LOCAL, [nodes[i] for i in numpy.flatnonzero(local)]))
+
+    return mechanisms
+
+
+def check(model, dof_order, essential_global_dofs, tolerance: float = 1e-10) -> None:
+    """Raises a MechanismError listing the offending nodes if a model is a mechanism"""
+
+    mechanisms = find_mechanisms(model, dof_order, essential_global_dofs, tolerance)
+    if mechanisms:
+        raise MechanismError(mechanisms)
@@ -22,6 +22,7 @@ from barman.dofs import GlobalDoFLink
 from barman.elements import BarElement
 from barman.prescribed_displacements import PrescribedDisplacement
 from barman.prescribed_forces import PrescribedForce
+from barman.loads import ElementLoad
 
 
 class Static:
@@ -37,6 +38,7 @@ class Static:
         self._elements: List[BarElement] = []
         self._prescribed_displacements: List[PrescribedDisplacement] = []
         self._prescribed_forces: List[PrescribedForce] = []
+        self._element_loads: List[ElementLoad] = []
         self._global_dof_links: List[GlobalDoFLink] = [] # links between GlobalDoFs
 
 
@@ -85,6 +87,22 @@ class Static:
         return self._prescribed_forces
 
 
+    def append_element_load(self, element_load: ElementLoad) -> None:
+        """Appends a load distributed along an element"""
+
+        if not isinstance(element_load, ElementLoad):
+            raise TypeError('element load must be an ElementLoad')
+
+        self._element_loads.append(element_load)
+
+
+    @property
+    def element_loads(self) -> List[ElementLoad]:
+        """Get the element loads list."""
+
+        return self._element_loads
+
+
     def append_global_dof_link(self, global_dof_link: GlobalDoFLink) -> None:
         """Appends a link between global degrees of freedom (DoF)"""
 
@@ -0,0 +1,359 @@
+"""
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy
+from barman import dofs, kernels, materials, models, sections, solvers
+from barman.elements import Bar2
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+
+
+def get_ground_structure(nodes, max_length: float = None, chunk_size: int = 2**20) -> numpy.array:
+    """Returns the (m, 2) node pairs of the candidate members which connect every pair of nodes
+
+    Args:
+        nodes: (n_nodes, 2) node coordinates
+        max_length: maximum length of a candidate member
+        chunk_size: approximate number of node pairs checked at once
+    """
+
+    nodes = numpy.asarray(nodes, dtype=float)
+    n = len(nodes)
+    rows_per_chunk = max(1, chunk_size//max(n, 1))
+
+    pairs = []
+    for start in range(0, n, rows_per_chunk):
+        i, j = numpy.nonzero(numpy.arange(start, min(start + rows_per_chunk, n))[:, numpy.newaxis] < numpy.arange(n)[numpy.newaxis, :])
+        i += start
+        if max_length is not None:
+            keep = numpy.hypot(*(nodes[j] - nodes[i]).T) <= max_length
+            i, j = i[keep], j[keep]
+        pairs.append(numpy.column_stack((i, j)))
+
+    return numpy.concatenate(pairs) if pairs else numpy.zeros((0, 2), dtype=numpy.int64)
+
+
+class TrussTopologyOptimization:
+    """Minimum compliance layout of a truss, by optimality criteria sizing of a ground structure
+
+    Members are described by arrays of node pairs and areas instead of element objects.
+    Only active members are assembled: members whose area falls below removal_threshold
+    times the largest area are dropped, and inactive candidates are added once the sizing
+    of the active members converges, if their strain energy density E*eps^2 exceeds the
+    optimality criteria multiplier by more than adding_tolerance.  The strains of the
+    candidates are computed from the nodal displacements, chunk by chunk, so the full
+    ground structure is never assembled.  Candidates which reach nodes that are not
+    restrained in both directions are not added, as their strains are undefined.
+    """
+
+
+    class Results:
+        """Stores the optimized layout"""
+
+        def __init__(self, nodes, members, areas, supports, forces, young_modulus, displacements, compliance_history, active_history, added_history):
+            self._nodes = nodes
+            self._members = members
+            self._areas = areas
+            self._supports = supports
+            self._forces = forces
+            self._young_modulus = young_modulus
+            self._displacements = displacements
+            self._compliance_history = compliance_history
+            self._active_history = active_history
+            self._added_history = added_history
+
+        def get_members(self) -> numpy.array:
+            """Returns the (n_members, 2) node pairs of the members of the layout"""
+            return self._members
+
+        def get_areas(self) -> numpy.array:
+            return self._areas
+
+        def get_volume(self) -> float:
+            lengths = numpy.hypot(*(self._nodes[self._members[:, 1]] - self._nodes[self._members[:, 0]]).T)
+            return float(numpy.dot(self._areas, lengths))
+
+        def get_displacements(self) -> numpy.array:
+            """Returns the (n_nodes, 2) [dx, dy] nodal displacements of the layout"""
+            return self._displacements
+
+        def get_axial_forces(self) -> numpy.array:
+            """Returns the axial force (tension positive) of each member of the layout"""
+
+            d = self._nodes[self._members[:, 1]] - self._nodes[self._members[:, 0]]
+            lengths = numpy.hypot(*d.T)
+            du = self._displacements[self._members[:, 1]] - self._displacements[self._members[:, 0]]
+
+            return self._young_modulus*self._areas*numpy.einsum('ij,ij->i', du, d)/lengths**2
+
+        def get_compliance_history(self) -> numpy.array:
+            return numpy.array(self._compliance_history)
+
+        def get_active_history(self) -> numpy.array:
+            """Returns the number of active members of each iteration"""
+            return numpy.array(self._active_history)
+
+        def get_added_history(self) -> numpy.array:
+            """Returns the number of members added at each iteration"""
+            return numpy.array(self._added_history)
+
+        def to_model(self) -> models.Static:
+            """Returns the layout as a static model of Bar2 elements"""
+
+            nodes = [dofs.Node([float(x), float(y)]) for x, y in self._nodes]
+            material = materials.LinearElastic('', self._young_modulus, 0.0)
+            parameters = (dofs.Parameter.dx, dofs.Parameter.dy)
+
+            model = models.Static()
+            for (i, j), area in zip(self._members, self._areas):
+                model.append_element( Bar2([nodes[i], nodes[j]], sections.Section(float(area), 0.0), material) )
+            for node, parameter in self._supports:
+                model.append_prescribed_displacement( PrescribedDisplacement(dofs.GlobalDoF(nodes[node], parameters[parameter]), 0.0) )
+            for node, parameter, value in self._forces:
+                model.append_prescribed_force( PrescribedForce(dofs.GlobalDoF(nodes[int(node)], parameters[int(parameter)]), float(value)) )
+
+            return model
+
+
+    def __init__(self, volume: float, young_modulus: float = 1.0, removal_threshold: float = 1e-4,
+                 move_limit: float = 0.2, damping: float = 0.5, tolerance: float = 1e-4,
+                 adding_tolerance: float = 0.05, max_added: int = None, added_ratio: float = 0.1,
+                 added_area: float = 0.01, max_iterations: int = 500,
+                 chunk_size: int = 2**16, regularization: float = 1e-9):
+        """
+        Args:
+            volume: total volume of the members
+            young_modulus: Young's modulus of all members
+            removal_threshold: members whose area is below this ratio of the largest area are removed
+            move_limit: largest change of an area in each iteration, as a ratio of the largest area
+            damping: exponent of the optimality criteria update
+            tolerance: relative change of the compliance below which sizing has converged
+            adding_tolerance: ratio by which the strain energy density of a candidate must exceed
+                the optimality criteria multiplier for it to be added
+            max_added: largest number of members added at once, which defaults to added_ratio
+                times the number of active members
+            added_ratio: largest number of members added at once, as a ratio of the active members
+            added_area: initial area of added members, as a ratio of the largest area
+            max_iterations: maximum number of iterations
+            chunk_size: number of candidates whose strains are computed at once
+            regularization: ratio of the mean stiffness matrix diagonal added to its diagonal,
+                which keeps nodes left without members from making the system singular
+        """
+
+        self._volume: float = volume
+        self._young_modulus: float = young_modulus
+        self._removal_threshold: float = removal_threshold
+        self._move_limit: float = move_limit
+        self._damping: float = damping
+        self._tolerance: float = tolerance
+        self._adding_tolerance: float = adding_tolerance
+        self._max_added: int = max_added
+        self._added_ratio: float = added_ratio
+        self._added_area: float = added_area
+        self._max_iterations: int = max_iterations
+        self._chunk_size: int = chunk_size
+        self._regularization: float = regularization
+        self._solver = solvers.DirectSolver()
+
+
+    def get_strains(self, nodes, members, displacements) -> numpy.array:
+        """Returns the axial strain of members given by (n, 2) node pairs"""
+
+        strains = numpy.empty(len(members))
+        for start in range(0, len(members), self._chunk_size):
+            chunk = members[start:start + self._chunk_size]
+            d = nodes[chunk[:, 1]] - nodes[chunk[:, 0]]
+            du = displacements[chunk[:, 1]] - displacements[chunk[:, 0]]
+            strains[start:start + len(chunk)] = numpy.einsum('ij,ij->i', du, d)/numpy.einsum('ij,ij->i', d, d)
+
+        return strains
+
+
+    def solve(self, nodes, members, areas, supports, forces) -> (numpy.array, float):
+        """Returns the (n_nodes, 2) displacements and the compliance of a truss"""
+
+        import scipy.sparse
+
+        n_dofs = 2*len(nodes)
+        free = numpy.ones(n_dofs, dtype=bool)
+        free[2*supports[:, 0] + supports[:, 1]] = False
+        numbering = numpy.full(n_dofs, -1, dtype=numpy.int64)
+        numbering[free] = numpy.arange(numpy.count_nonzero(free))
+        n_free = len(numbering[free])
+
+        d = nodes[members[:, 1]] - nodes[members[:, 0]]
+        lengths = numpy.hypot(*d.T)
+        k = kernels.get_truss_stiffness(lengths, d[:, 0]/lengths, d[:, 1]/lengths, self._young_modulus*areas)
+        indices = numbering.reshape(-1, 2)[members].reshape(-1, 4)
+
+        k_ff = kernels.assemble(indices, k, n_free)
+        k_ff = k_ff + self._regularization*max(k_ff.diagonal().mean(), 1e-300)*scipy.sparse.identity(n_free, format='csr')
+
+        load_indices = numbering[2*forces[:, 0].astype(numpy.int64) + forces[:, 1].astype(numpy.int64)]
+        loaded = load_indices >= 0
+        f = kernels.scatter(load_indices[loaded], forces[loaded, 2], n_free)
+
+        u = numpy.zeros(n_dofs)
+        u[free] = self._solver.solve(k_ff.tocsc(), f)
+
+        return u.reshape(-1, 2), float(numpy.dot(f, u[free]))
+
+
+    def update_areas(self, areas, energy, lengths) -> numpy.array:
+        """Returns the optimality criteria update of the areas, given the strain energy density of each member
+
+        The multiplier is found by bisection so that the updated areas have the prescribed volume.
+        """
+
+        move = self._move_limit*areas.max()
+        lower = numpy.maximum(areas - move, 0.0)
+        upper = areas + move
+
+        def get_areas(multiplier):
+            return numpy.clip(areas*(energy/multiplier)**self._damping, lower, upper)
+
+        def get_volume(multiplier):
+            return numpy.dot(get_areas(multiplier), lengths)
+
+        # bracket the multiplier, then bisect it geometrically
+        low = high = max(numpy.dot(energy*areas, lengths)/self._volume, 1e-300)
+        for i in range(200):
+            if get_volume(low) >= self._volume:
+                break
+            low /= 2.0
+        for i in range(200):
+            if get_volume(high) <= self._volume:
+                break
+            high *= 2.0
+
+        for i in range(100):
+            middle = numpy.sqrt(low*high)
+            if get_volume(middle) > self._volume:
+                low = middle
+            else:
+                high = middle
+            if high <= low*(1.0 + 1e-12):
+                break
+
+        return get_areas(numpy.sqrt(low*high))
+
+
+    def get_stable_nodes(self, nodes, members, supports) -> numpy.array:
+        """Returns whether each node is restrained in both directions by members or supports
+
+        The displacements of the other nodes, such as nodes without members or nodes between
+        collinear members, are only set by the regularization.
+        """
+
+        d = nodes[members[:, 1]] - nodes[members[:, 0]]
+        d /= numpy.hypot(*d.T)[:, numpy.newaxis]
+
+        # sum of the outer products of the directions of the members, and of the supports, at each node
+        n = len(nodes)
+        ends = members.ravel()
+        xx = numpy.bincount(ends, numpy.repeat(d[:, 0]**2, 2), n) + numpy.bincount(supports[:, 0], supports[:, 1] == 0, n)
+        yy = numpy.bincount(ends, numpy.repeat(d[:, 1]**2, 2), n) + numpy.bincount(supports[:, 0], supports[:, 1] == 1, n)
+        xy = numpy.bincount(ends, numpy.repeat(d[:, 0]*d[:, 1], 2), n)
+
+        return xx*yy - xy**2 > 1e-6*(xx + yy)**2
+
+
+    def add_members(self, nodes, candidates, active, supports, displacements, multiplier) -> numpy.array:
+        """Returns the indices of the inactive candidates which violate the optimality criteria the most"""
+
+        stable = self.get_stable_nodes(nodes, candidates[active], supports)
+        inactive = numpy.flatnonzero(~active & stable[candidates[:, 0]] & stable[candidates[:, 1]])
+        energy = self._young_modulus*self.get_strains(nodes, candidates[inactive], displacements)**2
+        violating = numpy.flatnonzero(energy > (1.0 + self._adding_tolerance)*multiplier)
+
+        max_added = self._max_added or max(1, int(self._added_ratio*numpy.count_nonzero(active)))
+        order = numpy.argsort(-energy[violating])[:max_added]
+
+        return inactive[violating[order]]
+
+
+    def run(self, nodes, supports, forces, candidates, initial=None) -> 'TrussTopologyOptimization.Results':
+        """Optimizes the layout of a truss
+
+        Args:
+            nodes: (n_nodes, 2) node coordinates
+            supports: (n, 2) rows of [node, parameter] fixed DoFs, with parameter 0 for dx and 1 for dy
+            forces: (n, 3) rows of [node, parameter, value] nodal forces
+            candidates: (m, 2) node pairs of the candidate members, such as the ones from get_ground_structure
+            initial: indices of the initially active candidates, which default to the ones
+                no longer than 1.5 times the shortest candidate
+        """
+
+        nodes = numpy.asarray(nodes, dtype=float)
+        supports = numpy.asarray(supports, dtype=numpy.int64).reshape(-1, 2)
+        forces = numpy.asarray(forces, dtype=float).reshape(-1, 3)
+        candidates = numpy.asarray(candidates, dtype=numpy.int64).reshape(-1, 2)
+        lengths = numpy.hypot(*(nodes[candidates[:, 1]] - nodes[candidates[:, 0]]).T)
+
+        if initial is None:
+            initial = numpy.flatnonzero(lengths <= 1.5*lengths.min())
+
+        active = numpy.zeros(len(candidates), dtype=bool)
+        active[initial] = True
+        areas = numpy.zeros(len(candidates))
+        areas[active] = self._volume/lengths[active].sum()
+
+        compliance_history = []
+        active_history = []
+        added_history = []
+        previous = None
+
+        for iteration in range(self._max_iterations):
+            members = numpy.flatnonzero(active)
+            displacements, compliance = self.solve(nodes, candidates[members], areas[members], supports, forces)
+            compliance_history.append(compliance)
+            active_history.append(len(members))
+            added_history.append(0)
+
+            # once the sizing of the active members converges, add the candidates which violate the optimality criteria
+            if previous is not None and abs(compliance - previous) <= self._tolerance*compliance:
+                added = self.add_members(nodes, candidates, active, supports, displacements, compliance/self._volume)
+                if len(added) == 0:
+                    break
+
+                active[added] = True
+                areas[added] = self._added_area*areas[members].max()
+                added_history[-1] = len(added)
+                previous = None
+                continue
+
+            previous = compliance
+            energy = self._young_modulus*self.get_strains(nodes, candidates[members], displacements)**2
+            areas[members] = self.update_areas(areas[members], energy, lengths[members])
+
+            removed = members[areas[members] < self._removal_threshold*areas[members].max()]
+            active[removed] = False
+            areas[removed] = 0.0
+        else:
+            # the last iteration updated the areas after solving, so the final layout is solved again
+            members = numpy.flatnonzero(active)
+            displacements, compliance = self.solve(nodes, candidates[members], areas[members], supports, forces)
+            compliance_history.append(compliance)
+            active_history.append(len(members))
+            added_history.append(0)
+
+        members = numpy.flatnonzero(active)
+
+        return TrussTopologyOptimization.Results(nodes, candidates[members], areas[members], supports, forces,
+                                                 self._young_modulus, displacements, compliance_history, active_history, added_history)
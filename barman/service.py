@@ -0,0 +1,261 @@
+"""A long-running analysis service speaking a JSON-lines protocol
+
+Each request is one JSON object per line:
+
+    {"id": "job-1", "method": "run", "model": {...}}    runs a LinearStatic analysis
+    {"id": "job-1", "method": "cancel"}                   cancels a pending or running job
+
+where model follows the bulk array format of barman.bulk.  Ids are scoped to
+their connection, and may only be reused once their job has finished.  Each
+run request gets exactly one response line, written as soon as it completes,
+in any order:
+
+    {"id": "job-1", "status": "ok", "result": {...}}
+    {"id": "job-1", "status": "cancelled"}
+    {"id": "job-1", "status": "error", "error": "..."}
+
+The service is reached through stdin/stdout or a Unix socket:
+
+    python -m barman.service [--socket PATH] [--workers N] [--max-pending N]
+
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy
+from barman import analysis, bulk
+
+
+def run_job(data):
+    """Runs a LinearStatic analysis of a model in the bulk array format, returning its results as lists"""
+
+    results = analysis.LinearStatic().run(bulk.model_from_arrays(data))
+    arrays = bulk.results_to_arrays(data, results)
+
+    return {key: numpy.asarray(value).tolist() for key, value in arrays.items()}
+
+
+class AnalysisService:
+    """Runs analysis jobs concurrently on warm executor workers behind an asyncio queue
+
+    At most max_pending jobs wait in the queue: once it is full, reading further
+    requests is suspended, which pushes back on clients through their connection.
+    """
+
+    # function which runs a job in the executor
+    job_function = staticmethod(run_job)
+
+
+    def __init__(self, workers: int = 2, max_pending: int = 16, executor=None):
+        """
+        Args:
+            workers: number of jobs run concurrently
+            max_pending: number of jobs which may wait in the queue
+            executor: concurrent.futures executor running the jobs, which defaults to a
+                process pool whose workers keep the barman and scipy imports warm.  Its
+                workers are started by a fork server, so that they never inherit the
+                sockets of client connections
+        """
+
+        self._workers: int = workers
+        self._max_pending: int = max_pending
+        self._executor = executor
+        self._queue: asyncio.Queue = None
+        # futures of unfinished jobs, keyed by (connection, id)
+        self._jobs = dict()
+        self._tasks = []
+
+
+    async def start(self) -> None:
+        """Starts the executor and the consumer tasks"""
+
+        if self._executor is None:
+            context = multiprocessing.get_context('forkserver')
+            self._executor = ProcessPoolExecutor(max_workers=self._workers, mp_context=context)
+
+        self._queue = asyncio.Queue(maxsize=self._max_pending)
+        self._tasks = [asyncio.ensure_future(self._consume()) for i in range(self._workers)]
+
+
+    async def close(self) -> None:
+        """Cancels all jobs and stops the consumer tasks and the executor"""
+
+        for future in list(self._jobs.values()):
+            future.cancel()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        # waiting for the workers would block the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown, True)
+
+
+    async def submit(self, job_id, data, connection=None) -> asyncio.Future:
+        """Queues a job, waiting while the queue is full, and returns the future of its result
+
+        Raises a ValueError if a job with the same id has not finished yet on the same
+        connection, as its future could no longer be cancelled or answered.
+
+        Args:
+            job_id: id of the job, unique among the unfinished jobs of its connection
+            data: model in the bulk array format
+            connection: hashable object identifying the client which owns the job
+        """
+
+        previous = self._jobs.get((connection, job_id))
+        if previous is not None and not previous.done():
+            raise ValueError('duplicate job id: {}'.format(job_id))
+
+        future = asyncio.get_running_loop().create_future()
+        self._jobs[(connection, job_id)] = future
+        await self._queue.put((job_id, data, future))
+
+        return future
+
+
+    def cancel(self, job_id, connection=None) -> bool:
+        """Cancels a job of a connection, returning false if it is unknown or already done"""
+
+        future = self._jobs.get((connection, job_id))
+        if future is None or future.done():
+            return False
+
+        return future.cancel()
+
+
+    async def _consume(self) -> None:
+        while True:
+            job_id, data, future = await self._queue.get()
+            try:
+                if future.cancelled():
+                    continue
+
+                result = await asyncio.wrap_future(self._executor.submit(self.job_function, data))
+                if not future.done():
+                    future.set_result(result)
+            except Exception as error:
+                if not future.done():
+                    future.set_exception(error)
+            finally:
+                self._queue.task_done()
+
+
+    async def _respond(self, job_id, connection, future, writer, lock) -> None:
+        try:
+            response = {'id': job_id, 'status': 'ok', 'result': await future}
+        except asyncio.CancelledError:
+            response = {'id': job_id, 'status': 'cancelled'}
+        except Exception as error:
+            response = {'id': job_id, 'status': 'error', 'error': str(error)}
+        finally:
+            if self._jobs.get((connection, job_id)) is future:
+                del self._jobs[(connection, job_id)]
+
+        async with lock:
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+
+
+    async def handle_connection(self, reader, writer) -> None:
+        """Serves the JSON-lines protocol over a pair of streams, until the reader reaches its end"""
+
+        lock = asyncio.Lock()
+        connection = object()
+        responses = set()
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+
+            job_id = None
+            try:
+                request = json.loads(line)
+                job_id = request.get('id')
+                method = request.get('method', 'run')
+
+                if method == 'run':
+                    future = await self.submit(job_id, request['model'], connection)
+                    response = asyncio.ensure_future(self._respond(job_id, connection, future, writer, lock))
+                    responses.add(response)
+                    response.add_done_callback(responses.discard)
+                elif method == 'cancel':
+                    self.cancel(job_id, connection)
+                else:
+                    raise ValueError('unknown method: {}'.format(method))
+            except Exception as error:
+                async with lock:
+                    writer.write((json.dumps({'id': job_id, 'status': 'error', 'error': str(error)}) + '\n').encode())
+                    await writer.drain()
+
+        await asyncio.gather(*responses)
+        writer.close()
+
+
+async def serve_unix(path: str, service: AnalysisService) -> None:
+    """Serves the protocol on a Unix socket until cancelled"""
+
+    await service.start()
+    server = await asyncio.start_unix_server(service.handle_connection, path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+async def serve_stdio(service: AnalysisService) -> None:
+    """Serves the protocol on stdin and stdout until stdin is closed"""
+
+    loop = asyncio.get_running_loop()
+
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout)
+    writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+
+    await service.start()
+    try:
+        await service.handle_connection(reader, writer)
+    finally:
+        await service.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='barman analysis service')
+    parser.add_argument('--socket', help='Unix socket path, instead of stdin/stdout')
+    parser.add_argument('--workers', type=int, default=2, help='number of concurrent jobs')
+    parser.add_argument('--max-pending', type=int, default=16, help='number of queued jobs')
+    args = parser.parse_args(argv)
+
+    service = AnalysisService(workers=args.workers, max_pending=args.max_pending)
+    if args.socket:
+        asyncio.run(serve_unix(args.socket, service))
+    else:
+        asyncio.run(serve_stdio(service))
+
+
+if __name__ == '__main__':
+    main()
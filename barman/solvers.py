@@ -0,0 +1,597 @@
+"""
+    This file is part of Barman.
+
+    Copyright 2017 by Rui Maciel <rui.maciel@gmail.com>
+
+    Barman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Barman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Barman.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import importlib.util
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+import numpy
+from barman import kernels
+
+
+class SuperLUBackend:
+    """Factorizes matrices with SuperLU, through scipy.sparse.linalg.splu"""
+
+    name = 'superlu'
+
+
+    def __init__(self, permc_spec: str = 'COLAMD'):
+        """
+        Args:
+            permc_spec: column ordering, either 'COLAMD', 'MMD_AT_PLUS_A', 'MMD_ATA' or 'NATURAL'
+        """
+
+        self.options = {'permc_spec': permc_spec}
+
+
+    @staticmethod
+    def is_available() -> bool:
+        return True
+
+
+    def factorize(self, k):
+        """Returns the factorization of k, which is also its solve function, and the approximate size of its factors in bytes"""
+
+        import scipy.sparse.linalg
+
+        k = k.tocsc()
+        lu = scipy.sparse.linalg.splu(k, permc_spec=self.options['permc_spec'])
+
+        # lu.L and lu.U would build copies of the factors, so their size is estimated from lu.nnz
+        index_bytes = numpy.dtype(numpy.intc).itemsize
+        memory = lu.nnz*(k.dtype.itemsize + index_bytes) + 2*(k.shape[0] + 1)*index_bytes
+
+        return lu.solve, memory
+
+
+class CholmodBackend:
+    """Factorizes symmetric positive definite matrices with the CHOLMOD Cholesky factorization of scikit-sparse"""
+
+    name = 'cholmod'
+
+
+    def __init__(self):
+        self.options = {}
+
+
+    @staticmethod
+    def is_available() -> bool:
+        return importlib.util.find_spec('sksparse') is not None
+
+
+    def factorize(self, k):
+        from sksparse.cholmod import cholesky
+
+        factor = cholesky(k.tocsc())
+        L = factor.L()
+
+        return factor, L.data.nbytes + L.indices.nbytes + L.indptr.nbytes
+
+
+class PardisoBackend:
+    """Factorizes matrices with the Intel MKL PARDISO solver, through pypardiso"""
+
+    name = 'pardiso'
+
+
+    def __init__(self):
+        self.options = {}
+
+
+    @staticmethod
+    def is_available() -> bool:
+        return importlib.util.find_spec('pypardiso') is not None
+
+
+    def factorize(self, k):
+        import pypardiso
+
+        k = k.tocsr()
+        solver = pypardiso.PyPardisoSolver()
+        solver.factorize(k)
+
+        # PARDISO does not report the size of its factors
+        return (lambda f: solver.solve(k, f)), None
+
+
+# direct solver backends, by name
+BACKENDS = {backend.name: backend for backend in (SuperLUBackend, CholmodBackend, PardisoBackend)}
+
+
+def get_available_backends() -> List[str]:
+    """Returns the names of the backends whose packages are installed"""
+
+    return [name for name, backend in BACKENDS.items() if backend.is_available()]
+
+
+def is_symmetric(k, tolerance: float = 1e-12) -> bool:
+    """Returns whether a sparse matrix is symmetric, up to a tolerance relative to its largest entry"""
+
+    if k.nnz == 0:
+        return True
+
+    return abs(k - k.T).max() <= tolerance*abs(k).max()
+
+
+def select_backend(k, symmetric: bool) -> str:
+    """Chooses a backend from the size, symmetry and number of non-zeros of a matrix
+
+    SuperLU has the lowest setup cost, so it factorizes small matrices.  Large
+    symmetric matrices, such as stiffness matrices, use CHOLMOD and other large
+    matrices use PARDISO, if they are installed.
+    """
+
+    available = get_available_backends()
+    large = k.shape[0] >= DirectSolver.MIN_SIZE or k.nnz >= DirectSolver.MIN_NNZ
+
+    if large and symmetric and CholmodBackend.name in available:
+        return CholmodBackend.name
+    if large and PardisoBackend.name in available:
+        return PardisoBackend.name
+
+    return SuperLUBackend.name
+
+
+class DirectSolver:
+    """Solves k_ff*d_f = f with a sparse direct solver backend from BACKENDS
+
+    With backend 'auto', the backend is chosen for each matrix by select_backend,
+    and SuperLU takes over if an optional backend fails, such as CHOLMOD on a
+    matrix which is not positive definite.  The backend, its options, its
+    factorization and solve times in seconds and the size of its factors in bytes
+    are recorded in info.
+    """
+
+    # smallest number of rows or of non-zeros for which optional backends are chosen
+    MIN_SIZE = 2000
+    MIN_NNZ = 100000
+
+
+    def __init__(self, backend: str = 'auto', permc_spec: str = 'COLAMD'):
+        """
+        Args:
+            backend: name of a backend from BACKENDS, or 'auto'
+            permc_spec: column ordering of the SuperLU backend
+        """
+
+        if backend != 'auto' and backend not in BACKENDS:
+            raise ValueError('unknown backend: {}'.format(backend))
+        if backend != 'auto' and not BACKENDS[backend].is_available():
+            raise ValueError('backend is not installed: {}'.format(backend))
+
+        self._backend: str = backend
+        self._permc_spec: str = permc_spec
+        self.info = dict()
+
+
+    def get_settings(self) -> dict:
+        """Returns the options of the solver which change its solutions"""
+        return {'backend': self._backend, 'permc_spec': self._permc_spec}
+
+
+    def get_backend(self, name: str):
+        """Returns an instance of a backend"""
+
+        if name == SuperLUBackend.name:
+            return SuperLUBackend(self._permc_spec)
+
+        return BACKENDS[name]()
+
+
+    def factorize(self, k_ff):
+        """Factorizes k_ff, returning a function which solves it for a right-hand side or a block of them"""
+
+        import scipy.sparse
+
+        k_ff = scipy.sparse.csr_matrix(k_ff)
+        symmetric = is_symmetric(k_ff)
+        name = select_backend(k_ff, symmetric) if self._backend == 'auto' else self._backend
+        backend = self.get_backend(name)
+
+        start = time.perf_counter()
+        try:
+            solve, memory = backend.factorize(k_ff)
+        except Exception:
+            if self._backend != 'auto' or name == SuperLUBackend.name:
+                raise
+            backend = self.get_backend(SuperLUBackend.name)
+            start = time.perf_counter()
+            solve, memory = backend.factorize(k_ff)
+
+        self.info = {
+            'backend': backend.name,
+            'options': dict(backend.options),
+            'size': k_ff.shape[0],
+            'nnz': k_ff.nnz,
+            'symmetric': symmetric,
+            'factorization_time': time.perf_counter() - start,
+            'memory': memory,
+        }
+
+        return solve
+
+
+    def solve(self, k_ff, f) -> numpy.array:
+        solve = self.factorize(k_ff)
+
+        start = time.perf_counter()
+        d_f = numpy.asarray(solve(numpy.asarray(f, dtype=float)))
+        self.info['solve_time'] = time.perf_counter() - start
+
+        return d_f
+
+
+class MixedPrecisionSolver:
+    """Solves k_ff*d_f = f with a single precision factorization and iterative refinement
+
+    k_ff is factorized in float32, and each refinement step computes the residual
+    f - k_ff*d_f in float64 and corrects d_f with the single precision factors.  As
+    long as k_ff is far from being singular in float32, this reaches double precision
+    accuracy with half of the memory of the factors.  The relative residual norms of
+    the last solution are kept in residuals.
+    """
+
+    def __init__(self, tolerance: float = 1e-12, max_refinements: int = 10):
+        """
+        Args:
+            tolerance: relative residual norm at which refinement stops
+            max_refinements: maximum number of refinement steps
+        """
+
+        self._tolerance: float = tolerance
+        self._max_refinements: int = max_refinements
+        self.residuals = []
+
+
+    def get_settings(self) -> dict:
+        """Returns the options of the solver which change its solutions"""
+        return {'tolerance': self._tolerance, 'max_refinements': self._max_refinements}
+
+
+    def solve(self, k_ff, f, operator=None) -> numpy.array:
+        """Solves the equation, computing residuals with operator, which defaults to k_ff
+
+        operator is any object whose dot method returns the float64 product of k_ff by
+        a vector, such as the assembly.StiffnessOperator of the model.
+        """
+
+        import scipy.sparse.linalg
+
+        operator = k_ff if operator is None else operator
+        lu = scipy.sparse.linalg.splu(k_ff.astype(numpy.float32, copy=False).tocsc())
+
+        f = numpy.asarray(f, dtype=numpy.float64)
+        reference = numpy.linalg.norm(f) or 1.0
+        d_f = lu.solve(f.astype(numpy.float32)).astype(numpy.float64)
+
+        self.residuals = []
+        for step in range(self._max_refinements + 1):
+            residual = f - operator.dot(d_f)
+            self.residuals.append(numpy.linalg.norm(residual)/reference)
+
+            # stop once converged, or once refinement no longer reduces the residual
+            if self.residuals[-1] <= self._tolerance or step == self._max_refinements:
+                break
+            if len(self.residuals) > 1 and self.residuals[-1] > 0.5*self.residuals[-2]:
+                break
+
+            d_f += lu.solve(residual.astype(numpy.float32))
+
+        return d_f
+
+
+class ConjugateGradientSolver:
+    """Solves k_ff*d_f = f with the Jacobi preconditioned conjugate gradient method"""
+
+    def __init__(self, tolerance: float = 1e-10, max_iterations: int = None):
+        self._tolerance: float = tolerance
+        self._max_iterations: int = max_iterations
+        self.iterations: int = 0
+
+
+    def get_settings(self) -> dict:
+        """Returns the options of the solver which change its solutions"""
+        return {'tolerance': self._tolerance, 'max_iterations': self._max_iterations}
+
+
+    def get_preconditioner(self, k_ff):
+        """Returns the Jacobi preconditioner of k_ff"""
+
+        import scipy.sparse.linalg
+
+        diagonal = k_ff.diagonal()
+        inverse = numpy.where(diagonal != 0, 1.0/numpy.where(diagonal != 0, diagonal, 1.0), 1.0)
+
+        return scipy.sparse.linalg.LinearOperator(k_ff.shape, matvec=lambda x: inverse*numpy.ravel(x), dtype=float)
+
+
+    def solve(self, k_ff, f) -> numpy.array:
+        import scipy.sparse.linalg
+
+        self.iterations = 0
+
+        def count(x):
+            self.iterations += 1
+
+        d_f, info = scipy.sparse.linalg.cg(k_ff, f, rtol=self._tolerance, atol=0.0, maxiter=self._max_iterations,
+                                           M=self.get_preconditioner(k_ff), callback=count)
+        if info > 0:
+            raise RuntimeError('conjugate gradient did not converge in {} iterations'.format(info))
+
+        return d_f
+
+
+def get_subdomains(k, n_subdomains: int) -> (numpy.array, numpy.array):
+    """Partitions the graph of a sparse matrix into subdomains and an interface
+
+    DoFs are ordered by reverse Cuthill-McKee and split into contiguous slabs, and
+    the end of each coupling between two subdomains which lies in the one with the
+    higher label is moved to the interface, so that interiors are decoupled.
+
+    Returns:
+        the subdomain label of each DoF, and a mask of the interface DoFs
+    """
+
+    import scipy.sparse
+    import scipy.sparse.csgraph
+
+    k = scipy.sparse.csr_matrix(k)
+    n = k.shape[0]
+    order = scipy.sparse.csgraph.reverse_cuthill_mckee(k, symmetric_mode=True)
+
+    labels = numpy.empty(n, dtype=numpy.int64)
+    labels[order] = numpy.arange(n)*max(1, min(n_subdomains, n))//max(n, 1)
+
+    coo = k.tocoo()
+    crossing = labels[coo.row] != labels[coo.col]
+    higher = numpy.where(labels[coo.row[crossing]] > labels[coo.col[crossing]], coo.row[crossing], coo.col[crossing])
+
+    interface = numpy.zeros(n, dtype=bool)
+    interface[higher] = True
+
+    return labels, interface
+
+
+def _solve_subdomain(k_ii, k_ib, k_bi, f_i) -> (numpy.array, numpy.array, numpy.array, numpy.array):
+    """Factorizes an interior block, and returns K_ii^-1*K_ib, K_ii^-1*f_i and their products by K_bi"""
+
+    import scipy.sparse.linalg
+
+    lu = scipy.sparse.linalg.splu(k_ii.tocsc())
+    x = lu.solve(k_ib.toarray()) if k_ib.shape[1] > 0 else numpy.zeros(k_ib.shape)
+    y = lu.solve(f_i)
+
+    return x, y, k_bi.dot(x), k_bi.dot(y)
+
+
+class DomainDecompositionSolver:
+    """Solves k_ff*d_f = f by static condensation of subdomain interiors on their interface
+
+    The graph of k_ff is partitioned by get_subdomains.  Worker processes factorize
+    each subdomain interior and solve it for its coupling to the interface and for its
+    forces, which gives its contribution to the interface Schur complement
+    S = K_bb - sum(K_bi*K_ii^-1*K_ib).  The interface equation is then solved directly
+    or with CG, and interior displacements are recovered from the interior solutions.
+    """
+
+    def __init__(self, subdomains: int = None, workers: int = None, interface_solver: str = 'direct', tolerance: float = 1e-10):
+        """
+        Args:
+            subdomains: number of subdomains, which defaults to the number of workers
+            workers: number of worker processes, which defaults to the number of CPUs,
+                and subdomains are solved in the calling process if it is 1
+            interface_solver: either 'direct' or 'cg'
+            tolerance: relative tolerance of the CG interface solver
+        """
+
+        if interface_solver not in ('direct', 'cg'):
+            raise ValueError("interface_solver must be either 'direct' or 'cg'")
+
+        self._workers: int = workers or os.cpu_count() or 1
+        self._subdomains: int = subdomains or self._workers
+        self._interface_solver: str = interface_solver
+        self._tolerance: float = tolerance
+        self.interface_size: int = 0
+        self.subdomain_sizes = []
+
+
+    def get_settings(self) -> dict:
+        """Returns the options of the solver which change its solutions"""
+        return {'subdomains': self._subdomains, 'interface_solver': self._interface_solver, 'tolerance': self._tolerance}
+
+
+    def solve(self, k_ff, f) -> numpy.array:
+        import scipy.sparse
+        import scipy.sparse.linalg
+
+        k_ff = scipy.sparse.csr_matrix(k_ff)
+        f = numpy.asarray(f, dtype=float)
+        labels, interface = get_subdomains(k_ff, self._subdomains)
+
+        boundary = numpy.flatnonzero(interface)
+        position = numpy.full(len(f), -1, dtype=numpy.int64)
+        position[boundary] = numpy.arange(len(boundary))
+        k_bb = k_ff[boundary][:, boundary]
+
+        # interior blocks of each subdomain, coupled to the interface DoFs they touch
+        tasks = []
+        for label in range(labels.max() + 1 if len(labels) else 0):
+            interior = numpy.flatnonzero((labels == label) & ~interface)
+            if len(interior) == 0:
+                continue
+            k_i = k_ff[interior]
+            local = numpy.unique(k_i.indices[interface[k_i.indices]])
+            tasks.append((interior, local, (k_i[:, interior], k_i[:, local], k_ff[local][:, interior], f[interior])))
+
+        if self._workers == 1:
+            solutions = [_solve_subdomain(*arguments) for interior, local, arguments in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=self._workers) as pool:
+                futures = [pool.submit(_solve_subdomain, *arguments) for interior, local, arguments in tasks]
+                solutions = [future.result() for future in futures]
+
+        self.interface_size = len(boundary)
+        self.subdomain_sizes = [len(interior) for interior, local, arguments in tasks]
+
+        # assemble and solve the interface Schur complement
+        rows, columns, values = [], [], []
+        g = f[boundary].copy()
+        for (interior, local, arguments), (x, y, k_bi_x, k_bi_y) in zip(tasks, solutions):
+            p = position[local]
+            rows.append(numpy.repeat(p, len(p)))
+            columns.append(numpy.tile(p, len(p)))
+            values.append(-k_bi_x.ravel())
+            g[p] -= k_bi_y
+
+        if len(boundary) > 0:
+            s = k_bb.tocoo()
+            rows.append(s.row)
+            columns.append(s.col)
+            values.append(s.data)
+            s = scipy.sparse.coo_matrix((numpy.concatenate(values), (numpy.concatenate(rows), numpy.concatenate(columns))),
+                                        shape=k_bb.shape).tocsr()
+
+            if self._interface_solver == 'cg':
+                d_b = ConjugateGradientSolver(tolerance=self._tolerance).solve(s, g)
+            else:
+                d_b = scipy.sparse.linalg.splu(s.tocsc()).solve(g)
+        else:
+            d_b = numpy.zeros(0)
+
+        # recover the interiors from their solutions
+        d = numpy.zeros(len(f))
+        d[boundary] = d_b
+        for (interior, local, arguments), (x, y, k_bi_x, k_bi_y) in zip(tasks, solutions):
+            d[interior] = y - x.dot(d_b[position[local]])
+
+        return d
+
+
+def _solve_component_groups(groups) -> list:
+    """Factorizes the matrix of each group once, and solves it for all of its right-hand sides"""
+
+    import scipy.sparse.linalg
+
+    return [scipy.sparse.linalg.splu(k.tocsc()).solve(f) for k, f in groups]
+
+
+class ComponentSolver:
+    """Solves k_ff*d_f = f separately for each connected component of the graph of k_ff
+
+    Components whose matrices agree to a relative tolerance, such as copies of the
+    same truss, form a group which is factorized once and solved for the right-hand sides of all of its
+    components at once.  Groups are solved by worker processes once there are at
+    least min_parallel of them.
+    """
+
+    def __init__(self, workers: int = None, min_parallel: int = 8, tolerance: float = 1e-9):
+        """
+        Args:
+            workers: number of worker processes, which defaults to the number of CPUs,
+                and groups are solved in the calling process if it is 1
+            min_parallel: smallest number of groups which is solved in parallel
+            tolerance: largest difference between the entries of the matrices of a group,
+                relative to their largest entry, which must be at least 1e-9 as in
+                kernels.deduplicate
+        """
+
+        self._workers: int = workers or os.cpu_count() or 1
+        self._min_parallel: int = min_parallel
+        self._tolerance: float = tolerance
+        self.components: int = 0
+        self.factorizations: int = 0
+
+
+    def get_settings(self) -> dict:
+        """Returns the options of the solver which change its solutions"""
+        return {'tolerance': self._tolerance}
+
+
+    def get_groups(self, k_ff):
+        """Returns the matrix of each group of matching components, and the DoF indices of its components
+
+        DoFs keep their relative order within each component, so that components
+        which were generated in the same order have the same sparsity pattern.  Their
+        largest entries are grouped by kernels.deduplicate, and their entries are then
+        rounded to multiples of the tolerance times the largest entry of their group,
+        so that copies whose coordinates only differ by rounding share a group.
+        """
+
+        import scipy.sparse
+        import scipy.sparse.csgraph
+
+        k = scipy.sparse.csr_matrix(k_ff)
+        n_components, labels = scipy.sparse.csgraph.connected_components(k, directed=False)
+        order = numpy.argsort(labels, kind='stable')
+        bounds = numpy.concatenate(([0], numpy.cumsum(numpy.bincount(labels, minlength=n_components))))
+
+        # the permuted matrix is block diagonal, so each component is a contiguous slice
+        k = k[order][:, order]
+        k.sort_indices()
+
+        # the largest entry of each component sets the scale of its rounding
+        scales = numpy.zeros(n_components)
+        rows = numpy.repeat(numpy.arange(k.shape[0]), numpy.diff(k.indptr))
+        numpy.maximum.at(scales, numpy.searchsorted(bounds, rows, side='right') - 1, numpy.abs(k.data))
+        first_scales, scale_groups = kernels.deduplicate([scales], self._tolerance)
+        scales = scales[first_scales][scale_groups]
+
+        groups = dict()
+        for component, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            first, last = k.indptr[start], k.indptr[end]
+            indptr = k.indptr[start:end + 1] - first
+            indices = k.indices[first:last] - start
+            data = k.data[first:last]
+            values = numpy.rint(data/(self._tolerance*scales[component] or 1.0)).astype(numpy.int64)
+
+            key = (scale_groups[component], hashlib.sha256(b''.join(array.tobytes() for array in (indptr, indices, values))).digest())
+            if key not in groups:
+                groups[key] = (scipy.sparse.csr_matrix((data, indices, indptr), shape=(end - start, end - start)), [])
+            groups[key][1].append(order[start:end])
+
+        self.components = n_components
+        self.factorizations = len(groups)
+
+        return list(groups.values())
+
+
+    def solve(self, k_ff, f) -> numpy.array:
+        f = numpy.asarray(f, dtype=float)
+        groups = self.get_groups(k_ff)
+        tasks = [(k, numpy.column_stack([f[dofs] for dofs in components])) for k, components in groups]
+
+        if self._workers == 1 or len(tasks) < self._min_parallel:
+            solutions = _solve_component_groups(tasks)
+        else:
+            chunks = [tasks[i::self._workers] for i in range(self._workers)]
+            with ProcessPoolExecutor(max_workers=self._workers) as pool:
+                results = list(pool.map(_solve_component_groups, chunks))
+            solutions = [None]*len(tasks)
+            for i, result in enumerate(results):
+                solutions[i::self._workers] = result
+
+        d = numpy.zeros(len(f))
+        for (k, components), solution in zip(groups, solutions):
+            solution = solution.reshape(len(components[0]), len(components))
+            for column, dofs in enumerate(components):
+                d[dofs] = solution[:, column]
+
+        return d
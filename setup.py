@@ -23,7 +23,7 @@ setup(
         'Topic :: Software Development :: Libraries'
     ],
     install_requires=[
-        'numpy>=1.14,<2.0',
-        'scipy>=1.1,<2.0',
+        'numpy>=1.22.4',
+        'scipy>=1.12,<2.0',
     ],
 )
@@ -0,0 +1,94 @@
+import unittest
+
+import numpy
+from barman import models
+from barman.analysis import BatchLinearStatic, LinearStatic
+from barman import materials, dofs, sections
+from barman.loads import UniformLoad
+from barman.mechanisms import MechanismError
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import Bar2, EulerBernoulli
+
+
+def get_truss_model(bays, rng, section, material):
+    """Returns a simply supported Warren truss with random loads on its top chord"""
+
+    bottom = [dofs.Node([2*i, 0]) for i in range(bays + 1)]
+    top = [dofs.Node([2*i + 1, rng.uniform(1.0, 2.0)]) for i in range(bays)]
+
+    model = models.Static()
+    for i in range(bays):
+        model.append_element( Bar2([bottom[i], bottom[i+1]], section, material) )
+        model.append_element( Bar2([bottom[i], top[i]], section, material) )
+        model.append_element( Bar2([top[i], bottom[i+1]], section, material) )
+        if i > 0:
+            model.append_element( Bar2([top[i-1], top[i]], section, material) )
+        model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(top[i], dofs.Parameter.dy), -rng.uniform(1.0, 10.0)) )
+
+    for parameter in [dofs.Parameter.dx, dofs.Parameter.dy]:
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(bottom[0], parameter), 0))
+    model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(bottom[-1], dofs.Parameter.dy), 0))
+
+    return model
+
+
+def get_beam_model(section, material):
+    """Returns a continuous beam with a uniform load, a settlement and a roller on an inclined plane"""
+
+    roller = dofs.Node([8, 0], dofs.CoordinateSystem(numpy.pi/6))
+    nodes = [dofs.Node([0, 0]), dofs.Node([4, 0]), roller]
+
+    model = models.Static()
+    model.append_element( EulerBernoulli([nodes[0], nodes[1]], section, material) )
+    model.append_element( EulerBernoulli([nodes[1], nodes[2]], section, material) )
+    for parameter in [dofs.Parameter.dx, dofs.Parameter.dy, dofs.Parameter.rz]:
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(nodes[0], parameter), 0))
+    model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(nodes[1], dofs.Parameter.dy), -1e-3))
+    model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(roller, dofs.Parameter.dy), 0))
+    model.append_element_load( UniformLoad(model.elements[1], [0.0, -5.0]) )
+
+    return model
+
+
+class TestBatchLinearStatic(unittest.TestCase):
+
+    def setUp(self):
+        rng = numpy.random.default_rng(0)
+        material = materials.LinearElastic('test', 200e6, 0.3)
+        section = sections.Section(0.01, 1e-4)
+
+        self.models = [get_truss_model(bays, rng, section, material) for bays in rng.integers(1, 8, 9)]
+        self.models.append(get_beam_model(section, material))
+
+
+    def test_matches_linear_static(self):
+        for batch_size in [256, 3]:
+            results = BatchLinearStatic(batch_size=batch_size).run(self.models)
+            sizes = results.get_sizes()
+
+            self.assertEqual(results.get_displacements().shape, (len(self.models), sizes[:, 0].max()))
+            for i, model in enumerate(self.models):
+                expected = LinearStatic().run(model)
+                n_dofs, n_essential, n_elements = sizes[i]
+
+                self.assertEqual(n_dofs, len(expected.get_dof_order()))
+                numpy.testing.assert_allclose(results.get_displacements()[i, :n_dofs], expected.get_displacements(), rtol=1e-9, atol=1e-14)
+                numpy.testing.assert_allclose(results.get_reactions()[i, :n_essential], expected.get_reactions(), rtol=1e-9, atol=1e-9)
+                numpy.testing.assert_allclose(results.get_member_forces()[i, :n_elements], expected.get_member_forces(), rtol=1e-9, atol=1e-9)
+
+                # padding is left at zero
+                self.assertFalse(numpy.any(results.get_displacements()[i, n_dofs:]))
+                self.assertFalse(numpy.any(results.get_member_forces()[i, n_elements:]))
+
+
+    def test_mechanisms_are_reported(self):
+        model = self.models[0]
+        model.prescribed_displacements.pop()
+
+        with self.assertRaises(MechanismError):
+            BatchLinearStatic(check=True).run(self.models)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+
+import numpy
+from barman import models
+from barman.analysis import ExplicitDynamics, LinearStatic
+from barman import materials, dofs, sections
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import Bar2, EulerBernoulli
+
+
+class TestExplicitDynamics(unittest.TestCase):
+
+    def setUp(self):
+        self.material = materials.LinearElastic('steel', 200e9, 0.3, density=7850)
+        self.section = sections.Section(1e-4, 1e-8)
+        self.nodes = [ dofs.Node([0, 0]), dofs.Node([1, 0]), dofs.Node([2, 0]), dofs.Node([1, 1]) ]
+
+
+    def get_bar(self, roller: bool):
+        """Returns a single bar pinned at its start, and optionally guided along its axis at its end"""
+
+        model = models.Static()
+        model.append_element( Bar2([self.nodes[0], self.nodes[1]], self.section, self.material) )
+        for parameter in [dofs.Parameter.dx, dofs.Parameter.dy]:
+            model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], parameter), 0))
+        if roller:
+            model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[1], dofs.Parameter.dy), 0))
+
+        return model
+
+
+    def test_axial_vibration(self):
+        model = self.get_bar(roller=True)
+        analysis = ExplicitDynamics()
+        critical = analysis.get_critical_time_step(model.elements)
+        self.assertAlmostEqual(critical, 1.0/(200e9/7850)**0.5)
+
+        # a single DoF with half of the mass of the bar
+        omega = (200e9*1e-4/(7850*1e-4*0.5))**0.5
+        dof_order = LinearStatic().get_global_dof_map(model)[0]
+        velocities = numpy.zeros(len(dof_order))
+        velocities[dof_order[dofs.GlobalDoF(self.nodes[1], dofs.Parameter.dx)]] = 0.01
+
+        results = ExplicitDynamics(time_step=critical/100, output_interval=10).run(model, 4*numpy.pi/omega, velocities=velocities)
+        times = results.get_times()
+        u = results.get_displacements()[:, dof_order[dofs.GlobalDoF(self.nodes[1], dofs.Parameter.dx)]]
+
+        self.assertLessEqual(results.get_time_step(), critical/100)
+        self.assertEqual(len(times), results.get_displacements().shape[0])
+        self.assertAlmostEqual(times[-1], 4*numpy.pi/omega)
+        numpy.testing.assert_allclose(u, 0.01/omega*numpy.sin(omega*times), atol=1e-3*0.01/omega)
+        numpy.testing.assert_allclose(results.get_axial_forces()[:, 0], 200e9*1e-4*u, rtol=1e-6, atol=1e-6)
+
+
+    def test_large_rotation_preserves_length(self):
+        model = self.get_bar(roller=False)
+        dof_order = LinearStatic().get_global_dof_map(model)[0]
+        velocities = numpy.zeros(len(dof_order))
+        velocities[dof_order[dofs.GlobalDoF(self.nodes[1], dofs.Parameter.dy)]] = 100.0
+
+        # a quarter turn about the pinned node
+        results = ExplicitDynamics().run(model, numpy.pi/2/100.0, velocities=velocities)
+        nodal = results.get_nodal_displacements()
+        tip = numpy.array(self.nodes[1].position) + nodal[:, results.get_nodes().index(self.nodes[1]), :2]
+
+        numpy.testing.assert_allclose(tip[-1], [0.0, 1.0], atol=1e-2)
+        numpy.testing.assert_allclose(numpy.hypot(tip[:, 0], tip[:, 1]), 1.0, atol=1e-3)
+        self.assertGreater(results.get_axial_forces()[1:].mean(), 0.0)
+
+
+    def test_damped_response_converges_to_static(self):
+        model = models.Static()
+        model.append_element( Bar2([self.nodes[0], self.nodes[3]], self.section, self.material) )
+        model.append_element( Bar2([self.nodes[3], self.nodes[2]], self.section, self.material) )
+        model.append_element( Bar2([self.nodes[0], self.nodes[2]], self.section, self.material) )
+        for parameter in [dofs.Parameter.dx, dofs.Parameter.dy]:
+            model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], parameter), 0))
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[2], dofs.Parameter.dy), 0))
+        model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(self.nodes[3], dofs.Parameter.dy), -1000.0) )
+
+        results = ExplicitDynamics(damping=5000.0, output_interval=7).run(model, 0.02)
+        expected = LinearStatic().run(model)
+
+        self.assertLess(results.get_displacements().shape[0], 0.02/results.get_time_step()/6)
+        numpy.testing.assert_allclose(results.get_displacements()[-1], expected.get_displacements(), rtol=1e-3, atol=1e-9)
+        numpy.testing.assert_allclose(results.get_axial_forces()[-1], expected.get_member_forces()[:, 3], rtol=1e-3, atol=1e-3)
+        self.assertLess(numpy.abs(results.get_velocities()[-1]).max(), 1e-6)
+
+
+    def test_unsupported_models(self):
+        model = self.get_bar(roller=True)
+        model.append_element( EulerBernoulli([self.nodes[1], self.nodes[2]], self.section, self.material) )
+
+        with self.assertRaises(ValueError):
+            ExplicitDynamics().run(model, 1e-3)
+
+        self.material = materials.LinearElastic('massless', 200e9, 0.3)
+        massless = self.get_bar(roller=True)
+        with self.assertRaises(ValueError):
+            ExplicitDynamics().run(massless, 1e-3)
+
+        with self.assertRaises(ValueError):
+            ExplicitDynamics(output_interval=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+
+import numpy
+from barman import models
+from barman.analysis import Harmonic, LinearStatic
+from barman import materials, dofs, sections
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import Bar2, EulerBernoulli
+
+
+class TestHarmonicMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.material = materials.LinearElastic('test', 200e9, 0.3, density=7850)
+        self.section = sections.Section(1e-3, 1e-6)
+        self.nodes = [ dofs.Node([i/10, 0]) for i in range(21) ]
+
+        # cantilever with a transverse load at its tip
+        self.model = models.Static()
+        for i in range(20):
+            self.model.append_element( EulerBernoulli([self.nodes[i], self.nodes[i+1]], self.section, self.material) )
+
+        for parameter in [dofs.Parameter.dx, dofs.Parameter.dy, dofs.Parameter.rz]:
+            self.model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], parameter), 0))
+        self.model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(self.nodes[-1], dofs.Parameter.dy), 1.0) )
+
+        self.tip = 3*20 + 1
+
+
+    def test_cantilever_natural_frequencies(self):
+        results = Harmonic(modes=4).run(self.model, [0.0])
+
+        # bending modes of a cantilever: (beta*L)^2*sqrt(EI/(rho*A*L^4))
+        scale = numpy.sqrt(200e9*1e-6/(7850*1e-3*2.0**4))
+        expected = numpy.array([1.87510407, 4.69409113, 7.85475744])**2*scale
+        numpy.testing.assert_allclose(results.get_natural_frequencies()[:3], expected, rtol=1e-4)
+        self.assertEqual(results.get_mode_shapes().shape, (4, 21, 3))
+
+
+    def test_static_limit(self):
+        """with all modes, the response at zero frequency is the static displacement"""
+
+        results = Harmonic(modes=1000).run(self.model, [0.0])
+        static = LinearStatic().run(self.model)
+
+        numpy.testing.assert_allclose(results.get_displacements()[0].real, static.get_displacements(), rtol=1e-8, atol=1e-14)
+
+
+    def test_modal_sum_matches_direct_solution(self):
+        frequencies = numpy.linspace(0.0, 500.0, 51)
+        rayleigh = (0.5, 1e-5)
+
+        modal = Harmonic(modes=1000, rayleigh=rayleigh).run(self.model, frequencies)
+        direct = Harmonic(rayleigh=rayleigh, method='direct').run(self.model, frequencies)
+        numpy.testing.assert_allclose(modal.get_displacements(), direct.get_displacements(), rtol=1e-6, atol=1e-12)
+
+        # a few modes capture the response below the third natural frequency
+        truncated = Harmonic(modes=6, rayleigh=rayleigh).run(self.model, frequencies)
+        numpy.testing.assert_allclose(truncated.get_displacements()[:, self.tip], direct.get_displacements()[:, self.tip], rtol=1e-2)
+
+
+    def test_damping_limits_the_resonant_amplitude(self):
+        first = Harmonic(modes=2).run(self.model, [0.0]).get_natural_frequencies()[0]
+
+        amplitudes = [abs(Harmonic(modes=6, damping_ratio=zeta).run(self.model, [first]).get_displacements()[0, self.tip])
+                      for zeta in (0.01, 0.02)]
+        static = abs(Harmonic(modes=6).run(self.model, [0.0]).get_displacements()[0, self.tip])
+
+        # the dynamic amplification at resonance is about 1/(2*zeta)
+        self.assertAlmostEqual(amplitudes[0]/amplitudes[1], 2.0, places=2)
+        self.assertAlmostEqual(amplitudes[0]/static, 50.0, delta=5.0)
+
+
+    def test_truss_mass(self):
+        """the first axial mode of a fixed-free bar converges to pi/2*sqrt(E/rho)/L"""
+
+        model = models.Static()
+        nodes = [ dofs.Node([i/10, 0]) for i in range(11) ]
+        for i in range(10):
+            model.append_element( Bar2([nodes[i], nodes[i+1]], self.section, self.material) )
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(nodes[0], dofs.Parameter.dx), 0))
+        for node in nodes:
+            model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(node, dofs.Parameter.dy), 0))
+        model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(nodes[-1], dofs.Parameter.dx), 1.0) )
+
+        results = Harmonic(modes=2).run(model, [0.0])
+        expected = numpy.pi/2*numpy.sqrt(200e9/7850)/1.0
+        self.assertAlmostEqual(results.get_natural_frequencies()[0]/expected, 1.0, delta=2e-3)
+
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            Harmonic(method='unknown')
+        with self.assertRaises(ValueError):
+            Harmonic(damping_ratio=0.05, method='direct')
+
+        massless = models.Static()
+        for elem in self.model.elements:
+            massless.append_element( EulerBernoulli(elem.nodes, self.section, materials.LinearElastic('test', 200e9, 0.3)) )
+        for pd in self.model.prescribed_displacements:
+            massless.append_prescribed_displacement(pd)
+        with self.assertRaises(ValueError):
+            Harmonic().run(massless, [1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
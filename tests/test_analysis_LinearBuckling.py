@@ -0,0 +1,81 @@
+import unittest
+
+import numpy
+from math import pi
+from barman import models
+from barman.analysis import LinearBuckling
+from barman import materials, dofs, sections
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import EulerBernoulli
+
+
+class TestLinearBucklingMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.material = materials.LinearElastic('test', 100, 0.35);
+        self.section = sections.Section(10, 1);
+        self.nodes = [ dofs.Node([0, i/10]) for i in range(11) ]
+
+        # pinned-pinned column under a unit axial load
+        self.model = models.Static()
+        for i in range(10):
+            self.model.append_element( EulerBernoulli([self.nodes[i], self.nodes[i+1]], self.section, self.material) )
+
+        self.model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], dofs.Parameter.dx), 0))
+        self.model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], dofs.Parameter.dy), 0))
+        self.model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[-1], dofs.Parameter.dx), 0))
+
+
+    def appendAxialLoad(self, value):
+        self.model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(self.nodes[-1], dofs.Parameter.dy), value) )
+
+
+    def test_euler_load_factors(self):
+        self.appendAxialLoad(-1.0)
+        result = LinearBuckling(modes=2).run(self.model)
+
+        EI = 100*1
+        numpy.testing.assert_allclose(result.get_load_factors(), [pi**2*EI, 4*pi**2*EI], rtol=1e-3)
+
+
+    def test_mode_shape_is_node_indexed(self):
+        self.appendAxialLoad(-1.0)
+        result = LinearBuckling().run(self.model)
+
+        nodes = result.get_nodes()
+        shapes = result.get_mode_shapes()
+        self.assertEqual(shapes.shape, (1, len(nodes), 3))
+
+        # first mode is a half sine wave along the column
+        heights = numpy.array([node.position[1] for node in nodes])
+        sway = shapes[0, :, 0]/numpy.abs(shapes[0, :, 0]).max()
+        numpy.testing.assert_allclose(numpy.abs(sway), numpy.sin(pi*heights), atol=1e-3)
+
+
+    def test_shifted_solve_gives_same_factors(self):
+        self.appendAxialLoad(-1.0)
+        result = LinearBuckling(modes=2, shift=500.0).run(self.model)
+
+        EI = 100*1
+        numpy.testing.assert_allclose(result.get_load_factors(), [pi**2*EI, 4*pi**2*EI], rtol=1e-3)
+
+
+    def test_shift_above_first_factor_is_rejected(self):
+        self.appendAxialLoad(-1.0)
+
+        # between the first and second factors, K + shift*K_G is indefinite
+        with self.assertRaises(ValueError):
+            LinearBuckling(modes=2, shift=2000.0).run(self.model)
+
+
+    def test_tension_has_no_buckling_modes(self):
+        self.appendAxialLoad(1.0)
+
+        result = LinearBuckling(modes=2).run(self.model)
+
+        self.assertEqual(len(result.get_load_factors()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,12 @@
 import unittest
 
+import numpy
+
 from barman import models
-from barman.analysis import LinearStatic
+from barman.analysis import LinearStatic, MatrixFreeLinearStatic
 from barman import materials, dofs, sections
 from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
 from barman.elements import Bar2, EulerBernoulli
 
 class TestLinearElasticMethods(unittest.TestCase):
@@ -59,6 +62,24 @@ class TestLinearElasticMethods(unittest.TestCase):
         self.assertEqual(len(global_dofs), 4)
 
 
+    def test_generate_global_stiffness_matrix_matches_element_matrices(self):
+        model = models.Static()
+        model.append_element( EulerBernoulli([self.nodes[0], self.nodes[1]], self.section, self.material) )
+        model.append_element( EulerBernoulli([self.nodes[1], self.nodes[2]], self.section, self.material) )
+        model.append_element( Bar2([self.nodes[0], self.nodes[2]], self.section, self.material) )
+
+        analysis = LinearStatic()
+        dof_map, essential_global_dofs = analysis.get_global_dof_map(model)
+        k_global = analysis.generate_global_stiffness_matrix(model.elements, dof_map)
+
+        expected = numpy.zeros((len(dof_map), len(dof_map)))
+        for elem in model.elements:
+            indices = [dof_map[dof] for dof in elem.get_global_dofs()]
+            expected[numpy.ix_(indices, indices)] += elem.get_global_stiffness_matrix()
+
+        numpy.testing.assert_allclose(k_global.toarray(), expected, atol=1e-12)
+
+
     def test_run(self):
         model = models.Static()
         model.append_element( Bar2([self.nodes[0], self.nodes[1]], self.section, self.material) )
@@ -74,5 +95,78 @@ class TestLinearElasticMethods(unittest.TestCase):
         result = analysis.run(model)
 
 
+class TestInclinedSupports(unittest.TestCase):
+
+    def setUp(self):
+        self.material = materials.LinearElastic('test', 200e6, 0.3)
+        self.section = sections.Section(0.01, 1e-4)
+
+
+    def get_beam(self, angle):
+        """Returns a simply supported beam with a roller on a plane inclined by angle, and a load at midspan"""
+
+        roller = dofs.Node([4, 0], dofs.CoordinateSystem(angle))
+        nodes = [dofs.Node([0, 0]), dofs.Node([2, 0]), roller]
+
+        model = models.Static()
+        model.append_element( EulerBernoulli([nodes[0], nodes[1]], self.section, self.material) )
+        model.append_element( EulerBernoulli([nodes[1], nodes[2]], self.section, self.material) )
+        for parameter in [dofs.Parameter.dx, dofs.Parameter.dy]:
+            model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(nodes[0], parameter), 0))
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(roller, dofs.Parameter.dy), 0))
+        model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(nodes[1], dofs.Parameter.dy), -10.0) )
+
+        return model
+
+
+    def test_inclined_roller_reaction_is_normal_to_its_plane(self):
+        results = LinearStatic().run(self.get_beam(numpy.pi/4))
+        dof_order = results.get_dof_order()
+        roller = results.get_model().prescribed_displacements[2].global_dof
+        reactions = results.get_reactions()
+
+        # the roller carries half of the load, which gives it a horizontal component
+        self.assertAlmostEqual(reactions[dof_order[roller]], 10.0/2**0.5)
+        self.assertAlmostEqual(reactions[0], 5.0)
+        self.assertAlmostEqual(reactions[1], 5.0)
+
+        # the horizontal reactions compress the beam, so the roller slides down its plane
+        slide = results.get_displacements()[dof_order[dofs.GlobalDoF(roller.node, dofs.Parameter.dx)]]
+        self.assertLess(slide, 0.0)
+        numpy.testing.assert_allclose(results.get_member_forces()[:, [0, 3]], [[5.0, -5.0], [5.0, -5.0]])
+
+
+    def test_default_coordinate_systems_are_unchanged(self):
+        horizontal = LinearStatic().run(self.get_beam(0.0))
+        self.assertIsNone(horizontal.get_rotation())
+        numpy.testing.assert_allclose(horizontal.get_reactions(), [0.0, 5.0, 5.0], atol=1e-9)
+
+
+    def test_all_analyses_honour_nodal_coordinate_systems(self):
+        model = self.get_beam(numpy.pi/6)
+        direct = LinearStatic().run(model)
+
+        for results in [MatrixFreeLinearStatic().run(model),
+                        LinearStatic(precision='single').run(model),
+                        LinearStatic().run(model, LinearStatic().get_assembly_plan(model))]:
+            numpy.testing.assert_allclose(results.get_displacements(), direct.get_displacements(), rtol=1e-6, atol=1e-12)
+            numpy.testing.assert_allclose(results.get_reactions(), direct.get_reactions(), rtol=1e-6, atol=1e-6)
+            numpy.testing.assert_allclose(results.get_member_forces(), direct.get_member_forces(), rtol=1e-6, atol=1e-6)
+
+
+
+    def test_plan_refills_rotated_nodes_in_place(self):
+        model = self.get_beam(numpy.pi/6)
+        analysis = LinearStatic()
+        plan = analysis.get_assembly_plan(model)
+        data = plan.blocks['ff'].data
+
+        expected = analysis.run(model)
+        results = analysis.run(model, plan=plan)
+
+        self.assertIs(results.get_equation().k_ff.data, data)
+        numpy.testing.assert_allclose(results.get_displacements(), expected.get_displacements(), rtol=1e-10, atol=1e-14)
+
+
 if __name__ == '__main__':
     unittest.main()
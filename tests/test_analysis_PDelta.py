@@ -0,0 +1,75 @@
+import unittest
+
+import numpy
+from math import sqrt, tan
+from barman import models
+from barman.analysis import LinearStatic, PDelta
+from barman import materials, dofs, sections
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import EulerBernoulli
+
+
+class TestPDeltaMethods(unittest.TestCase):
+
+    def setUp(self):
+        self.material = materials.LinearElastic('test', 100, 0.35);
+        self.section = sections.Section(10, 1);
+        self.nodes = [ dofs.Node([0, i/8]) for i in range(9) ]
+
+        # cantilever column with axial and lateral tip loads
+        self.model = models.Static()
+        for i in range(8):
+            self.model.append_element( EulerBernoulli([self.nodes[i], self.nodes[i+1]], self.section, self.material) )
+
+        for parameter in [dofs.Parameter.dx, dofs.Parameter.dy, dofs.Parameter.rz]:
+            self.model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], parameter), 0))
+
+        self.P = 50.0
+        self.H = 1.0
+        self.model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(self.nodes[-1], dofs.Parameter.dy), -self.P) )
+        self.model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(self.nodes[-1], dofs.Parameter.dx), self.H) )
+
+
+    def getTipDisplacement(self, result):
+        index = result.get_dof_order()[dofs.GlobalDoF(self.nodes[-1], dofs.Parameter.dx)]
+        return result.get_displacements()[index]
+
+
+    def getExactTipDisplacement(self):
+        EI = 100*1
+        k = sqrt(self.P/EI)
+        return self.H/(self.P*k)*(tan(k) - k)
+
+
+    def test_amplifies_sway_of_cantilever_column(self):
+        result = PDelta().run(self.model)
+        linear = LinearStatic().run(self.model)
+
+        self.assertGreater(self.getTipDisplacement(result), self.getTipDisplacement(linear))
+        self.assertAlmostEqual(self.getTipDisplacement(result)/self.getExactTipDisplacement(), 1.0, places=4)
+        numpy.testing.assert_allclose(result.get_axial_forces(), -self.P)
+
+
+    def test_base_moment_includes_second_order_effect(self):
+        result = PDelta().run(self.model)
+        forces = result.get_member_forces()
+
+        # end moment applied by the support on the base member
+        expected = (self.H*1.0 + self.P*self.getTipDisplacement(result))
+        self.assertAlmostEqual(forces[0, 2]/expected, 1.0, places=3)
+
+
+    def test_modified_newton_reuses_factorization(self):
+        full = PDelta(load_steps=2).run(self.model)
+        modified = PDelta(load_steps=2, modified_newton=True).run(self.model)
+
+        self.assertAlmostEqual(self.getTipDisplacement(modified)/self.getTipDisplacement(full), 1.0, places=6)
+        self.assertEqual(modified.get_factorizations(), 1)
+        self.assertGreater(full.get_factorizations(), modified.get_factorizations())
+        self.assertEqual(len(modified.get_convergence_history()), 2)
+        self.assertGreater(sum(modified.get_iterations()), modified.get_factorizations())
+
+
+if __name__ == '__main__':
+    unittest.main()
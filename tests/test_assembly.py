@@ -0,0 +1,227 @@
+import unittest
+
+import numpy
+from barman import models
+from barman.analysis import LinearStatic, MatrixFreeLinearStatic
+from barman.assembly import SerialAssembler, ParallelAssembler, OutOfCoreAssembler, AssemblyPlan, StiffnessOperator
+from barman.solvers import ConjugateGradientSolver
+from barman import materials, dofs, sections, kernels
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import Bar2, EulerBernoulli
+
+
+def get_lattice_model(n):
+    """Returns a braced lattice of n x n cells with beams along the rows and bars elsewhere"""
+
+    material = materials.LinearElastic('test', 100, 0.35)
+    section = sections.Section(1, 1)
+    nodes = [[dofs.Node([i, j]) for j in range(n + 1)] for i in range(n + 1)]
+
+    model = models.Static()
+    for i in range(n + 1):
+        for j in range(n + 1):
+            if i < n:
+                model.append_element( EulerBernoulli([nodes[i][j], nodes[i+1][j]], section, material) )
+            if j < n:
+                model.append_element( Bar2([nodes[i][j], nodes[i][j+1]], section, material) )
+            if i < n and j < n:
+                model.append_element( Bar2([nodes[i][j], nodes[i+1][j+1]], section, material) )
+
+    for i in range(n + 1):
+        for parameter in [dofs.Parameter.dx, dofs.Parameter.dy, dofs.Parameter.rz]:
+            model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(nodes[i][0], parameter), 0))
+    model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(nodes[n][n], dofs.Parameter.dx), 1.0) )
+
+    return model
+
+
+class TestAssemblers(unittest.TestCase):
+
+    def setUp(self):
+        self.model = get_lattice_model(4)
+        self.dof_map, essential_global_dofs = LinearStatic().get_global_dof_map(self.model)
+
+
+    def assertIdentical(self, a, b):
+        a.sort_indices()
+        b.sort_indices()
+        numpy.testing.assert_array_equal(a.indptr, b.indptr)
+        numpy.testing.assert_array_equal(a.indices, b.indices)
+        numpy.testing.assert_array_equal(a.data, b.data)
+
+
+    def test_parallel_assembly_is_identical_to_serial(self):
+        serial = SerialAssembler().assemble(self.model.elements, self.dof_map)
+        parallel = ParallelAssembler(workers=2, chunk_size=7).assemble(self.model.elements, self.dof_map)
+
+        self.assertIdentical(serial, parallel)
+
+
+    def test_in_process_chunks_are_identical_to_serial(self):
+        serial = SerialAssembler().assemble(self.model.elements, self.dof_map)
+        chunked = ParallelAssembler(workers=1, chunk_size=5).assemble(self.model.elements, self.dof_map)
+
+        self.assertIdentical(serial, chunked)
+
+
+    def test_get_chunks_cover_all_elements(self):
+        chunks = ParallelAssembler(workers=3).get_chunks(100)
+
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][1], 100)
+        self.assertTrue(all(a[1] == b[0] for a, b in zip(chunks, chunks[1:])))
+
+
+    def test_run_with_parallel_assembler(self):
+        serial = LinearStatic().run(self.model)
+        parallel = LinearStatic(assembler=ParallelAssembler(workers=2)).run(self.model)
+
+        numpy.testing.assert_array_equal(serial.get_displacements(), parallel.get_displacements())
+
+
+    def test_deduplicated_assembly_matches_serial(self):
+        serial = SerialAssembler().assemble(self.model.elements, self.dof_map)
+
+        assembler = SerialAssembler(deduplicate=True)
+        deduplicated = assembler.assemble(self.model.elements, self.dof_map)
+
+        # beams along the rows, bars along the columns and diagonal bars
+        self.assertIsNone(SerialAssembler().compression_ratio)
+        self.assertAlmostEqual(assembler.compression_ratio, len(self.model.elements)/3)
+        numpy.testing.assert_allclose(deduplicated.toarray(), serial.toarray(), rtol=1e-14, atol=1e-12)
+
+
+    def test_deduplicate_groups_within_tolerance(self):
+        lengths = numpy.array([1.0, 1.0 + 1e-13, 2.0, 1.0])
+        bending = numpy.array([1.0, 1.0, 1.0, 0.0])
+        first, groups = kernels.deduplicate((lengths, bending))
+
+        self.assertEqual(len(first), 3)
+        numpy.testing.assert_array_equal(groups[first], numpy.arange(3))
+        self.assertEqual(groups[0], groups[1])
+        self.assertEqual(len(set(groups[[0, 2, 3]])), 3)
+
+        # short members are told apart however long the others are
+        lengths = numpy.array([1e6, 1e-3, 1.2e-3, 1e-3*(1 + 1e-12)])
+        first, groups = kernels.deduplicate((lengths,))
+
+        self.assertEqual(len(first), 3)
+        self.assertEqual(groups[1], groups[3])
+        numpy.testing.assert_allclose(lengths[first][groups], lengths, rtol=1e-9)
+
+
+    def test_run_with_deduplication(self):
+        direct = LinearStatic().run(self.model)
+        deduplicated = LinearStatic(deduplicate=True).run(self.model)
+
+        self.assertIsNone(direct.get_compression_ratio())
+        self.assertAlmostEqual(deduplicated.get_compression_ratio(), len(self.model.elements)/3)
+        numpy.testing.assert_allclose(deduplicated.get_displacements(), direct.get_displacements(), rtol=1e-12, atol=1e-15)
+        numpy.testing.assert_allclose(deduplicated.get_member_forces(), direct.get_member_forces(), rtol=1e-12, atol=1e-12)
+
+
+    def test_member_forces_use_the_assembler_tolerance(self):
+        material = materials.LinearElastic('test', 100, 0.35)
+        section = sections.Section(1, 1)
+        nodes = [dofs.Node([0, 0]), dofs.Node([1, 0]), dofs.Node([2.00005, 0])]
+
+        # two bars whose lengths agree to 1e-4, which share a matrix
+        model = models.Static()
+        model.append_element( Bar2([nodes[0], nodes[1]], section, material) )
+        model.append_element( Bar2([nodes[1], nodes[2]], section, material) )
+        for node in nodes:
+            model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(node, dofs.Parameter.dy), 0))
+        for node in (nodes[0], nodes[2]):
+            model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(node, dofs.Parameter.dx), 0))
+        model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(nodes[1], dofs.Parameter.dx), 1.0) )
+
+        results = LinearStatic(assembler=SerialAssembler(deduplicate=True, tolerance=1e-4)).run(model)
+        forces = results.get_member_forces()
+
+        # the middle node is in equilibrium with the forces of the assembled matrices
+        self.assertAlmostEqual(results.get_compression_ratio(), 2.0)
+        self.assertAlmostEqual(forces[0, 3] + forces[1, 0], 1.0, places=12)
+
+
+    def test_out_of_core_assembly_matches_serial(self):
+        serial = SerialAssembler().assemble(self.model.elements, self.dof_map)
+
+        assembler = OutOfCoreAssembler(memory_budget=20000)
+        out_of_core = assembler.assemble(self.model.elements, self.dof_map)
+
+        self.assertGreater(len(assembler.get_bands(numpy.diff(serial.indptr))), 3)
+        numpy.testing.assert_array_equal(out_of_core.indptr, serial.indptr)
+        numpy.testing.assert_array_equal(out_of_core.indices, serial.indices)
+        numpy.testing.assert_allclose(out_of_core.data, serial.data, rtol=1e-14)
+
+
+    def test_run_out_of_core_with_iterative_solver(self):
+        direct = LinearStatic().run(self.model)
+        iterative = LinearStatic(assembler=OutOfCoreAssembler(memory_budget=20000), solver=ConjugateGradientSolver()).run(self.model)
+
+        numpy.testing.assert_allclose(iterative.get_displacements(), direct.get_displacements(), rtol=1e-7, atol=1e-12)
+
+
+    def test_assembly_plan_matches_partitions(self):
+        analysis = LinearStatic()
+        plan = analysis.get_assembly_plan(self.model)
+        equation = analysis.run(self.model).get_equation()
+
+        blocks = plan.assemble(self.model.elements)
+        for name in AssemblyPlan.BLOCKS:
+            expected = getattr(equation, 'k_' + name).tocsr()
+            expected.sort_indices()
+            numpy.testing.assert_array_equal(blocks[name].indptr, expected.indptr)
+            numpy.testing.assert_array_equal(blocks[name].indices, expected.indices)
+            numpy.testing.assert_allclose(blocks[name].data, expected.data, rtol=1e-14, atol=1e-12)
+
+
+    def test_assembly_plan_refills_in_place(self):
+        analysis = LinearStatic()
+        plan = analysis.get_assembly_plan(self.model)
+        data = plan.blocks['ff'].data
+
+        for area in [1.0, 2.0, 0.5]:
+            for elem in self.model.elements:
+                elem.section._area = area
+
+            expected = analysis.run(self.model)
+            results = analysis.run(self.model, plan=plan)
+
+            self.assertIs(plan.blocks['ff'].data, data)
+            numpy.testing.assert_allclose(results.get_displacements(), expected.get_displacements(), rtol=1e-10, atol=1e-14)
+
+        with self.assertRaises(ValueError):
+            plan.assemble(self.model.elements[1:])
+
+
+    def test_stiffness_operator_matches_assembled_matrix(self):
+        n_essential = len(LinearStatic().get_global_dof_map(self.model)[1])
+        k_global = SerialAssembler().assemble(self.model.elements, self.dof_map)
+        k_ff = k_global[n_essential:, n_essential:]
+        operator = StiffnessOperator(self.model.elements, self.dof_map, n_essential)
+
+        x = numpy.random.default_rng(0).standard_normal(len(self.dof_map))
+        self.assertEqual(operator.shape, k_ff.shape)
+        numpy.testing.assert_allclose(operator.matvec(x[n_essential:]), k_ff.dot(x[n_essential:]), rtol=1e-12, atol=1e-10)
+        numpy.testing.assert_allclose(operator.apply(x), k_global.dot(x), rtol=1e-12, atol=1e-10)
+        numpy.testing.assert_allclose(operator.diagonal(), k_ff.diagonal(), rtol=1e-14)
+
+
+    def test_run_matrix_free(self):
+        # settle one support, so that prescribed displacements are accounted for
+        support = self.model.prescribed_displacements[1]
+        self.model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(support.global_dof.node, dofs.Parameter.dy), 0.01) )
+        self.model.prescribed_displacements.remove(support)
+
+        direct = LinearStatic().run(self.model)
+        matrix_free = MatrixFreeLinearStatic().run(self.model)
+
+        numpy.testing.assert_allclose(matrix_free.get_displacements(), direct.get_displacements(), rtol=1e-7, atol=1e-12)
+        numpy.testing.assert_allclose(matrix_free.get_reactions(), direct.get_reactions(), rtol=1e-6, atol=1e-8)
+        numpy.testing.assert_allclose(matrix_free.get_member_forces(), direct.get_member_forces(), rtol=1e-6, atol=1e-8)
+
+
+if __name__ == '__main__':
+    unittest.main()
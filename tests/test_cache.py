@@ -0,0 +1,150 @@
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+from barman import models, loads
+from barman.analysis import LinearStatic
+from barman.assembly import SerialAssembler
+from barman.cache import ResultCache, get_key, model_hash
+from barman.solvers import ConjugateGradientSolver
+from barman import materials, dofs, sections
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import Bar2, EulerBernoulli
+
+
+def get_frame_model(load=1.0, reverse=False):
+    """Returns a braced portal frame, optionally built in reverse order from new node objects"""
+
+    material = materials.LinearElastic('test', 200e6, 0.3)
+    section = sections.Section(0.01, 1e-4)
+    nodes = [dofs.Node([0, 0]), dofs.Node([0, 3]), dofs.Node([4, 3]), dofs.Node([4, 0])]
+
+    elements = [
+        EulerBernoulli([nodes[0], nodes[1]], section, material),
+        EulerBernoulli([nodes[1], nodes[2]], section, material),
+        EulerBernoulli([nodes[2], nodes[3]], section, material),
+        Bar2([nodes[0], nodes[2]], section, material),
+    ]
+    supports = [dofs.GlobalDoF(node, parameter) for node in (nodes[0], nodes[3]) for parameter in (dofs.Parameter.dx, dofs.Parameter.dy, dofs.Parameter.rz)]
+
+    order = -1 if reverse else 1
+    model = models.Static()
+    for elem in elements[::order]:
+        model.append_element(elem)
+    for gdof in supports[::order]:
+        model.append_prescribed_displacement( PrescribedDisplacement(gdof, 0) )
+    model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(nodes[1], dofs.Parameter.dx), load) )
+    model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(nodes[2], dofs.Parameter.dy), -2.0) )
+    model.append_element_load( loads.UniformLoad(elements[1], (0.0, -10.0)) )
+
+    return model
+
+
+class CountingAssembler(SerialAssembler):
+
+    def __init__(self):
+        self.calls = 0
+
+    def assemble(self, elements, dof_order):
+        self.calls += 1
+        return super().assemble(elements, dof_order)
+
+
+def store_results(directory, load):
+    analysis = LinearStatic(cache=ResultCache(directory))
+    analysis.run(get_frame_model(load))
+    return get_key(get_frame_model(load), analysis.get_cache_settings())
+
+
+class TestModelHash(unittest.TestCase):
+
+    def test_hash_does_not_depend_on_order(self):
+        self.assertEqual(model_hash(get_frame_model()), model_hash(get_frame_model(reverse=True)))
+
+
+    def test_hash_depends_on_values(self):
+        self.assertNotEqual(model_hash(get_frame_model(1.0)), model_hash(get_frame_model(1.0 + 1e-12)))
+
+        model = get_frame_model()
+        model.elements[0].material._young_modulus *= 2
+        self.assertNotEqual(model_hash(model), model_hash(get_frame_model()))
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def test_cached_results_match_analysis(self):
+        expected = LinearStatic().run(get_frame_model())
+
+        assembler = CountingAssembler()
+        LinearStatic(assembler=assembler, cache=self.cache).run(get_frame_model(reverse=True))
+        results = LinearStatic(assembler=assembler, cache=self.cache).run(get_frame_model())
+        self.assertEqual(assembler.calls, 1)
+
+        numpy.testing.assert_allclose(results.get_displacements(), expected.get_displacements(), atol=1e-15)
+        numpy.testing.assert_allclose(results.get_reactions(), expected.get_reactions(), atol=1e-9)
+        numpy.testing.assert_allclose(results.get_member_forces(), expected.get_member_forces(), atol=1e-9)
+        numpy.testing.assert_allclose(results.get_nodal_displacements(), expected.get_nodal_displacements(), atol=1e-15)
+
+        # the equation is generated again on request
+        numpy.testing.assert_allclose(results.get_equation().d_f, expected.get_equation().d_f, atol=1e-15)
+        self.assertEqual(assembler.calls, 2)
+
+
+    def test_analysis_settings_are_part_of_the_key(self):
+        analyses = [LinearStatic(cache=self.cache), LinearStatic(cache=self.cache, precision='single'),
+                    LinearStatic(cache=self.cache, deduplicate=True),
+                    LinearStatic(cache=self.cache, solver=ConjugateGradientSolver(tolerance=1e-3)),
+                    LinearStatic(cache=self.cache, solver=ConjugateGradientSolver(tolerance=1e-12))]
+        for analysis in analyses:
+            analysis.run(get_frame_model())
+
+        # each analysis stores its own entry, and loads it back
+        self.assertEqual(len(self.cache.get_entries()), 5)
+        for analysis in analyses:
+            self.assertIsInstance(analysis.run(get_frame_model()), LinearStatic.CachedResults)
+
+        self.assertEqual(len(set(str(analysis.get_cache_settings()) for analysis in analyses)), 5)
+
+
+    def test_least_recently_used_entries_are_evicted(self):
+        analysis = LinearStatic(cache=self.cache)
+        for load in [1.0, 2.0, 3.0]:
+            analysis.run(get_frame_model(load))
+            time.sleep(0.01)
+
+        entry_size = max(size for path, size, last_use in self.cache.get_entries())
+        self.assertEqual(len(self.cache.get_entries()), 3)
+
+        # use the first entry, so that the second one is the least recently used
+        settings = analysis.get_cache_settings()
+        self.assertIsNotNone(self.cache.load(get_frame_model(1.0), analysis.get_global_dof_map(get_frame_model(1.0))[0], settings))
+        time.sleep(0.01)
+
+        bounded = ResultCache(self.directory.name, max_size=3*entry_size)
+        LinearStatic(cache=bounded).run(get_frame_model(4.0))
+
+        paths = [os.path.basename(path) for path, size, last_use in bounded.get_entries()]
+        self.assertEqual(len(paths), 3)
+        self.assertNotIn(get_key(get_frame_model(2.0), settings) + '.npz', paths)
+        self.assertIn(get_key(get_frame_model(1.0), settings) + '.npz', paths)
+
+
+    def test_concurrent_processes(self):
+        with ProcessPoolExecutor(max_workers=4) as pool:
+            keys = list(pool.map(store_results, [self.directory.name]*8, [1.0, 2.0]*4))
+
+        paths = sorted(os.path.basename(path) for path, size, last_use in self.cache.get_entries())
+        self.assertEqual(paths, sorted(set(key + '.npz' for key in keys)))
+        self.assertFalse([name for name in os.listdir(self.directory.name) if name.endswith('.tmp')])
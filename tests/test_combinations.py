@@ -0,0 +1,74 @@
+import unittest
+
+import numpy
+from barman import models
+from barman.analysis import LinearStatic
+from barman.combinations import LoadCombinations
+from barman import materials, dofs, sections
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import EulerBernoulli
+from barman.loads import UniformLoad
+
+
+class TestLoadCombinations(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = [ dofs.Node([0,0]), dofs.Node([2,0]), dofs.Node([4,0]) ]
+        self.material = materials.LinearElastic('test', 100, 0.35);
+        self.section = sections.Section(1, 3);
+
+
+    def getModel(self, point_load, distributed_load):
+        model = models.Static()
+        for i in range(2):
+            model.append_element( EulerBernoulli([self.nodes[i], self.nodes[i+1]], self.section, self.material) )
+
+        for parameter in [dofs.Parameter.dx, dofs.Parameter.dy, dofs.Parameter.rz]:
+            model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], parameter), 0))
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[2], dofs.Parameter.dy), 0))
+
+        model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(self.nodes[1], dofs.Parameter.dy), point_load) )
+        for elem in model.elements:
+            model.append_element_load( UniformLoad(elem, [0, distributed_load]) )
+
+        return model
+
+
+    def getCombinations(self, factors):
+        cases = [ LinearStatic().run(self.getModel(-1.0, 0.0)), LinearStatic().run(self.getModel(0.0, -1.0)) ]
+        return LoadCombinations(cases, factors)
+
+
+    def test_combination_matches_direct_analysis(self):
+        combinations = self.getCombinations([[1.35, 1.5], [1.0, 0.0]])
+        direct = LinearStatic().run(self.getModel(-1.35, -1.5))
+
+        numpy.testing.assert_allclose(combinations.get_displacements()[0], direct.get_displacements(), atol=1e-12)
+        numpy.testing.assert_allclose(combinations.get_reactions()[0], direct.get_reactions(), atol=1e-12)
+        numpy.testing.assert_allclose(combinations.get_member_forces()[0], direct.get_member_forces(), atol=1e-12)
+
+
+    def test_member_forces_are_in_equilibrium(self):
+        result = LinearStatic().run(self.getModel(0.0, -1.0))
+        forces = result.get_member_forces()
+
+        # the transverse end forces on each member balance its downward load of 2 units
+        numpy.testing.assert_allclose(forces[:, 1] + forces[:, 4], [2.0, 2.0])
+
+
+    def test_envelope_matches_all_combinations(self):
+        factors = numpy.random.RandomState(0).uniform(-1.5, 1.5, (50, 2))
+        combinations = self.getCombinations(factors)
+
+        envelope = combinations.get_envelope('member_forces', chunk_size=7)
+        forces = combinations.get_member_forces()
+
+        numpy.testing.assert_allclose(envelope.minimum, forces.min(axis=0))
+        numpy.testing.assert_allclose(envelope.maximum, forces.max(axis=0))
+        numpy.testing.assert_array_equal(envelope.maximum_combination, forces.argmax(axis=0))
+        numpy.testing.assert_array_equal(envelope.minimum_combination, forces.argmin(axis=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+import numpy
+from barman import models
+from barman.analysis import LinearStatic
+from barman.diagrams import MemberDiagrams
+from barman import materials, dofs, sections
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import Bar2, EulerBernoulli
+from barman.loads import UniformLoad, ThermalStrain
+
+
+class TestMemberDiagrams(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = [ dofs.Node([0,0]), dofs.Node([2,0]), dofs.Node([4,0]) ]
+        self.material = materials.LinearElastic('test', 100, 0.35);
+        self.section = sections.Section(1, 3);
+
+
+    def getSimplySupportedBeam(self, element_type):
+        model = models.Static()
+        for i in range(2):
+            model.append_element( element_type([self.nodes[i], self.nodes[i+1]], self.section, self.material) )
+
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], dofs.Parameter.dx), 0))
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], dofs.Parameter.dy), 0))
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[2], dofs.Parameter.dy), 0))
+
+        return model
+
+
+    def test_uniformly_loaded_beam(self):
+        model = self.getSimplySupportedBeam(EulerBernoulli)
+        for elem in model.elements:
+            model.append_element_load( UniformLoad(elem, [0, -1.5]) )
+
+        diagrams = MemberDiagrams(LinearStatic().run(model), stations=5)
+
+        x = numpy.array([diagrams.stations*2, 2 + diagrams.stations*2])
+        EI = 100*3
+        numpy.testing.assert_allclose(diagrams.get_bending_moments(), 1.5*x*(4 - x)/2, atol=1e-12)
+        numpy.testing.assert_allclose(diagrams.get_shear_forces(), 1.5*(2 - x), atol=1e-12)
+        numpy.testing.assert_allclose(diagrams.get_transverse_displacements(), -1.5*x*(4**3 - 2*4*x**2 + x**3)/(24*EI), atol=1e-12)
+        numpy.testing.assert_allclose(diagrams.get_axial_forces(), 0.0, atol=1e-12)
+
+
+    def test_cantilever_with_tip_load(self):
+        model = models.Static()
+        model.append_element( EulerBernoulli([self.nodes[0], self.nodes[1]], self.section, self.material) )
+        for parameter in [dofs.Parameter.dx, dofs.Parameter.dy, dofs.Parameter.rz]:
+            model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], parameter), 0))
+        model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(self.nodes[1], dofs.Parameter.dy), -1.0) )
+        model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(self.nodes[1], dofs.Parameter.dx), 2.0) )
+
+        diagrams = MemberDiagrams(LinearStatic().run(model), stations=[0.0, 0.25, 1.0])
+
+        numpy.testing.assert_allclose(diagrams.get_bending_moments(), [[-2.0, -1.5, 0.0]], atol=1e-12)
+        numpy.testing.assert_allclose(diagrams.get_shear_forces(), [[1.0, 1.0, 1.0]], atol=1e-12)
+        numpy.testing.assert_allclose(diagrams.get_axial_forces(), [[2.0, 2.0, 2.0]], atol=1e-12)
+        numpy.testing.assert_allclose(diagrams.get_axial_displacements(), [[0.0, 0.01, 0.04]], atol=1e-12)
+
+
+    def test_truss_members_carry_transverse_loads_as_simple_spans(self):
+        model = self.getSimplySupportedBeam(Bar2)
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[1], dofs.Parameter.dy), 0))
+        model.append_element_load( UniformLoad(model.elements[0], [0, -1.0]) )
+        model.append_element_load( ThermalStrain(model.elements[1], 1e-3) )
+
+        diagrams = MemberDiagrams(LinearStatic().run(model), stations=3)
+
+        numpy.testing.assert_allclose(diagrams.get_bending_moments(), [[0.0, 0.5, 0.0], [0.0, 0.0, 0.0]], atol=1e-12)
+        numpy.testing.assert_allclose(diagrams.get_shear_forces(), [[1.0, 0.0, -1.0], [0.0, 0.0, 0.0]], atol=1e-12)
+        numpy.testing.assert_allclose(diagrams.get_axial_forces(), 0.0, atol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
-from barman import materials, dofs, sections
+import numpy
+from barman import materials, dofs, sections, kernels
 from barman.elements import Bar2, EulerBernoulli
 
 
@@ -88,6 +89,50 @@ class TestEulerBernoulliMethods(CommonTests, unittest.TestCase):
         self.assertEqual(len(global_dofs), 6)
 
 
+    def test_get_global_dofs_follow_stiffness_matrix_layout(self):
+
+        element = self.getElement()
+        global_dofs = element.get_global_dofs()
+
+        parameters = [dofs.Parameter.dx, dofs.Parameter.dy, dofs.Parameter.rz]
+        expected = [dofs.GlobalDoF(node, parameter) for node in self.nodes for parameter in parameters]
+        self.assertEqual(global_dofs, expected)
+
+
+    def test_get_shape_functions_interpolate_end_dofs(self):
+
+        element = self.getElement()
+
+        numpy.testing.assert_allclose(element.get_shape_functions(0), [1, 1, 0, 0, 0, 0], atol=1e-12)
+        numpy.testing.assert_allclose(element.get_shape_functions(2), [0, 0, 0, 1, 1, 0], atol=1e-12)
+
+
+    def test_get_shape_functions_match_batched_shape_functions(self):
+
+        element = self.getElement()
+        stations = numpy.linspace(0, 1, 7)
+        N = kernels.get_shape_functions(stations, [2.0], [True])[0]
+
+        for xi, N_batched in zip(stations, N):
+            numpy.testing.assert_allclose(element.get_shape_functions(2*xi), N_batched, atol=1e-12)
+
+
+    def test_shape_functions_reproduce_bending_stiffness(self):
+
+        element = self.getElement()
+        L = element.get_length()
+        EI = self.material.young_modulus*self.section.I_zz
+
+        # integrate EI*B'*B with 3-point Gauss quadrature
+        points, weights = numpy.polynomial.legendre.leggauss(3)
+        B = kernels.get_shape_functions((points + 1)/2, [L], [True], derivative=2)[0]
+        k = EI*numpy.einsum('m,mi,mj->ij', weights*L/2, B, B)
+
+        bending = [1, 2, 4, 5]
+        k_local = element.get_local_stiffness_matrix()
+        numpy.testing.assert_allclose(k[numpy.ix_(bending, bending)], k_local[numpy.ix_(bending, bending)], atol=1e-12)
+
+
     def test_get_bar_length(self):
 
         element = self.getElement()
@@ -0,0 +1,56 @@
+import subprocess
+import sys
+import unittest
+
+import barman
+
+
+def get_import_time(statement):
+    """Returns the cumulative import time in seconds, and the imported modules, of a statement run in a new interpreter"""
+
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], capture_output=True, text=True, check=True)
+
+    cumulative = 0
+    modules = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, total, name = line[len('import time:'):].split('|')
+        modules.append(name.strip())
+        # top-level imports are not indented
+        if not name[1:].startswith(' '):
+            cumulative += int(total)
+
+    return cumulative*1e-6, modules
+
+
+class TestImports(unittest.TestCase):
+
+    # import time budgets, in seconds
+    PACKAGE_BUDGET = 0.25
+    MODEL_BUDGET = 2.0
+
+
+    def test_package_import_budget(self):
+        seconds, modules = get_import_time('import barman')
+
+        self.assertLess(seconds, self.PACKAGE_BUDGET)
+        self.assertNotIn('numpy', modules)
+
+
+    def test_model_modules_do_not_import_scipy(self):
+        seconds, modules = get_import_time('import barman.analysis, barman.models, barman.loads, barman.combinations')
+
+        self.assertLess(seconds, self.MODEL_BUDGET)
+        self.assertFalse([name for name in modules if name.startswith('scipy')])
+
+
+    def test_lazy_attributes(self):
+        self.assertIs(barman.LinearStatic, barman.analysis.LinearStatic)
+        self.assertIs(barman.Static, barman.models.Static)
+        self.assertIn('MemberDiagrams', dir(barman))
+        self.assertIn('jit', dir(barman))
+        self.assertTrue(callable(barman.jit.get_kernels))
+
+        with self.assertRaises(AttributeError):
+            barman.missing
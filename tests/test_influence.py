@@ -0,0 +1,78 @@
+import unittest
+
+import numpy
+from barman import models
+from barman.analysis import LinearStatic
+from barman.influence import InfluenceLines, get_load_train_response
+from barman import materials, dofs, sections
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import EulerBernoulli
+
+
+class TestInfluenceLines(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = [ dofs.Node([0,0]), dofs.Node([4,0]), dofs.Node([8,0]) ]
+        self.material = materials.LinearElastic('test', 100, 0.35);
+        self.section = sections.Section(1, 3);
+
+        self.model = models.Static()
+        for i in range(2):
+            self.model.append_element( EulerBernoulli([self.nodes[i], self.nodes[i+1]], self.section, self.material) )
+
+        self.model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], dofs.Parameter.dx), 0))
+        self.model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], dofs.Parameter.dy), 0))
+        self.model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[2], dofs.Parameter.dy), 0))
+
+
+    def test_reaction_influence_line_of_simply_supported_beam(self):
+        result = InfluenceLines(self.model.elements, stations=5).run(self.model)
+
+        self.assertEqual(len(result.positions), 9)
+        numpy.testing.assert_allclose(result.get_reactions()[:, 1], 1 - result.positions/8, atol=1e-12)
+        numpy.testing.assert_allclose(result.get_reactions()[:, 2], result.positions/8, atol=1e-12)
+
+
+    def test_midspan_moment_influence_line(self):
+        result = InfluenceLines(self.model.elements, stations=5).run(self.model)
+
+        x = result.positions
+        expected = numpy.where(x <= 4, x/2, (8 - x)/2)
+        numpy.testing.assert_allclose(result.get_member_forces()[:, 0, 5], expected, atol=1e-12)
+
+
+    def test_matches_static_analysis_at_a_node(self):
+        result = InfluenceLines(self.model.elements, stations=3).run(self.model)
+
+        self.model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(self.nodes[1], dofs.Parameter.dy), -1.0) )
+        static = LinearStatic().run(self.model)
+
+        numpy.testing.assert_allclose(result.get_displacements()[2], static.get_displacements(), atol=1e-12)
+        numpy.testing.assert_allclose(result.get_reactions()[2], static.get_reactions(), atol=1e-12)
+
+        # the shear jumps under the load, so only the end moments are unambiguous
+        numpy.testing.assert_allclose(result.get_member_forces()[2][:, [2, 5]], static.get_member_forces()[:, [2, 5]], atol=1e-12)
+
+
+    def test_reversed_path_runs_backwards(self):
+        path = list(reversed(self.model.elements))
+        result = InfluenceLines(path, stations=5).run(self.model)
+
+        numpy.testing.assert_allclose(result.get_reactions()[:, 1], result.positions/8, atol=1e-12)
+
+
+    def test_load_train_response(self):
+        positions = numpy.linspace(0, 8, 9)
+        influence = 1 - positions/8
+
+        response = get_load_train_response(positions, influence, [2.0, 1.0], [3.0])
+
+        # lead axle at 5 and trailing axle at 2
+        self.assertAlmostEqual(response[5], 2.0*(1 - 5/8) + 1.0*(1 - 2/8))
+        # trailing axle still off the path
+        self.assertAlmostEqual(response[1], 2.0*(1 - 1/8))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import importlib.util
+import unittest
+
+import numpy
+from barman import jit, kernels
+
+
+def get_element_arrays(n):
+    """Returns the lengths, cosines, sines, EA, EI, mass per length and bending flags of n random elements"""
+
+    rng = numpy.random.default_rng(0)
+    angles = rng.uniform(0, 2*numpy.pi, n)
+    return (rng.uniform(0.5, 5.0, n), numpy.cos(angles), numpy.sin(angles), rng.uniform(1e3, 1e6, n),
+            rng.uniform(1e1, 1e4, n), rng.uniform(1.0, 10.0, n), rng.random(n) < 0.5)
+
+
+class TestKernels(unittest.TestCase):
+    """The loop kernels, run as plain Python, match the NumPy kernels"""
+
+    def setUp(self):
+        self.L, self.c, self.s, self.EA, self.EI, self.rhoA, self.bending = get_element_arrays(20)
+        self.indices = numpy.random.default_rng(1).integers(-1, 30, (20, 6))
+
+
+    def numpy_path(self, function, *args):
+        jit.set_enabled(False)
+        try:
+            return function(*args)
+        finally:
+            jit.set_enabled(True)
+
+
+    def test_global_stiffness(self):
+        expected = self.numpy_path(kernels.get_global_stiffness_from_arrays, self.L, self.c, self.s, self.EA, self.EI, self.bending)
+        numpy.testing.assert_allclose(jit.global_stiffness(self.L, self.c, self.s, self.EA, self.EI, self.bending), expected, rtol=1e-12, atol=1e-9)
+
+
+    def test_global_mass(self):
+        expected = self.numpy_path(kernels.get_global_mass_from_arrays, self.L, self.c, self.s, self.rhoA, self.bending)
+        numpy.testing.assert_allclose(jit.global_mass(self.L, self.c, self.s, self.rhoA, self.bending), expected, rtol=1e-12, atol=1e-12)
+
+        # a rigid translation in any direction moves the whole mass of each element
+        for direction in ([1, 0, 0, 1, 0, 0], [0, 1, 0, 0, 1, 0]):
+            numpy.testing.assert_allclose(numpy.einsum('i,nij,j->n', direction, expected, direction), self.rhoA*self.L)
+
+
+    def test_scatter(self):
+        values = numpy.random.default_rng(2).standard_normal(self.indices.shape)
+        expected = self.numpy_path(kernels.scatter, self.indices, values, 30)
+        numpy.testing.assert_allclose(jit.scatter(self.indices.ravel(), values.ravel(), 30), expected, rtol=1e-12, atol=1e-12)
+
+
+    def test_assemble_csr(self):
+        import scipy.sparse
+
+        matrices = jit.global_stiffness(self.L, self.c, self.s, self.EA, self.EI, self.bending)
+        expected = self.numpy_path(kernels.assemble, self.indices, matrices, 30)
+        data, columns, indptr = jit.assemble_csr(self.indices, matrices, numpy.arange(len(matrices)), 30)
+        k = scipy.sparse.csr_matrix((data, columns, indptr), shape=(30, 30))
+
+        self.assertTrue(k.has_sorted_indices)
+        numpy.testing.assert_allclose(k.toarray(), expected.toarray(), rtol=1e-12, atol=1e-9)
+
+        # elements sharing matrices
+        groups = numpy.arange(len(matrices)) % 3
+        expected = self.numpy_path(kernels.assemble, self.indices, matrices[:3], 30, numpy.float64, groups)
+        data, columns, indptr = jit.assemble_csr(self.indices, matrices[:3], groups, 30)
+        numpy.testing.assert_allclose(scipy.sparse.csr_matrix((data, columns, indptr), shape=(30, 30)).toarray(), expected.toarray(), rtol=1e-12, atol=1e-9)
+
+
+@unittest.skipIf(importlib.util.find_spec('numba') is None, 'Numba is not installed')
+class TestCompiledKernels(unittest.TestCase):
+    """The compiled kernels match the NumPy kernels"""
+
+    def setUp(self):
+        self.compiled = jit.get_kernels()
+        self.L, self.c, self.s, self.EA, self.EI, self.rhoA, self.bending = get_element_arrays(500)
+
+
+    def test_kernels_match_numpy(self):
+        self.assertIsNotNone(self.compiled)
+
+        jit.set_enabled(False)
+        try:
+            self.assertIsNone(jit.get_kernels())
+            k = kernels.get_global_stiffness_from_arrays(self.L, self.c, self.s, self.EA, self.EI, self.bending)
+            m = kernels.get_global_mass_from_arrays(self.L, self.c, self.s, self.rhoA, self.bending)
+            indices = numpy.random.default_rng(1).integers(-1, 600, (500, 6))
+            K = kernels.assemble(indices, k, 600)
+        finally:
+            jit.set_enabled(True)
+
+        numpy.testing.assert_allclose(kernels.get_global_stiffness_from_arrays(self.L, self.c, self.s, self.EA, self.EI, self.bending), k, rtol=1e-12, atol=1e-9)
+        numpy.testing.assert_allclose(kernels.get_global_mass_from_arrays(self.L, self.c, self.s, self.rhoA, self.bending), m, rtol=1e-12, atol=1e-12)
+        numpy.testing.assert_allclose(kernels.assemble(indices, k, 600).toarray(), K.toarray(), rtol=1e-12, atol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
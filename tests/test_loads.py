@@ -0,0 +1,103 @@
+import unittest
+
+import numpy
+from barman import models
+from barman.analysis import LinearStatic
+from barman import materials, dofs, sections
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import Bar2, EulerBernoulli
+from barman.loads import UniformLoad, LinearLoad, ThermalStrain, get_fixed_end_forces
+
+
+class TestElementLoads(unittest.TestCase):
+
+    def setUp(self):
+        self.nodes = [ dofs.Node([0,0]), dofs.Node([2,0]) ]
+        self.material = materials.LinearElastic('test', 100, 0.35);
+        self.section = sections.Section(1, 3);
+
+
+    def getCantilever(self):
+        model = models.Static()
+        elem = EulerBernoulli(self.nodes, self.section, self.material)
+        model.append_element(elem)
+
+        for parameter in [dofs.Parameter.dx, dofs.Parameter.dy, dofs.Parameter.rz]:
+            model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], parameter), 0))
+
+        return model, elem
+
+
+    def getDisplacement(self, model, result, node, parameter):
+        dof_map = result.get_dof_order()
+        equation = result.get_equation()
+
+        return equation.d_f[dof_map[dofs.GlobalDoF(node, parameter)] - len(model.prescribed_displacements)]
+
+
+    def test_uniform_load_on_cantilever(self):
+        model, elem = self.getCantilever()
+        model.append_element_load( UniformLoad(elem, [0, -1.5]) )
+
+        result = LinearStatic().run(model)
+
+        EI = 100*3
+        v = self.getDisplacement(model, result, self.nodes[1], dofs.Parameter.dy)
+        self.assertAlmostEqual(v, -1.5*2**4/(8*EI))
+
+
+    def test_linear_load_on_cantilever(self):
+        model, elem = self.getCantilever()
+        model.append_element_load( LinearLoad(elem, [0, 0], [0, -1.5]) )
+
+        result = LinearStatic().run(model)
+
+        EI = 100*3
+        v = self.getDisplacement(model, result, self.nodes[1], dofs.Parameter.dy)
+        self.assertAlmostEqual(v, -11*1.5*2**4/(120*EI))
+
+
+    def test_global_and_local_loads_are_equivalent(self):
+        nodes = [ dofs.Node([0,0]), dofs.Node([3,4]) ]
+        elem = EulerBernoulli(nodes, self.section, self.material)
+
+        local = get_fixed_end_forces([ LinearLoad(elem, [-0.8*2, -0.6*2], [-0.8*5, -0.6*5]) ])
+        glob = get_fixed_end_forces([ LinearLoad(elem, [0, -2], [0, -5], local=False) ])
+
+        numpy.testing.assert_allclose(local, glob)
+
+
+    def test_thermal_strain_on_free_bar(self):
+        model = models.Static()
+        elem = Bar2(self.nodes, self.section, self.material)
+        model.append_element(elem)
+        model.append_element_load( ThermalStrain(elem, 1e-3) )
+
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], dofs.Parameter.dx), 0))
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[0], dofs.Parameter.dy), 0))
+        model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(self.nodes[1], dofs.Parameter.dy), 0))
+
+        result = LinearStatic().run(model)
+
+        u = self.getDisplacement(model, result, self.nodes[1], dofs.Parameter.dx)
+        self.assertAlmostEqual(u, 2e-3)
+
+
+    def test_force_vector_sums_repeated_nodal_forces(self):
+        model = models.Static()
+        model.append_element( Bar2(self.nodes, self.section, self.material) )
+        global_dof = dofs.GlobalDoF(self.nodes[1], dofs.Parameter.dx)
+        model.append_prescribed_force( PrescribedForce(global_dof, 1.0) )
+        model.append_prescribed_force( PrescribedForce(global_dof, 2.0) )
+
+        analysis = LinearStatic()
+        dof_map, essential_global_dofs = analysis.get_global_dof_map(model)
+        f_global = analysis.generate_global_force_vector(model.prescribed_forces, dof_map)
+
+        self.assertEqual(f_global[dof_map[global_dof]], 3.0)
+        self.assertEqual(f_global.sum(), 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
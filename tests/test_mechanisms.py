@@ -0,0 +1,134 @@
+import unittest
+
+import numpy
+from barman import models
+from barman.analysis import LinearStatic
+from barman.mechanisms import MechanismError, FLOATING, RIGID_BODY, LOCAL
+from barman import materials, dofs, sections
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import Bar2, EulerBernoulli
+
+
+class TestMechanisms(unittest.TestCase):
+
+    def setUp(self):
+        self.material = materials.LinearElastic('test', 200e6, 0.3)
+        self.section = sections.Section(0.01, 1e-4)
+        self.nodes = [dofs.Node([0, 0]), dofs.Node([2, 0]), dofs.Node([4, 0]), dofs.Node([2, 2]), dofs.Node([6, 0]), dofs.Node([8, 0])]
+
+
+    def support(self, model, node, parameters=(dofs.Parameter.dx, dofs.Parameter.dy)):
+        for parameter in parameters:
+            model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(node, parameter), 0.0) )
+
+
+    def get_truss(self):
+        """Returns a triangle truss pinned at both ends of its base"""
+
+        model = models.Static()
+        n = self.nodes
+        for start, end in [(0, 1), (1, 2), (0, 3), (1, 3), (2, 3)]:
+            model.append_element( Bar2([n[start], n[end]], self.section, self.material) )
+        self.support(model, n[0])
+        self.support(model, n[2])
+        model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(n[3], dofs.Parameter.dy), -1.0) )
+
+        return model
+
+
+    def get_mechanisms(self, model):
+        with self.assertRaises(MechanismError) as context:
+            LinearStatic().run(model)
+
+        return {kind: nodes for kind, nodes in context.exception.mechanisms}
+
+
+    def test_stable_models_pass(self):
+        results = LinearStatic().run(self.get_truss())
+        self.assertTrue(numpy.all(numpy.isfinite(results.get_displacements())))
+
+        # a cantilever is restrained by its fixed end alone
+        model = models.Static()
+        model.append_element( EulerBernoulli([self.nodes[0], self.nodes[1]], self.section, self.material) )
+        self.support(model, self.nodes[0], (dofs.Parameter.dx, dofs.Parameter.dy, dofs.Parameter.rz))
+        LinearStatic().run(model)
+
+
+    def test_long_members_in_millimetres(self):
+        # the rotational stiffness of a node is about L**2 times its translational stiffness
+        material = materials.LinearElastic('steel', 200e3, 0.3)
+        section = sections.Section(1e4, 1e8)
+
+        for length in [1e4, 1e5, 1e6]:
+            model = models.Static()
+            nodes = [dofs.Node([0.0, 0.0]), dofs.Node([length, 0.0])]
+            model.append_element( EulerBernoulli(nodes, section, material) )
+            self.support(model, nodes[0], (dofs.Parameter.dx, dofs.Parameter.dy, dofs.Parameter.rz))
+            model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(nodes[1], dofs.Parameter.dy), -1e3) )
+
+            d = LinearStatic().run(model).get_displacements()
+            self.assertAlmostEqual(d[4]/(-1e3*length**3/(3*200e3*1e8)), 1.0)
+
+
+    def test_floating_part(self):
+        model = self.get_truss()
+        model.append_element( EulerBernoulli([self.nodes[4], self.nodes[5]], self.section, self.material) )
+
+        mechanisms = self.get_mechanisms(model)
+        self.assertEqual(set(mechanisms), {FLOATING})
+        self.assertEqual(mechanisms[FLOATING], [self.nodes[4], self.nodes[5]])
+
+
+    def test_unrestrained_rigid_body_mode(self):
+        # rollers on both ends leave the horizontal translation free
+        model = self.get_truss()
+        model.prescribed_displacements.clear()
+        self.support(model, self.nodes[0], (dofs.Parameter.dy,))
+        self.support(model, self.nodes[2], (dofs.Parameter.dy,))
+
+        mechanisms = self.get_mechanisms(model)
+        self.assertEqual(set(mechanisms), {RIGID_BODY})
+        self.assertEqual(len(mechanisms[RIGID_BODY]), 4)
+
+
+    def test_collinear_bars(self):
+        # the middle node of two collinear bars has no transverse stiffness
+        model = models.Static()
+        model.append_element( Bar2([self.nodes[0], self.nodes[1]], self.section, self.material) )
+        model.append_element( Bar2([self.nodes[1], self.nodes[2]], self.section, self.material) )
+        self.support(model, self.nodes[0])
+        self.support(model, self.nodes[2])
+
+        mechanisms = self.get_mechanisms(model)
+        self.assertEqual(set(mechanisms), {LOCAL})
+        self.assertEqual(mechanisms[LOCAL], [self.nodes[1]])
+        self.assertIn('Node(2,0)', str(MechanismError(list(mechanisms.items()))))
+
+        # unless it is supported across them
+        self.support(model, self.nodes[1], (dofs.Parameter.dy,))
+        LinearStatic().run(model)
+
+
+    def test_unrestrained_rotation(self):
+        # a beam without bending stiffness leaves its rotations free
+        model = models.Static()
+        model.append_element( EulerBernoulli([self.nodes[0], self.nodes[1]], sections.Section(0.01, 0.0), self.material) )
+        self.support(model, self.nodes[0])
+        self.support(model, self.nodes[1])
+
+        mechanisms = self.get_mechanisms(model)
+        self.assertEqual(mechanisms[LOCAL], [self.nodes[0], self.nodes[1]])
+
+
+    def test_check_can_be_disabled(self):
+        model = self.get_truss()
+        model.append_element( EulerBernoulli([self.nodes[4], self.nodes[5]], self.section, self.material) )
+
+        # the singular matrix then reaches the solver, which fails to factorize it
+        with self.assertRaises(RuntimeError):
+            LinearStatic(check=False).run(model)
+
+
+if __name__ == '__main__':
+    unittest.main()
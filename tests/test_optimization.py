@@ -0,0 +1,80 @@
+import unittest
+
+import numpy
+from barman.analysis import LinearStatic
+from barman.optimization import TrussTopologyOptimization, get_ground_structure
+
+
+def get_grid(nx, ny):
+    return numpy.array([[i, j] for i in range(nx) for j in range(ny)], dtype=float)
+
+
+class TestGroundStructure(unittest.TestCase):
+
+    def test_get_ground_structure(self):
+        nodes = get_grid(4, 3)
+
+        self.assertEqual(len(get_ground_structure(nodes)), 66)
+        numpy.testing.assert_array_equal(get_ground_structure(nodes, chunk_size=5), get_ground_structure(nodes))
+
+        short = get_ground_structure(nodes, max_length=1.5)
+        lengths = numpy.hypot(*(nodes[short[:, 1]] - nodes[short[:, 0]]).T)
+        self.assertEqual(len(short), 29)
+        self.assertTrue(numpy.all(lengths <= 1.5))
+
+
+class TestTrussTopologyOptimization(unittest.TestCase):
+
+    def test_point_load_near_a_wall(self):
+        """the optimal layout for a load at a distance a from a wall has two bars at 45 degrees, with compliance (2Pa)^2/(EV)"""
+
+        nodes = get_grid(2, 3)
+        supports = [[node, parameter] for node in range(3) for parameter in (0, 1)]
+        forces = [[4, 1, -1.0]]
+
+        results = TrussTopologyOptimization(volume=10.0).run(nodes, supports, forces, get_ground_structure(nodes))
+
+        self.assertAlmostEqual(results.get_compliance_history()[-1], 0.4, places=6)
+        self.assertAlmostEqual(results.get_volume(), 10.0)
+        numpy.testing.assert_array_equal(results.get_members(), [[0, 4], [2, 4]])
+        numpy.testing.assert_allclose(results.get_axial_forces(), [-0.5**0.5, 0.5**0.5], rtol=1e-6)
+
+        # the layout is a stable truss, which gives the same displacement in a static analysis
+        static = LinearStatic().run(results.to_model())
+        load = static.get_model().prescribed_forces[0].global_dof
+        self.assertAlmostEqual(static.get_displacements()[static.get_dof_order()[load]], results.get_displacements()[4, 1], places=6)
+
+
+    def test_results_match_the_final_layout_at_the_iteration_limit(self):
+        nodes = get_grid(4, 5)
+        supports = [[node, parameter] for node in range(5) for parameter in (0, 1)]
+        forces = [[17, 1, -1.0]]
+
+        optimization = TrussTopologyOptimization(volume=10.0, max_iterations=3)
+        results = optimization.run(nodes, supports, forces, get_ground_structure(nodes))
+        displacements, compliance = optimization.solve(numpy.asarray(nodes, dtype=float), results.get_members(), results.get_areas(),
+                                                       numpy.asarray(supports), numpy.asarray(forces, dtype=float))
+
+        self.assertEqual(results.get_active_history()[-1], len(results.get_members()))
+        self.assertAlmostEqual(results.get_compliance_history()[-1], compliance)
+        numpy.testing.assert_allclose(results.get_displacements(), displacements)
+
+
+    def test_member_adding_matches_full_ground_structure(self):
+        nodes = get_grid(4, 5)
+        supports = [[node, parameter] for node in range(5) for parameter in (0, 1)]
+        forces = [[17, 1, -1.0]]
+        candidates = get_ground_structure(nodes)
+
+        optimization = TrussTopologyOptimization(volume=10.0)
+        adding = optimization.run(nodes, supports, forces, candidates)
+        full = optimization.run(nodes, supports, forces, candidates, initial=numpy.arange(len(candidates)))
+
+        self.assertGreater(adding.get_added_history().sum(), 0)
+        self.assertLess(adding.get_active_history().max(), len(candidates))
+        self.assertLess(adding.get_compliance_history()[-1], 1.01*full.get_compliance_history()[-1])
+        self.assertAlmostEqual(adding.get_volume(), 10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+from barman import bulk
+from barman.analysis import LinearStatic
+from barman.service import AnalysisService, run_job
+
+
+def get_portal_frame(load):
+    """Returns a fixed-base portal frame, with a braced bay, in the bulk array format"""
+
+    return {
+        'nodes': [[0, 0], [0, 3], [4, 3], [4, 0]],
+        'elements': [[0, 1], [1, 2], [2, 3], [0, 2]],
+        'element_types': ['EulerBernoulli', 'EulerBernoulli', 'EulerBernoulli', 'Bar2'],
+        'young_modulus': 200e6,
+        'area': [0.01, 0.01, 0.01, 0.002],
+        'I_zz': [1e-4, 2e-4, 1e-4, 0.0],
+        'supports': [[0, 0, 0], [0, 1, 0], [0, 2, 0], [3, 0, 0], [3, 1, 0], [3, 2, 0]],
+        'forces': [[1, 0, load]],
+        'element_loads': [[1, 0, -10, 0, -10]],
+    }
+
+
+async def request(path, lines):
+    """Sends request lines to the service at path and returns its responses, keyed by id"""
+
+    reader, writer = await asyncio.open_unix_connection(path)
+    for line in lines:
+        writer.write((json.dumps(line) + '\n').encode())
+    await writer.drain()
+    writer.write_eof()
+
+    responses = dict()
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        response = json.loads(line)
+        responses[response['id']] = response
+    writer.close()
+
+    return responses
+
+
+class BlockingService(AnalysisService):
+    """Service whose jobs block until released"""
+
+    started = threading.Event()
+    release = threading.Event()
+
+    @staticmethod
+    def job_function(data):
+        BlockingService.started.set()
+        BlockingService.release.wait(10)
+        return run_job(data)
+
+
+class TestBulk(unittest.TestCase):
+
+    def test_results_match_static_analysis(self):
+        data = get_portal_frame(5.0)
+        model = bulk.model_from_arrays(data)
+        results = LinearStatic().run(model)
+        arrays = bulk.results_to_arrays(data, results)
+
+        self.assertEqual(len(model.elements), 4)
+        self.assertEqual(len(model.element_loads), 1)
+        numpy.testing.assert_allclose(arrays['member_forces'], results.get_member_forces())
+
+        # global equilibrium of reactions, applied forces and member loads
+        reactions = arrays['reactions']
+        self.assertAlmostEqual(reactions[reactions[:, 1] == 0, 2].sum(), -5.0)
+        self.assertAlmostEqual(reactions[reactions[:, 1] == 1, 2].sum(), 40.0)
+
+        self.assertGreater(arrays['displacements'][1, 0], 0.0)
+        numpy.testing.assert_array_equal(arrays['displacements'][[0, 3]], 0.0)
+
+
+class TestAnalysisService(unittest.TestCase):
+
+    def test_jobs_over_unix_socket(self):
+        loads = [1.0, 2.0, 5.0, -3.0, 0.0]
+        lines = [{'id': 'job-{}'.format(i), 'method': 'run', 'model': get_portal_frame(load)} for i, load in enumerate(loads)]
+        lines.append({'id': 'bad', 'method': 'run', 'model': {'nodes': [[0, 0]], 'elements': [[0, 7]], 'young_modulus': 1, 'area': 1}})
+        lines.append({'id': 'unknown', 'method': 'missing'})
+
+        async def main(path):
+            service = AnalysisService(workers=2, max_pending=2)
+            await service.start()
+            server = await asyncio.start_unix_server(service.handle_connection, path)
+            try:
+                return await request(path, lines)
+            finally:
+                server.close()
+                await server.wait_closed()
+                await service.close()
+
+        with tempfile.TemporaryDirectory() as directory:
+            responses = asyncio.run(main(os.path.join(directory, 'barman.sock')))
+
+        self.assertEqual(len(responses), len(lines))
+        self.assertEqual(responses['bad']['status'], 'error')
+        self.assertIn('unknown method', responses['unknown']['error'])
+        for i, load in enumerate(loads):
+            response = responses['job-{}'.format(i)]
+            self.assertEqual(response['status'], 'ok')
+
+            data = get_portal_frame(load)
+            expected = bulk.results_to_arrays(data, LinearStatic().run(bulk.model_from_arrays(data)))
+            for key, value in expected.items():
+                numpy.testing.assert_allclose(response['result'][key], value, atol=1e-12)
+
+
+    def test_cancellation(self):
+        BlockingService.started.clear()
+        BlockingService.release.clear()
+
+        async def main():
+            service = BlockingService(workers=1, max_pending=4, executor=ThreadPoolExecutor(max_workers=1))
+            await service.start()
+
+            running = await service.submit('running', get_portal_frame(1.0))
+            queued = await service.submit('queued', get_portal_frame(2.0))
+            finished = await service.submit('finished', get_portal_frame(3.0))
+            await asyncio.get_running_loop().run_in_executor(None, BlockingService.started.wait, 10)
+
+            with self.assertRaises(ValueError):
+                await service.submit('queued', get_portal_frame(4.0))
+
+            self.assertTrue(service.cancel('running'))
+            self.assertTrue(service.cancel('queued'))
+            self.assertFalse(service.cancel('unknown'))
+            BlockingService.release.set()
+
+            result = await finished
+            await service.close()
+
+            return running, queued, result
+
+        running, queued, result = asyncio.run(main())
+
+        self.assertTrue(running.cancelled())
+        self.assertTrue(queued.cancelled())
+        self.assertEqual(len(result['displacements']), 4)
+
+
+    def test_job_ids_are_scoped_to_their_connection(self):
+        BlockingService.started.clear()
+        BlockingService.release.clear()
+
+        async def main():
+            service = BlockingService(workers=1, max_pending=4, executor=ThreadPoolExecutor(max_workers=1))
+            await service.start()
+
+            first = await service.submit('job-1', get_portal_frame(1.0), connection='first')
+            second = await service.submit('job-1', get_portal_frame(2.0), connection='second')
+            await asyncio.get_running_loop().run_in_executor(None, BlockingService.started.wait, 10)
+
+            self.assertFalse(service.cancel('job-1'))
+            self.assertTrue(service.cancel('job-1', connection='second'))
+            BlockingService.release.set()
+
+            result = await first
+            await service.close()
+
+            return result, second
+
+        result, second = asyncio.run(main())
+
+        self.assertTrue(second.cancelled())
+        self.assertEqual(len(result['displacements']), 4)
@@ -0,0 +1,209 @@
+import unittest
+
+import numpy
+import scipy.sparse.linalg
+from barman.analysis import LinearStatic
+from barman import models, materials, dofs, sections
+from barman.solvers import ComponentSolver, ConjugateGradientSolver, DirectSolver, DomainDecompositionSolver, MixedPrecisionSolver, get_subdomains
+from barman import solvers
+from barman.prescribed_displacements import PrescribedDisplacement
+from barman.prescribed_forces import PrescribedForce
+from barman.elements import Bar2, EulerBernoulli
+from tests.test_assembly import get_lattice_model
+
+
+def get_separate_frames_model(copies, spacing=10):
+    """Returns identical braced portal frames side by side, each with its own load, and one taller frame"""
+
+    material = materials.LinearElastic('test', 200e6, 0.3)
+    section = sections.Section(0.01, 1e-4)
+    model = models.Static()
+
+    for copy in range(copies + 1):
+        x = spacing*copy
+        height = 3 if copy < copies else 5
+        nodes = [dofs.Node([x, 0]), dofs.Node([x, height]), dofs.Node([x + 4, height]), dofs.Node([x + 4, 0])]
+
+        model.append_element( EulerBernoulli([nodes[0], nodes[1]], section, material) )
+        model.append_element( EulerBernoulli([nodes[1], nodes[2]], section, material) )
+        model.append_element( EulerBernoulli([nodes[2], nodes[3]], section, material) )
+        model.append_element( Bar2([nodes[0], nodes[2]], section, material) )
+
+        for node in (nodes[0], nodes[3]):
+            for parameter in [dofs.Parameter.dx, dofs.Parameter.dy, dofs.Parameter.rz]:
+                model.append_prescribed_displacement( PrescribedDisplacement( dofs.GlobalDoF(node, parameter), 0.0) )
+        model.append_prescribed_force( PrescribedForce( dofs.GlobalDoF(nodes[1], dofs.Parameter.dx), 10.0*(copy + 1)) )
+
+    return model
+
+
+class TestDirectSolver(unittest.TestCase):
+
+    def setUp(self):
+        self.model = get_lattice_model(8)
+        self.equation = LinearStatic().run(self.model).get_equation()
+        self.f = numpy.random.default_rng(0).standard_normal(self.equation.k_ff.shape[0])
+
+
+    def test_backends_match_spsolve(self):
+        expected = scipy.sparse.linalg.spsolve(self.equation.k_ff.tocsc(), self.f)
+
+        for name in solvers.get_available_backends():
+            solver = DirectSolver(backend=name)
+            numpy.testing.assert_allclose(solver.solve(self.equation.k_ff, self.f), expected, rtol=1e-9, atol=1e-12)
+            self.assertEqual(solver.info['backend'], name)
+
+        for permc_spec in ['COLAMD', 'MMD_AT_PLUS_A', 'MMD_ATA', 'NATURAL']:
+            solver = DirectSolver(backend='superlu', permc_spec=permc_spec)
+            numpy.testing.assert_allclose(solver.solve(self.equation.k_ff, self.f), expected, rtol=1e-9, atol=1e-12)
+            self.assertEqual(solver.info['options'], {'permc_spec': permc_spec})
+
+
+    def test_automatic_selection(self):
+        self.assertTrue(solvers.is_symmetric(self.equation.k_ff))
+        self.assertFalse(solvers.is_symmetric(scipy.sparse.csr_matrix(numpy.triu(numpy.ones((3, 3))))))
+
+        # small matrices are always factorized by SuperLU
+        self.assertEqual(solvers.select_backend(self.equation.k_ff, True), 'superlu')
+
+        with self.assertRaises(ValueError):
+            DirectSolver(backend='missing')
+
+
+    def test_factorization_is_reusable(self):
+        solve = DirectSolver().factorize(self.equation.k_ff)
+        block = numpy.column_stack((self.f, 2*self.f))
+
+        d = solve(block)
+        numpy.testing.assert_allclose(d[:, 1], 2*d[:, 0], rtol=1e-12)
+
+
+    def test_results_record_the_solver(self):
+        info = LinearStatic().run(self.model).get_solver_info()
+
+        self.assertEqual(info['backend'], 'superlu')
+        self.assertEqual(info['size'], self.equation.k_ff.shape[0])
+        self.assertEqual(info['nnz'], self.equation.k_ff.nnz)
+        self.assertTrue(info['symmetric'])
+        self.assertGreater(info['memory'], 0)
+        self.assertGreaterEqual(info['factorization_time'], 0.0)
+        self.assertGreaterEqual(info['solve_time'], 0.0)
+
+
+class TestDomainDecompositionSolver(unittest.TestCase):
+
+    def setUp(self):
+        self.model = get_lattice_model(8)
+        self.equation = LinearStatic().run(self.model).get_equation()
+        self.f = numpy.random.default_rng(0).standard_normal(self.equation.k_ff.shape[0])
+
+
+    def test_get_subdomains_decouples_interiors(self):
+        k = self.equation.k_ff.tocoo()
+        labels, interface = get_subdomains(k, 4)
+
+        self.assertEqual(set(labels), {0, 1, 2, 3})
+        interior = ~interface[k.row] & ~interface[k.col]
+        numpy.testing.assert_array_equal(labels[k.row[interior]], labels[k.col[interior]])
+        self.assertLess(numpy.count_nonzero(interface), len(labels)//2)
+
+
+    def test_matches_direct_solver(self):
+        expected = scipy.sparse.linalg.spsolve(self.equation.k_ff.tocsc(), self.f)
+
+        for solver in [DomainDecompositionSolver(subdomains=4, workers=1),
+                       DomainDecompositionSolver(subdomains=3, workers=2),
+                       DomainDecompositionSolver(subdomains=4, workers=1, interface_solver='cg', tolerance=1e-12),
+                       DomainDecompositionSolver(subdomains=1, workers=1)]:
+            numpy.testing.assert_allclose(solver.solve(self.equation.k_ff, self.f), expected, rtol=1e-8, atol=1e-10)
+
+
+    def test_run_with_domain_decomposition(self):
+        solver = DomainDecompositionSolver(subdomains=4, workers=2)
+        direct = LinearStatic().run(self.model)
+        decomposed = LinearStatic(solver=solver).run(self.model)
+
+        self.assertGreater(solver.interface_size, 0)
+        self.assertEqual(len(solver.subdomain_sizes), 4)
+        numpy.testing.assert_allclose(decomposed.get_displacements(), direct.get_displacements(), rtol=1e-9, atol=1e-12)
+
+
+class TestMixedPrecisionSolver(unittest.TestCase):
+
+    def setUp(self):
+        self.model = get_lattice_model(8)
+
+
+    def test_refinement_reaches_double_precision(self):
+        equation = LinearStatic().run(self.model).get_equation()
+        f = numpy.random.default_rng(0).standard_normal(equation.k_ff.shape[0])
+        solver = MixedPrecisionSolver()
+
+        d_f = solver.solve(equation.k_ff, f)
+
+        self.assertGreater(solver.residuals[0], 1e-8)
+        self.assertLess(solver.residuals[-1], 1e-12)
+        numpy.testing.assert_allclose(d_f, scipy.sparse.linalg.spsolve(equation.k_ff.tocsc(), f), rtol=1e-9, atol=1e-12)
+
+
+    def test_run_in_single_precision(self):
+        direct = LinearStatic().run(self.model)
+        mixed = LinearStatic(precision='single').run(self.model)
+
+        self.assertEqual(mixed.get_equation().k_ff.dtype, numpy.float32)
+        self.assertIsNone(direct.get_residuals())
+        self.assertLess(mixed.get_residuals()[-1], 1e-12)
+        numpy.testing.assert_allclose(mixed.get_displacements(), direct.get_displacements(), rtol=1e-9, atol=1e-12)
+        numpy.testing.assert_allclose(mixed.get_reactions(), direct.get_reactions(), rtol=1e-9, atol=1e-9)
+        numpy.testing.assert_allclose(mixed.get_member_forces(), direct.get_member_forces(), rtol=1e-9, atol=1e-9)
+
+        with self.assertRaises(ValueError):
+            LinearStatic(precision='half')
+
+        # solvers which cannot refine a float32 solution are rejected
+        with self.assertRaises(ValueError):
+            LinearStatic(precision='single', solver=ConjugateGradientSolver())
+        LinearStatic(precision='single', solver=MixedPrecisionSolver(tolerance=1e-10))
+
+
+class TestComponentSolver(unittest.TestCase):
+
+    def setUp(self):
+        self.model = get_separate_frames_model(12)
+
+
+    def test_identical_components_share_a_factorization(self):
+        direct = LinearStatic().run(self.model)
+
+        for solver in [ComponentSolver(workers=1), ComponentSolver(workers=2, min_parallel=1)]:
+            results = LinearStatic(solver=solver).run(self.model)
+
+            self.assertEqual(solver.components, 13)
+            self.assertEqual(solver.factorizations, 2)
+            numpy.testing.assert_allclose(results.get_displacements(), direct.get_displacements(), rtol=1e-10, atol=1e-14)
+            numpy.testing.assert_allclose(results.get_reactions(), direct.get_reactions(), rtol=1e-10, atol=1e-9)
+
+
+    def test_copies_differing_by_rounding_share_a_factorization(self):
+        model = get_separate_frames_model(12, spacing=4.4)
+        direct = LinearStatic().run(model)
+
+        solver = ComponentSolver(workers=1)
+        results = LinearStatic(solver=solver).run(model)
+
+        self.assertEqual(solver.components, 13)
+        self.assertEqual(solver.factorizations, 2)
+        numpy.testing.assert_allclose(results.get_displacements(), direct.get_displacements(), rtol=1e-8, atol=1e-14)
+
+
+    def test_connected_model_is_one_component(self):
+        equation = LinearStatic().run(get_lattice_model(6)).get_equation()
+        f = numpy.random.default_rng(0).standard_normal(equation.k_ff.shape[0])
+        solver = ComponentSolver(workers=1)
+
+        numpy.testing.assert_allclose(solver.solve(equation.k_ff, f), scipy.sparse.linalg.spsolve(equation.k_ff.tocsc(), f), rtol=1e-10)
+        self.assertEqual(solver.components, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()